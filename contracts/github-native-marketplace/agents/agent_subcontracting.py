@@ -2,14 +2,19 @@
 """
 Agent subcontracting system - enables agents to:
 1. Parse recursive queries like "response[response[222]]"
-2. Post subcontracts on GitHub
-3. Track profit/loss
+2. Resolve whole recursive chains against combined knowledge
+3. Post subcontracts on GitHub
+4. Track profit/loss
 """
 
+import asyncio
 import json
+import os
 import re
-import subprocess
-from typing import Optional, List, Dict, Tuple
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, List, Dict, Iterator, Tuple
 
 
 class AgentKnowledge:
@@ -28,6 +33,15 @@ class AgentKnowledge:
         return self.knowledge.get(query)
 
 
+# Compiled once; parse() runs for every contract every agent looks at
+_RESPONSE_EXPRESSION = re.compile(r'response\[([^\]]+)\]')
+_INNERMOST_QUERY = re.compile(r'\[(\d+)\]')
+_SIMPLE_QUERY = re.compile(r'query (\d+)')
+
+# response[response[...[X]...]] - nesting prefix, innermost query, closing run
+_NESTED_EXPRESSION = re.compile(r'((?:response\[)+)([^\[\]]+)(\]+)')
+
+
 class QueryParser:
     """Parse recursive query expressions."""
 
@@ -41,14 +55,20 @@ class QueryParser:
         - "What is response[222]?" -> (["222"], 1)
         - "What is response[response[222]]?" -> (["222", "response[222]"], 2)
         """
+        dependencies, depth = QueryParser._parse_cached(query_text)
+        return (list(dependencies), depth)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_cached(query_text: str) -> Tuple[Tuple[str, ...], int]:
         # Extract the expression from natural language
-        match = re.search(r'response\[([^\]]+)\]', query_text)
+        match = _RESPONSE_EXPRESSION.search(query_text)
         if not match:
             # Simple query like "What is response to query 222?"
-            match = re.search(r'query (\d+)', query_text)
+            match = _SIMPLE_QUERY.search(query_text)
             if match:
-                return ([match.group(1)], 1)
-            return ([], 0)
+                return ((match.group(1),), 1)
+            return ((), 0)
 
         expr = match.group(0)
 
@@ -56,9 +76,9 @@ class QueryParser:
         depth = expr.count('response[')
 
         # Extract innermost query
-        inner_match = re.search(r'\[(\d+)\]', expr)
+        inner_match = _INNERMOST_QUERY.search(expr)
         if not inner_match:
-            return ([], 0)
+            return ((), 0)
 
         innermost_query = inner_match.group(1)
 
@@ -70,7 +90,7 @@ class QueryParser:
             if i < depth - 1:
                 current = f"response[{current}]"
 
-        return (dependencies, depth)
+        return (tuple(dependencies), depth)
 
     @staticmethod
     def can_solve_first_hop(query_text: str, knowledge: AgentKnowledge) -> Tuple[bool, Optional[str]]:
@@ -99,50 +119,319 @@ class QueryParser:
         return (False, None)
 
 
-class ProfitLedger:
-    """Track agent profit/loss."""
+class HopPlan:
+    """A compiled recursive query: `depth` lookups starting from `root`."""
+
+    __slots__ = ('expression', 'root', 'depth')
+
+    def __init__(self, expression: str, root: str, depth: int):
+        self.expression = expression
+        self.root = root
+        self.depth = depth
+
+    def __repr__(self):
+        return f"HopPlan({self.expression!r}, root={self.root!r}, depth={self.depth})"
+
+
+class _Chain:
+    """
+    Queries met walking from one root: queries[i + 1] is the response to
+    queries[i], so each entry is a memoized intermediate response[x].
+    """
+
+    __slots__ = ('queries', 'position', 'end')
+
+    def __init__(self, root: str):
+        self.queries = [root]
+        self.position = {root: 0}
+        self.end: Optional[Tuple[str, object]] = None  # ('unknown', query) or ('cycle', position)
+
+
+class QueryResolver:
+    """
+    Resolve recursive queries against the combined knowledge of many agents.
+
+    Expressions are compiled once into a HopPlan; walking a plan is one
+    dict lookup per hop. Every intermediate response[x] met on a walk is
+    memoized: the walk is kept as a chain, and every query on it maps to
+    its position, so a later query through any of them reuses the chain
+    instead of walking it again (at most `cache_size` hops are kept, least
+    recently used chains dropped first). Whole results are memoized in an
+    LRU keyed by (query, depth). A hop that revisits an earlier query is
+    reported as a cycle - the rest of the chain then follows from the
+    cycle length instead of being walked hop by hop.
+
+    A query's response is that of its first holder, in the order agents
+    were added.
+    """
+
+    def __init__(self, knowledge_bases: List[AgentKnowledge], cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._holders: Dict[str, List[str]] = {}
+        self._responses: Dict[str, str] = {}
+        self._knowledge: Dict[str, Dict[str, str]] = {}  # agent -> its knowledge when added
+        self._memo: 'OrderedDict[Tuple[str, int], Dict]' = OrderedDict()
+        self._chains: 'OrderedDict[str, _Chain]' = OrderedDict()  # by root, least recent first
+        self._chain_at: Dict[str, _Chain] = {}
+        self._memoized = 0  # hops held by all chains
+        for knowledge in knowledge_bases:
+            self.add_knowledge(knowledge)
+
+    def add_knowledge(self, knowledge: AgentKnowledge):
+        """Add (or re-add) one agent's knowledge; clears memoized chains."""
+        agent_id = knowledge.agent_id
+        previous = self._knowledge.pop(agent_id, {})
+        for query in previous:
+            holders = self._holders[query]
+            holders.remove(agent_id)
+            if not holders:
+                del self._holders[query]
+        for query in knowledge.knowledge:
+            self._holders.setdefault(query, []).append(agent_id)
+        self._knowledge[agent_id] = dict(knowledge.knowledge)
+
+        # The response is the first holder's, which may have changed
+        for query in previous.keys() | knowledge.knowledge.keys():
+            holders = self._holders.get(query)
+            if holders:
+                self._responses[query] = self._knowledge[holders[0]][query]
+            else:
+                self._responses.pop(query, None)
+
+        self._memo.clear()
+        self._chains.clear()
+        self._chain_at.clear()
+        self._memoized = 0
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def compile(query_text: str) -> Optional[HopPlan]:
+        """Compile a query into a HopPlan (None if it names no query)."""
+        match = _NESTED_EXPRESSION.search(query_text)
+        if match:
+            depth = match.group(1).count('response[')
+            if len(match.group(3)) < depth:
+                return None
+            return HopPlan(match.group(0)[:len(match.group(1)) + len(match.group(2)) + depth],
+                           match.group(2), depth)
+
+        match = _SIMPLE_QUERY.search(query_text)
+        if match:
+            return HopPlan(f"response[{match.group(1)}]", match.group(1), 1)
+        return None
+
+    def holders(self, query: str) -> List[str]:
+        """Agents who know the response to one query."""
+        return list(self._holders.get(query, ()))
+
+    def resolve(self, query_text: str) -> Dict:
+        """
+        Resolve a recursive query.
+
+        Returns dict with:
+            resolvable: whether every hop is known to some agent
+            final_answer: last response (None if unresolvable)
+            depth: number of hops in the expression
+            hops: [{step, query, response, knowledge_holder, holders}] up to
+                  the first unknown hop (or one full cycle)
+            unresolved_query: first query nobody knows, if any
+            cycle: {start_step, length} if the chain revisits a query
+        """
+        plan = self.compile(query_text)
+        if plan is None:
+            return {'resolvable': False, 'final_answer': None, 'depth': 0, 'hops': [],
+                    'unresolved_query': None, 'cycle': None}
+        return self.resolve_plan(plan)
+
+    def resolve_plan(self, plan: HopPlan) -> Dict:
+        key = (plan.root, plan.depth)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+        result = self._walk(plan.root, plan.depth)
+        self._memo[key] = result
+        if len(self._memo) > self.cache_size:
+            self._memo.popitem(last=False)
+        return result
+
+    def _walk(self, root: str, depth: int) -> Dict:
+        if depth <= 0:
+            return {'resolvable': True, 'final_answer': None, 'depth': depth, 'hops': [],
+                    'unresolved_query': None, 'cycle': None}
+        if root not in self._holders:
+            return {'resolvable': False, 'final_answer': None, 'depth': depth, 'hops': [],
+                    'unresolved_query': root, 'cycle': None}
+
+        chain, offset = self._chain_from(root)
+        self._extend(chain, offset + depth)
+        queries = chain.queries
+
+        walk = queries[offset:offset + depth]
+        if len(walk) == depth:
+            return {'resolvable': True, 'final_answer': self._responses[walk[-1]],
+                    'depth': depth, 'hops': self._hops(walk), 'unresolved_query': None, 'cycle': None}
+
+        kind, value = chain.end
+        if kind == 'unknown':
+            return {'resolvable': False, 'final_answer': None, 'depth': depth, 'hops': self._hops(walk),
+                    'unresolved_query': value, 'cycle': None}
+
+        # The chain loops back to queries[value]; from a root inside the loop,
+        # the loop's earlier part comes after the end of the chain
+        start = value - offset
+        if start < 0:
+            walk = queries[offset:] + queries[value:offset]
+            start = 0
+            if len(walk) >= depth:
+                walk = walk[:depth]
+                return {'resolvable': True, 'final_answer': self._responses[walk[-1]], 'depth': depth,
+                        'hops': self._hops(walk), 'unresolved_query': None, 'cycle': None}
+
+        # Hops from start onwards repeat forever
+        length = len(walk) - start
+        final = self._responses[walk[start + (depth - 1 - start) % length]]
+        return {'resolvable': True, 'final_answer': final, 'depth': depth, 'hops': self._hops(walk),
+                'unresolved_query': None, 'cycle': {'start_step': start + 1, 'length': length}}
+
+    def _hops(self, queries: List[str]) -> List[Dict]:
+        hops = []
+        for step, query in enumerate(queries, 1):
+            holders = self._holders[query]
+            hops.append({
+                'step': step,
+                'query': query,
+                'response': self._responses[query],
+                'knowledge_holder': holders[0],
+                'holders': list(holders)
+            })
+        return hops
+
+    def _chain_from(self, query: str) -> Tuple[_Chain, int]:
+        """The memoized chain through a (known) query and its position, or a new one."""
+        chain = self._chain_at.get(query)
+        if chain is not None:
+            self._chains.move_to_end(chain.queries[0])
+            return chain, chain.position[query]
+        chain = self._chains[query] = self._chain_at[query] = _Chain(query)
+        self._memoized += 1
+        return chain, 0
+
+    def _extend(self, chain: _Chain, length: int):
+        """Walk the chain on until it has `length` queries, or hits an unknown query or a loop."""
+        while len(chain.queries) < length and chain.end is None:
+            response = self._responses[chain.queries[-1]]
+            if response not in self._holders:
+                chain.end = ('unknown', response)
+            elif response in chain.position:
+                chain.end = ('cycle', chain.position[response])
+            else:
+                chain.position[response] = len(chain.queries)
+                chain.queries.append(response)
+                self._chain_at.setdefault(response, chain)
+                self._memoized += 1
+
+        # Least recently used chains go first; the one just walked stays
+        while self._memoized > self.cache_size and len(self._chains) > 1:
+            _, old = self._chains.popitem(last=False)
+            for query in old.queries:
+                if self._chain_at.get(query) is old:
+                    del self._chain_at[query]
+            self._memoized -= len(old.queries)
+
+
+class Transaction:
+    """
+    One ledger entry, slotted - ledgers hold millions of these.
+
+    Reads like the dict it replaces (transaction['amount'],
+    transaction.get('paid_to')); to_dict() gives the snapshot JSON shape.
+    """
+
+    __slots__ = ('type', 'contract_id', 'amount', 'paid_to', 'description')
+
+    def __init__(self, type: str, contract_id: str, amount: float,
+                 description: str, paid_to: Optional[str] = None):
+        self.type = type
+        self.contract_id = contract_id
+        self.amount = amount
+        self.paid_to = paid_to
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Transaction':
+        return cls(data['type'], data.get('contract_id'), data['amount'],
+                   data.get('description'), data.get('paid_to'))
+
+    def to_dict(self) -> Dict:
+        data = {'type': self.type, 'contract_id': self.contract_id, 'amount': self.amount}
+        if self.paid_to is not None:
+            data['paid_to'] = self.paid_to
+        data['description'] = self.description
+        return data
+
+    def __contains__(self, key: str) -> bool:
+        # The keys of to_dict(): paid_to only on payments
+        return key in self.__slots__ and (key != 'paid_to' or self.paid_to is not None)
+
+    def __getitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self else default
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Transaction, dict)):
+            return self.to_dict() == (other if isinstance(other, dict) else other.to_dict())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Transaction({self.to_dict()!r})"
 
-    def __init__(self, ledger_path: str):
+
+class ProfitLedger:
+    """
+    Track agent profit/loss.
+
+    The ledger file is a snapshot; each transaction is appended as one
+    compact JSON line to a write-ahead journal next to it
+    (payment_ledger.json.journal), so recording is O(1) no matter how long
+    the history is. The journal is fsynced every `sync_every` records and
+    folded into a fresh snapshot every `compact_every` records (or on
+    save()). On load, only journal records newer than the snapshot are
+    replayed (see load_ledger); a torn final line from a crash is cut off.
+
+    Readers that only need the totals should use load_ledger() rather
+    than parse the snapshot, which lags the journal until compaction.
+    """
+
+    def __init__(self, ledger_path: str, sync_every: int = 64, compact_every: int = 10000):
         self.ledger_path = ledger_path
-        with open(ledger_path, 'r') as f:
-            self.data = json.load(f)
+        self.journal_path = ledger_path + '.journal'
+        self.sync_every = sync_every
+        self.compact_every = compact_every
+
+        self.data, self._seq, self._journaled = _load_ledger_state(ledger_path)
+        self._journal = None
+        self._unsynced = 0
+        _repair_journal_tail(self.journal_path)
 
     def record_revenue(self, agent_id: str, contract_id: str, amount: float, description: str):
         """Record revenue from completing a contract."""
-        if agent_id not in self.data['agents']:
-            self.data['agents'][agent_id] = {
-                'total_revenue': 0.0,
-                'total_costs': 0.0,
-                'net_profit': 0.0,
-                'transactions': []
-            }
-
-        agent = self.data['agents'][agent_id]
-        agent['total_revenue'] += amount
-        agent['net_profit'] = agent['total_revenue'] - agent['total_costs']
-        agent['transactions'].append({
+        self._append({
+            'agent_id': agent_id,
             'type': 'revenue',
             'contract_id': contract_id,
             'amount': amount,
             'description': description
         })
 
-        self.save()
-
     def record_cost(self, agent_id: str, contract_id: str, amount: float, paid_to: str, description: str):
         """Record cost from posting subcontract."""
-        if agent_id not in self.data['agents']:
-            self.data['agents'][agent_id] = {
-                'total_revenue': 0.0,
-                'total_costs': 0.0,
-                'net_profit': 0.0,
-                'transactions': []
-            }
-
-        agent = self.data['agents'][agent_id]
-        agent['total_costs'] += amount
-        agent['net_profit'] = agent['total_revenue'] - agent['total_costs']
-        agent['transactions'].append({
+        self._append({
+            'agent_id': agent_id,
             'type': 'cost',
             'contract_id': contract_id,
             'amount': amount,
@@ -150,8 +439,6 @@ class ProfitLedger:
             'description': description
         })
 
-        self.save()
-
     def get_profit(self, agent_id: str) -> float:
         """Get current net profit for agent."""
         if agent_id not in self.data['agents']:
@@ -159,22 +446,192 @@ class ProfitLedger:
         return self.data['agents'][agent_id]['net_profit']
 
     def save(self):
-        """Save ledger to disk."""
-        with open(self.ledger_path, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Save ledger to disk (compacts the journal into the snapshot)."""
+        self.compact()
+
+    def flush(self):
+        """Force journaled transactions to disk."""
+        if self._journal and self._unsynced:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+
+    def compact(self):
+        """Write a new snapshot atomically and truncate the journal."""
+        self.flush()
+        self.data['journal_seq'] = self._seq
+
+        tmp_path = self.ledger_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2, default=Transaction.to_dict)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.ledger_path)
+
+        # Records up to journal_seq are now in the snapshot, so a crash
+        # before the truncate only causes them to be skipped on replay
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.truncate(self.journal_path, 0)
+        self._journaled = 0
+
+    def close(self):
+        """Flush and close the journal."""
+        self.flush()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    def __enter__(self) -> 'ProfitLedger':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _append(self, record: Dict):
+        self._seq += 1
+        record = {'seq': self._seq, **record}
+        self._apply(record)
+
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a')
+        self._journal.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._unsynced += 1
+        self._journaled += 1
+
+        if self._journaled >= self.compact_every:
+            self.compact()
+        elif self._unsynced >= self.sync_every:
+            self.flush()
+
+    def _apply(self, record: Dict):
+        _apply_record(self.data, record)
+
+
+def _apply_record(data: Dict, record: Dict):
+    """Fold one journal record into a ledger's in-memory totals."""
+    agent_id = record['agent_id']
+    if agent_id not in data['agents']:
+        data['agents'][agent_id] = {
+            'total_revenue': 0.0,
+            'total_costs': 0.0,
+            'net_profit': 0.0,
+            'transactions': []
+        }
+
+    agent = data['agents'][agent_id]
+    if record['type'] == 'revenue':
+        agent['total_revenue'] += record['amount']
+    else:
+        agent['total_costs'] += record['amount']
+    agent['net_profit'] = agent['total_revenue'] - agent['total_costs']
+    agent['transactions'].append(Transaction(
+        record['type'], record['contract_id'], record['amount'],
+        record['description'], record.get('paid_to')
+    ))
+
+
+def _journal_records(journal_path: str) -> Iterator[Dict]:
+    """
+    Records of a ledger journal, in order. A line that does not parse is
+    skipped with a warning, except a last line without a newline (a torn
+    write), which is ignored.
+    """
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith(b'\n'):
+                    warnings.warn(f"{journal_path}:{number}: skipping unparsable journal line")
+
+
+def _load_ledger_state(ledger_path: str) -> Tuple[Dict, int, int]:
+    """(data with Transaction records, last seq, journal records) - reads only."""
+    with open(ledger_path, 'r') as f:
+        data = json.load(f)
+    for agent in data['agents'].values():
+        agent['transactions'] = [Transaction.from_dict(t) for t in agent['transactions']]
+
+    seq = data.get('journal_seq', 0)
+    journaled = 0
+    for record in _journal_records(ledger_path + '.journal'):
+        journaled += 1
+        if record['seq'] > seq:
+            seq = record['seq']
+            _apply_record(data, record)
+    return data, seq, journaled
+
+
+def _repair_journal_tail(journal_path: str):
+    """
+    Make the journal end in a newline before anything is appended: a torn
+    last line is cut off, a complete record missing only its newline kept.
+    Nothing before the last line is ever touched.
+    """
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        # Find the start of the last line
+        start = size
+        while start > 0:
+            chunk = min(4096, start)
+            f.seek(start - chunk)
+            newline = f.read(chunk).rfind(b'\n')
+            if newline >= 0:
+                start = start - chunk + newline + 1
+                break
+            start -= chunk
+        f.seek(start)
+        try:
+            json.loads(f.read())
+        except ValueError:
+            f.truncate(start)
+        else:
+            f.write(b'\n')
+
+
+def load_ledger(ledger_path: str) -> Dict:
+    """
+    Current payment ledger in the payment_ledger.json shape: the snapshot
+    with its journal replayed. Read-only; the files are not modified.
+    """
+    data, seq, _ = _load_ledger_state(ledger_path)
+    if seq:
+        # The replayed records are in the result, as after a compaction
+        data['journal_seq'] = seq
+    for agent in data['agents'].values():
+        agent['transactions'] = [t.to_dict() for t in agent['transactions']]
+    return data
 
 
 class SubcontractingAgent:
     """Agent that can analyze contracts and post subcontracts."""
 
-    def __init__(self, knowledge: AgentKnowledge, ledger: ProfitLedger):
+    def __init__(self, knowledge: AgentKnowledge, ledger: ProfitLedger,
+                 resolver: Optional[QueryResolver] = None):
         self.knowledge = knowledge
         self.ledger = ledger
+        self.resolver = resolver
 
     def analyze_contract(self, contract_query: str, budget: float) -> Dict:
         """
         Analyze a contract and determine strategy.
         Returns strategy dict with actions to take.
+
+        With a resolver, multi-hop contracts are checked end to end before
+        bidding: unresolvable chains are declined and the strategy carries
+        the resolution (holder of every hop).
         """
         can_solve, next_query = QueryParser.can_solve_first_hop(contract_query, self.knowledge)
 
@@ -184,6 +641,16 @@ class SubcontractingAgent:
                 'reason': 'No knowledge of first hop'
             }
 
+        resolution = None
+        if self.resolver is not None and next_query is not None:
+            resolution = self.resolver.resolve(contract_query)
+            if not resolution['resolvable']:
+                return {
+                    'action': 'cannot_bid',
+                    'reason': f"No agent knows response[{resolution['unresolved_query']}]",
+                    'resolution': resolution
+                }
+
         if next_query is None:
             # Can solve directly
             return {
@@ -196,7 +663,7 @@ class SubcontractingAgent:
         profit_margin = 0.7  # Keep 70%
         subcontract_budget = budget * (1 - profit_margin)
 
-        return {
+        strategy = {
             'action': 'subcontract',
             'subcontract_query': f"What is response[{next_query}]?",
             'subcontract_budget': subcontract_budget,
@@ -205,12 +672,36 @@ class SubcontractingAgent:
             'expected_profit': budget * profit_margin,
             'profit_margin': profit_margin
         }
+        if resolution is not None:
+            strategy['resolution'] = resolution
+        return strategy
 
     def post_subcontract_github(self, query: str, budget: float, parent_contract: str) -> str:
         """
         Post a subcontract as a GitHub issue.
         Returns: issue URL
         """
+        from github_client import GitHubClient, GitHubError
+
+        async def post():
+            try:
+                client = GitHubClient.from_env()
+            except GitHubError as e:
+                print(f"Error posting subcontract: {e}")
+                return None
+            async with client:
+                return await self.post_subcontract_github_async(client, query, budget, parent_contract)
+
+        return asyncio.run(post())
+
+    async def post_subcontract_github_async(self, client, query: str, budget: float,
+                                            parent_contract: str) -> str:
+        """
+        Post a subcontract through a shared GitHubClient.
+        Returns: issue URL
+        """
+        from github_client import GitHubError
+
         title = f"[SUBCONTRACT] {query} - Payment: {budget} TFC"
 
         body = f"""## Subcontract Details
@@ -241,19 +732,10 @@ Released upon verification of correct response.
 **Note:** This is a subcontract. The posting agent ({self.knowledge.agent_id}) needs this to complete their own contract.
 """
 
-        # Post via gh CLI
-        cmd = [
-            'gh', 'issue', 'create',
-            '--title', title,
-            '--body', body,
-            '--label', 'subcontract,query-task'
-        ]
-
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            issue_url = result.stdout.strip()
-            return issue_url
-        except subprocess.CalledProcessError as e:
+            issue = await client.create_issue(title, body, labels=['subcontract', 'query-task'])
+            return issue['html_url']
+        except (GitHubError, OSError) as e:
             print(f"Error posting subcontract: {e}")
             return None
 
@@ -375,3 +857,5 @@ if __name__ == "__main__":
             print()
             print(f"   Total Profit: ${10.0 - subcontract_budget + strategy_b['bid_amount']}")
             print(f"   Efficiency: {((10.0 - subcontract_budget + strategy_b['bid_amount'])/10.0)*100:.1f}%")
+
+    ledger.close()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Streaming auction engine for contracts.
+
+Usage:
+    python auction_engine.py --issue 10 --budget 120 [--requester dirk-ax]
+
+Bids arrive one at a time, from issue comments or from a local asyncio
+queue, and are scored on arrival with evaluate_bids.BidEvaluator. Only
+acceptable bids compete: over-budget, zero-price, too-risky bids and bids
+that did not pass the capability test are rejected and counted as
+dropped, and the rest rank as in evaluate_bids. Each contract
+keeps only its top k and its leader, so a bid is O(log k) and a node can
+run thousands of contracts at once.
+
+Contracts close either explicitly (sealed-bid: nothing is revealed until
+close) or at a deadline (timed: a heap of deadlines is checked by tick()).
+Open auctions also announce every change of leader. Events go to every
+subscriber as dicts:
+    {'type': 'leader', 'contract_id', 'leader'}
+    {'type': 'award', 'contract_id', 'winner', 'runners_up', 'bids', 'dropped', 'closed_at'}
+    {'type': 'no_award', 'contract_id', 'bids', 'dropped', 'closed_at'}
+    {'type': 'rejected', 'contract_id', 'agent_id', 'reason'}
+
+Rejection reasons are 'unknown contract', 'closed', 'duplicate' and
+'unacceptable'; an agent whose bid was unacceptable may bid again.
+"""
+
+import asyncio
+import heapq
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from evaluate_bids import BidEvaluator, load_trust_scores
+from marketplace_parsing import parse_comment
+
+
+class Auction:
+    """State of one contract's auction."""
+
+    __slots__ = ('contract_id', 'budget', 'sealed', 'closes_at', 'evaluator',
+                 'bidders', 'closed_at')
+
+    def __init__(self, contract_id, budget: float, trust_data: Dict, sealed: bool = True,
+                 closes_at: Optional[float] = None, k: int = 3):
+        self.contract_id = contract_id
+        self.budget = budget
+        self.sealed = sealed
+        self.closes_at = closes_at
+        self.evaluator = BidEvaluator(trust_data, budget, k, acceptable_only=True)
+        self.bidders = set()
+        self.closed_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.closed_at is None
+
+    @property
+    def leader(self) -> Optional[Dict]:
+        """Current best bid; hidden (None) for sealed auctions until they close."""
+        if self.sealed and self.is_open:
+            return None
+        return self.evaluator.leader
+
+
+class AuctionEngine:
+    """Per-contract auctions fed by a bid stream."""
+
+    def __init__(self, trust_data: Dict, clock: Callable[[], float] = time.time):
+        self.trust_data = trust_data
+        self.clock = clock
+        self.auctions: Dict[object, Auction] = {}
+        self._deadlines: List = []  # (closes_at, seq, contract_id)
+        self._seq = 0
+        self._subscribers: List[Callable[[Dict], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """Call `callback(event)` for every event."""
+        self._subscribers.append(callback)
+
+    def _emit(self, event: Dict):
+        for callback in self._subscribers:
+            callback(event)
+
+    def open_contract(self, contract_id, budget: float, sealed: bool = True,
+                      closes_at: Optional[float] = None, k: int = 3) -> Auction:
+        """
+        Start an auction.
+
+        Args:
+            sealed: hide the leader until close (open auctions emit 'leader' events)
+            closes_at: clock time at which tick() closes it; None for manual close
+            k: runners-up kept for the award
+        """
+        if contract_id in self.auctions:
+            raise ValueError(f"Contract already open: {contract_id}")
+
+        auction = Auction(contract_id, budget, self.trust_data, sealed, closes_at, k)
+        self.auctions[contract_id] = auction
+        if closes_at is not None:
+            heapq.heappush(self._deadlines, (closes_at, self._seq, contract_id))
+            self._seq += 1
+        return auction
+
+    def submit(self, contract_id, bid: Dict) -> bool:
+        """
+        Ingest one bid; returns whether it was accepted.
+
+        One accepted bid per agent per contract. Bids on closed or unknown
+        contracts, from agents who already bid, or that are unacceptable
+        (see BidEvaluator's acceptable_only) are rejected.
+        """
+        auction = self.auctions.get(contract_id)
+        agent_id = bid.get('agent_id')
+
+        if auction is None or not auction.is_open:
+            reason = 'unknown contract' if auction is None else 'closed'
+        elif auction.closes_at is not None and self.clock() >= auction.closes_at:
+            self._close(auction)
+            reason = 'closed'
+        elif agent_id in auction.bidders:
+            reason = 'duplicate'
+        else:
+            evaluator = auction.evaluator
+            leader = evaluator.leader
+            dropped = evaluator.dropped
+            entered = evaluator.add(bid)
+            if evaluator.dropped == dropped:
+                auction.bidders.add(agent_id)
+                if not auction.sealed and entered is not None and evaluator.leader is not leader:
+                    self._emit({'type': 'leader', 'contract_id': contract_id, 'leader': entered})
+                return True
+            reason = 'unacceptable'
+
+        if self._subscribers:
+            self._emit({'type': 'rejected', 'contract_id': contract_id,
+                        'agent_id': agent_id, 'reason': reason})
+        return False
+
+    def submit_many(self, contract_id, bids: Iterable[Dict]) -> int:
+        """Ingest bids in order; returns how many were accepted."""
+        return sum(self.submit(contract_id, bid) for bid in bids)
+
+    def ingest_comments(self, contract_id, comments: Iterable[Dict]) -> int:
+        """
+        Ingest GitHub issue comments as bids.
+
+        Comments are parsed through the (comment id, updated_at) cache, so
+        re-feeding a whole thread only parses new or edited comments.
+        Comments that are not bids are skipped.
+        """
+        accepted = 0
+        for comment in comments:
+            bid = parse_comment(comment)
+            if 'agent_id' in bid and 'bid_amount' in bid:
+                accepted += self.submit(contract_id, bid)
+        return accepted
+
+    async def consume(self, queue: asyncio.Queue):
+        """
+        Ingest (contract_id, bid) items from a queue until a None item.
+
+        Timed closes fire while waiting, not only when a bid arrives.
+        """
+        while True:
+            timeout = None
+            if self._deadlines:
+                timeout = max(0.0, self._deadlines[0][0] - self.clock())
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                self.tick()
+                continue
+            if item is None:
+                return
+            self.submit(*item)
+
+    def tick(self, now: Optional[float] = None) -> List[Dict]:
+        """Close every auction whose deadline has passed; returns their award events."""
+        now = self.clock() if now is None else now
+        events = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, contract_id = heapq.heappop(self._deadlines)
+            auction = self.auctions.get(contract_id)
+            if auction is not None and auction.is_open:
+                events.append(self._close(auction, now))
+        return events
+
+    def close(self, contract_id) -> Dict:
+        """Close an auction now (sealed-bid close); returns its award event."""
+        auction = self.auctions[contract_id]
+        if not auction.is_open:
+            raise ValueError(f"Contract already closed: {contract_id}")
+        return self._close(auction)
+
+    def is_open(self, contract_id) -> bool:
+        """Whether a contract's auction exists and still takes bids."""
+        auction = self.auctions.get(contract_id)
+        return auction is not None and auction.is_open
+
+    def discard(self, contract_id):
+        """
+        Forget a closed auction; long-running callers discard each one once
+        its award is handled, so the engine holds only open auctions.
+        """
+        auction = self.auctions[contract_id]
+        if auction.is_open:
+            raise ValueError(f"Contract still open: {contract_id}")
+        del self.auctions[contract_id]
+
+    def leader(self, contract_id) -> Optional[Dict]:
+        """Current leader of an open auction, or the winner once closed."""
+        return self.auctions[contract_id].leader
+
+    def _close(self, auction: Auction, now: Optional[float] = None) -> Dict:
+        auction.closed_at = self.clock() if now is None else now
+        evaluator = auction.evaluator
+        top = evaluator.top()
+
+        event = {
+            'type': 'award' if top else 'no_award',
+            'contract_id': auction.contract_id,
+            'bids': evaluator.seen,
+            'dropped': evaluator.dropped,
+            'closed_at': auction.closed_at,
+        }
+        if top:
+            event['winner'] = top[0]
+            event['runners_up'] = top[1:]
+        self._emit(event)
+        return event
+
+
+async def _award_issue(issue_number: int, budget: float, trust_data: Dict) -> Dict:
+    from github_client import GitHubClient
+
+    engine = AuctionEngine(trust_data)
+    engine.open_contract(issue_number, budget, sealed=True)
+    async with GitHubClient.from_env() as client:
+        engine.ingest_comments(issue_number, await client.list_comments(issue_number))
+    return engine.close(issue_number)
+
+
+def main():
+    issue_number = None
+    budget = None
+    requester_id = "dirk-ax"
+
+    for i, arg in enumerate(sys.argv):
+        if arg == "--issue" and i + 1 < len(sys.argv):
+            issue_number = int(sys.argv[i + 1])
+        elif arg == "--budget" and i + 1 < len(sys.argv):
+            budget = float(sys.argv[i + 1])
+        elif arg == "--requester" and i + 1 < len(sys.argv):
+            requester_id = sys.argv[i + 1]
+
+    if issue_number is None or budget is None:
+        print("Usage: python auction_engine.py --issue <number> --budget <amount> [--requester <id>]")
+        sys.exit(1)
+
+    event = asyncio.run(_award_issue(issue_number, budget, load_trust_scores(requester_id)))
+
+    print("="*80)
+    print(f"SEALED-BID AUCTION - ISSUE #{issue_number}")
+    print("="*80)
+    print(f"Bids: {event['bids']} ({event['dropped']} over budget or too risky)")
+    print()
+
+    if event['type'] == 'no_award':
+        print("No acceptable bids - contract not awarded")
+        return
+
+    winner = event['winner']
+    print(f"🏆 {winner['agent_id']} wins at {winner['bid_amount']} TFC "
+          f"(value {winner['value_score']:.1f}/100)")
+    for i, runner_up in enumerate(event['runners_up'], 2):
+        print(f"   #{i} {runner_up['agent_id']} at {runner_up['bid_amount']} TFC "
+              f"(value {runner_up['value_score']:.1f}/100)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Batched NumPy Monte Carlo engine for noisy markets.
+
+Vectorized equivalent of neurips_sensitivity_analysis.simulate_market_with_noise:
+instead of one Python call per (run, query), a whole block of runs is
+simulated at once on (runs x bid slots) matrices, where a bid slot is one
+(query, knowledgeable agent) pair.
+
+Noise is drawn in the same order the per-call path draws it (run, then query,
+then agent, trust noise before bid noise), so for the same seeded RNG both
+paths produce identical winning bids, not just identical distributions.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from bid_scoring import score_bids
+from knowledge_index import KnowledgeIndex
+
+BUDGET = 120
+
+# Upper bound on noise draws held in memory per block (2 per slot per run)
+MAX_BLOCK_DRAWS = 1 << 22
+
+# Bid as a fraction of budget: monopoly, duopoly (base, trust slope),
+# high competition (base, trust slope) - mirrors simulate_bid()
+PRICING_RULES = {
+    'default': (0.9, (0.5, 0.27), (0.5, 0.3)),
+    'aggressive': (0.95, (0.45, 0.25), (0.45, 0.25)),
+    'conservative': (0.85, (0.55, 0.35), (0.55, 0.35)),
+}
+
+
+class MarketLayout:
+    """Flattened bid slots for a fixed set of queries, built once per experiment."""
+
+    def __init__(self, index: KnowledgeIndex, trust_scores: Dict, queries: List[str],
+                 budget: float = BUDGET, default_trust: float = 0.5):
+        self.budget = budget
+        self.queries = [q for q in queries if index.num_holders(q) > 0]
+
+        holders = [index.holders(q) for q in self.queries]
+        self.agents = [agent_id for h in holders for agent_id in h]
+        self.num_agents = np.array([len(h) for h in holders], dtype=np.int64)
+
+        self.base_trust = np.array([
+            trust_scores.get(agent_id, {}).get('score', default_trust)
+            for agent_id in self.agents
+        ], dtype=np.float64)
+
+        # Competitors faced by each slot's agent
+        slot_agents = np.repeat(self.num_agents, self.num_agents)
+        self.is_monopoly = slot_agents == 1
+        self.is_duopoly = slot_agents == 2
+
+        # (queries x max holders) slot matrix, padded with slot 0 and masked
+        width = int(self.num_agents.max()) if len(self.queries) else 0
+        offsets = np.concatenate(([0], np.cumsum(self.num_agents)[:-1]))
+        positions = np.arange(width)
+        self.slot_mask = positions[None, :] < self.num_agents[:, None]
+        self.slot_matrix = np.where(self.slot_mask, offsets[:, None] + positions[None, :], 0)
+
+    @property
+    def num_slots(self) -> int:
+        return len(self.agents)
+
+    def block_runs(self) -> int:
+        """Runs simulated per block under MAX_BLOCK_DRAWS."""
+        return max(1, MAX_BLOCK_DRAWS // max(1, 2 * self.num_slots))
+
+
+def _simulate_block(layout: MarketLayout, runs: int, trust_noise_std: float,
+                    bid_noise_std: float, rng, trust_weight: float, price_weight: float,
+                    strategy: str) -> Dict[str, np.ndarray]:
+    budget = layout.budget
+    monopoly, (duo_base, duo_slope), (comp_base, comp_slope) = PRICING_RULES[strategy]
+    noise = rng.standard_normal((runs, layout.num_slots, 2))
+
+    trust = layout.base_trust + trust_noise_std * noise[:, :, 0]
+    trust = np.clip(trust, 0, 1)
+
+    # Monopoly / duopoly / competition pricing rule
+    bid = np.where(
+        layout.is_monopoly, budget * monopoly,
+        np.where(layout.is_duopoly,
+                 budget * (duo_base + duo_slope * trust),
+                 budget * (comp_base + comp_slope * trust))
+    )
+    bid = bid + bid_noise_std * noise[:, :, 1]
+    bid = np.clip(bid, 0, budget)
+
+    value = score_bids(trust, bid, budget, weights=(trust_weight, price_weight, 0.0),
+                       reject_invalid=False)['value_score']
+
+    # Winner selection per query: argmax over each query's (padded) slots
+    value = np.where(layout.slot_mask, value[:, layout.slot_matrix], -np.inf)
+    winner = np.argmax(value, axis=2)
+    winner_slot = np.take_along_axis(layout.slot_matrix[None, :, :], winner[:, :, None], axis=2)[:, :, 0]
+
+    return {
+        'winning_bid': np.take_along_axis(bid, winner_slot, axis=1),
+        'winner_slot': winner_slot,
+        'winner_trust': np.take_along_axis(trust, winner_slot, axis=1),
+    }
+
+
+def iter_market_blocks(layout: MarketLayout, runs: int, trust_noise_std: float = 0.0,
+                       bid_noise_std: float = 0.0, rng=None,
+                       block_runs: Optional[int] = None, trust_weight: float = 0.6,
+                       price_weight: float = 0.4,
+                       strategy: str = 'default') -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Simulate `runs` noisy markets over every query in the layout, block by block.
+
+    Yields dicts with (block runs x queries) arrays:
+        winning_bid: winning bid amount
+        winner_slot: index into layout.agents of the winning agent
+        winner_trust: the winner's (noisy) trust score
+
+    Args:
+        rng: anything with standard_normal() - np.random (default, global
+             state), a RandomState or a Generator
+        block_runs: runs per block, defaults to layout.block_runs()
+        strategy: bidding strategy, a key of PRICING_RULES
+    """
+    if strategy not in PRICING_RULES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    rng = np.random if rng is None else rng
+    block_runs = block_runs or layout.block_runs()
+
+    done = 0
+    while done < runs:
+        n = min(block_runs, runs - done)
+        yield _simulate_block(layout, n, trust_noise_std, bid_noise_std, rng,
+                              trust_weight, price_weight, strategy)
+        done += n
+
+
+def simulate_markets(layout: MarketLayout, runs: int, trust_noise_std: float = 0.0,
+                     bid_noise_std: float = 0.0, rng=None, **rule) -> Dict[str, np.ndarray]:
+    """Simulate `runs` noisy markets and return full (runs x queries) arrays."""
+    blocks = list(iter_market_blocks(layout, runs, trust_noise_std, bid_noise_std, rng, **rule))
+    if not blocks:
+        return {
+            'winning_bid': np.empty((0, len(layout.queries))),
+            'winner_slot': np.empty((0, len(layout.queries)), dtype=np.int64),
+            'winner_trust': np.empty((0, len(layout.queries))),
+        }
+    return {key: np.concatenate([b[key] for b in blocks]) for key in blocks[0]}
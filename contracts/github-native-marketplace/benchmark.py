@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the marketplace core, with a regression gate.
+
+Usage:
+    python benchmark.py --scales 10,1000,100000 --save    # record a baseline
+    python benchmark.py --scales 10,1000,100000           # compare, exit 1 on regression
+    python benchmark.py --scales 1000 --only evaluate_bids --threshold 0.5
+
+Entry points are run on synthetic markets where `scale` is the number of
+agents (and of bids per evaluate_bids call), from 10 up to 10^6. Each agent
+knows a few queries out of scale/10, so markets get deeper as scale grows.
+Reports per-call p50/p99 latency and throughput (items per second).
+
+A run fails when an entry point's p50 exceeds the baseline p50 by more than
+the threshold (default 25%). Baselines are machine-specific: record them
+on the machine that runs the gate.
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+BASELINE_FILE = Path(__file__).parent / "benchmark_baseline.json"
+DEFAULT_SCALES = [10, 1000, 100000]
+DEFAULT_THRESHOLD = 0.25
+BUDGET = 120
+
+QUERIES_PER_AGENT = 5
+JOBS_PER_AGENT = 4
+
+# Per entry point: stop after MIN_TIME seconds once MIN_CALLS are done
+MIN_CALLS = 5
+MAX_CALLS = 2000
+MIN_TIME = 1.0
+
+
+def generate_knowledge(num_agents: int, rng: np.random.Generator,
+                       queries_per_agent: int = QUERIES_PER_AGENT) -> Dict:
+    """
+    Synthetic agent_knowledge_bases.json document.
+
+    Query IDs are numeric (QueryParser only follows numeric chains) and every
+    response is another query ID, so recursive queries resolve through
+    several agents.
+    """
+    num_queries = max(10, num_agents // 10)
+    known = rng.integers(0, num_queries, size=(num_agents, queries_per_agent))
+    responses = rng.integers(0, num_queries, size=(num_agents, queries_per_agent))
+
+    return {
+        'agents': {
+            f"Agent_{a}": {
+                'knowledge': {str(q): str(r) for q, r in zip(known[a], responses[a])}
+            }
+            for a in range(num_agents)
+        }
+    }
+
+
+def generate_trust(agent_ids: List[str], rng: np.random.Generator,
+                   jobs_per_agent: int = JOBS_PER_AGENT, known_fraction: float = 0.8) -> Dict:
+    """Synthetic requester_trust_scores.json document; some agents are unknown."""
+    trust_scores = {}
+    for agent_id in agent_ids:
+        if rng.random() >= known_fraction:
+            continue
+        num_jobs = int(rng.integers(1, jobs_per_agent + 1))
+        quality = rng.uniform(0.3, 1.0, num_jobs)
+        speed = rng.uniform(0.3, 1.0, num_jobs)
+        trust_scores[agent_id] = {
+            'score': round(float((quality.mean() + speed.mean()) / 2), 2),
+            'based_on_jobs': num_jobs,
+            'avg_quality': round(float(quality.mean()), 2),
+            'avg_speed': round(float(speed.mean()), 2),
+            'jobs': [
+                {'query_id': f"Q_SYN_{j}", 'quality': round(float(q), 2), 'speed': round(float(s), 2),
+                 'paid': int(rng.integers(20, BUDGET)), 'date': '2025-10-15T10:00:00Z'}
+                for j, (q, s) in enumerate(zip(quality, speed))
+            ],
+            'notes': 'Synthetic'
+        }
+
+    return {
+        'requester_id': 'benchmark',
+        'trust_scores': trust_scores,
+        'risk_policy': {'min_jobs_for_full_trust': 3, 'max_budget_for_unknown': 50}
+    }
+
+
+def generate_bids(agent_ids: List[str], rng: np.random.Generator, budget: float = BUDGET) -> List[Dict]:
+    """One bid per agent; a few exceed the budget."""
+    amounts = rng.uniform(0.3 * budget, 1.1 * budget, len(agent_ids))
+    return [
+        {'agent_id': agent_id, 'bid_amount': round(float(amount), 2),
+         'capability_passed': bool(rng.random() < 0.9)}
+        for agent_id, amount in zip(agent_ids, amounts)
+    ]
+
+
+class SyntheticMarket:
+    """Everything the entry points need at one scale, generated once."""
+
+    def __init__(self, scale: int, seed: int = 0):
+        from knowledge_index import KnowledgeIndex
+
+        rng = np.random.default_rng(seed)
+        self.scale = scale
+        self.knowledge = generate_knowledge(scale, rng)
+        self.agent_ids = list(self.knowledge['agents'])
+        self.index = KnowledgeIndex.from_knowledge(self.knowledge)
+        self.trust_data = generate_trust(self.agent_ids, rng)
+        self.bids = generate_bids(self.agent_ids, rng)
+        self.queries = list(self.index.queries)
+        self.rng = rng
+
+    def random_query(self) -> str:
+        return self.queries[int(self.rng.integers(len(self.queries)))]
+
+
+def _analyze_contract_case(market: SyntheticMarket, workdir: str):
+    from agents.agent_subcontracting import (
+        AgentKnowledge, ProfitLedger, QueryResolver, SubcontractingAgent
+    )
+
+    knowledge_bases = [
+        AgentKnowledge(agent_id, data['knowledge'])
+        for agent_id, data in market.knowledge['agents'].items()
+    ]
+    ledger_path = Path(workdir) / "benchmark_ledger.json"
+    ledger_path.write_text(json.dumps({'agents': {}}))
+    ledger = ProfitLedger(str(ledger_path))
+    agent = SubcontractingAgent(knowledge_bases[0], ledger, QueryResolver(knowledge_bases))
+
+    # Contracts this agent can start: 1- to 4-hop queries rooted in its knowledge
+    roots = list(agent.knowledge.knowledge)
+    contracts = [
+        f"What is {'response[' * depth}{root}{']' * depth}?"
+        for root in roots for depth in range(1, 5)
+    ]
+    position = [0]
+
+    def call():
+        query = contracts[position[0] % len(contracts)]
+        position[0] += 1
+        agent.analyze_contract(query, BUDGET)
+
+    return call, 1
+
+
+def _evaluate_bids_case(market: SyntheticMarket, workdir: str):
+    import evaluate_bids
+
+    def call():
+        evaluate_bids.evaluate_bids(market.bids, market.trust_data, BUDGET)
+
+    return call, len(market.bids)
+
+
+def _select_top_bids_case(market: SyntheticMarket, workdir: str):
+    import evaluate_bids
+
+    def call():
+        evaluate_bids.select_top_bids(market.bids, market.trust_data, BUDGET)
+
+    return call, len(market.bids)
+
+
+def _run_single_query_case(market: SyntheticMarket, workdir: str):
+    import neurips_comprehensive_analysis as analysis
+
+    trust_scores = market.trust_data['trust_scores']
+
+    def call():
+        analysis.run_single_query(market.random_query(), knowledge_index=market.index,
+                                  trust_scores=trust_scores)
+
+    return call, 1
+
+
+def _simulate_market_with_noise_case(market: SyntheticMarket, workdir: str):
+    import neurips_sensitivity_analysis as sensitivity
+
+    trust_scores = market.trust_data['trust_scores']
+    rng = np.random.default_rng(0)
+
+    def call():
+        sensitivity.simulate_market_with_noise(market.random_query(), 0.1, 10.0, rng=rng,
+                                               knowledge_index=market.index,
+                                               trust_scores=trust_scores)
+
+    return call, 1
+
+
+# name -> factory(market, workdir) returning (call, items per call)
+ENTRY_POINTS = {
+    'analyze_contract': _analyze_contract_case,
+    'evaluate_bids': _evaluate_bids_case,
+    'select_top_bids': _select_top_bids_case,
+    'run_single_query': _run_single_query_case,
+    'simulate_market_with_noise': _simulate_market_with_noise_case,
+}
+
+
+def time_calls(call: Callable[[], None], items_per_call: int,
+               min_calls: int = MIN_CALLS, max_calls: int = MAX_CALLS,
+               min_time: float = MIN_TIME) -> Dict:
+    """Time repeated calls; returns p50/p99 latency (ms), throughput and call count."""
+    call()  # warm caches and lazy imports outside the measurement
+
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < max_calls:
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+        if len(latencies) >= min_calls and time.perf_counter() - start >= min_time:
+            break
+
+    latencies = np.array(latencies)
+    return {
+        'calls': len(latencies),
+        'items_per_call': items_per_call,
+        'p50_ms': float(np.percentile(latencies, 50) * 1e3),
+        'p99_ms': float(np.percentile(latencies, 99) * 1e3),
+        'throughput': float(items_per_call * len(latencies) / latencies.sum()),
+    }
+
+
+def run_benchmarks(scales: List[int], only: Optional[List[str]] = None, seed: int = 0) -> Dict:
+    """Results as {scale: {entry point: timings}} (scale keys are strings, as in JSON)."""
+    names = only or list(ENTRY_POINTS)
+    unknown = set(names) - set(ENTRY_POINTS)
+    if unknown:
+        raise ValueError(f"Unknown entry points: {sorted(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in scales:
+            market = SyntheticMarket(scale, seed)
+            results[str(scale)] = {}
+            for name in names:
+                call, items = ENTRY_POINTS[name](market, workdir)
+                results[str(scale)][name] = time_calls(call, items)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Regressions of p50 latency beyond threshold, as human-readable lines."""
+    regressions = []
+    for scale, entries in results.items():
+        for name, timing in entries.items():
+            reference = baseline.get(scale, {}).get(name)
+            if reference is None:
+                continue
+            ratio = timing['p50_ms'] / reference['p50_ms'] if reference['p50_ms'] else 1.0
+            if ratio > 1.0 + threshold:
+                regressions.append(
+                    f"{name} @ scale {scale}: p50 {timing['p50_ms']:.3f} ms vs "
+                    f"baseline {reference['p50_ms']:.3f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def display_results(results: Dict, baseline: Dict):
+    print(f"{'Entry point':<28} {'Scale':>8} {'p50 ms':>10} {'p99 ms':>10} {'items/s':>12} {'vs base':>8}")
+    print("-" * 80)
+    for scale, entries in results.items():
+        for name, timing in entries.items():
+            reference = baseline.get(scale, {}).get(name)
+            change = f"{timing['p50_ms'] / reference['p50_ms']:.2f}x" if reference and reference['p50_ms'] else "-"
+            print(f"{name:<28} {scale:>8} {timing['p50_ms']:>10.3f} {timing['p99_ms']:>10.3f} "
+                  f"{timing['throughput']:>12.0f} {change:>8}")
+
+
+def main():
+    scales = DEFAULT_SCALES
+    only = None
+    threshold = DEFAULT_THRESHOLD
+    baseline_path = BASELINE_FILE
+    save = False
+
+    for i, arg in enumerate(sys.argv):
+        if arg == "--scales" and i + 1 < len(sys.argv):
+            scales = [int(s) for s in sys.argv[i + 1].split(',')]
+        elif arg == "--only" and i + 1 < len(sys.argv):
+            only = sys.argv[i + 1].split(',')
+        elif arg == "--threshold" and i + 1 < len(sys.argv):
+            threshold = float(sys.argv[i + 1])
+        elif arg == "--baseline" and i + 1 < len(sys.argv):
+            baseline_path = Path(sys.argv[i + 1])
+        elif arg == "--save":
+            save = True
+
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    print("="*80)
+    print(f"MARKETPLACE BENCHMARKS (scales={scales})")
+    print("="*80)
+    print()
+
+    results = run_benchmarks(scales, only)
+    display_results(results, {} if save else baseline)
+    print()
+
+    if save:
+        # Merge so a partial run (--only, fewer scales) keeps other baselines
+        for scale, entries in results.items():
+            baseline.setdefault(scale, {}).update(entries)
+        with open(baseline_path, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to: {baseline_path}")
+        return
+
+    regressions = compare(results, baseline, threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"✅ No regressions beyond {threshold:.0%}" if baseline else "No baseline to compare against (use --save)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Value scoring for bids - the one place the trust/price weighting lives.
+
+    value = (trust * w_trust + (1 - price / budget) * w_price + risk * w_risk) * 100
+
+Requesters (evaluate_bids) weight trust/price/risk 0.6/0.3/0.1 and score
+over-budget or zero-price bids 0. The NeurIPS market simulations weight
+trust/price 0.6/0.4 with no risk term and score every bid.
+
+score_bids() is the batch kernel: it takes columns of trust, price, budget
+and risk penalty and returns the scores and the over-budget / zero-price
+masks in one vectorized pass. It uses NumPy when available (any array
+shape, e.g. runs x bids) and falls back to array.array for flat sequences.
+NumPy is imported on the first batch, not with this module.
+value_score() is the scalar form for one bid at a time.
+"""
+
+from array import array
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+# (trust, price, risk) weights
+REQUESTER_WEIGHTS = (0.6, 0.3, 0.1)
+MARKET_WEIGHTS = (0.6, 0.4, 0.0)
+
+Column = Union[float, Sequence[float]]
+
+
+def _numpy():
+    """NumPy, or None when it is not installed (optional for requesters)."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
+
+
+def market_weights(trust_weight: float = 0.6, price_weight: Optional[float] = None) -> Tuple[float, float, float]:
+    """Simulation weights; price weight defaults to 1 - trust weight."""
+    return (trust_weight, 1.0 - trust_weight if price_weight is None else price_weight, 0.0)
+
+
+def value_score(trust: float, price: float, budget: float, risk_penalty: float = 1.0,
+                weights: Tuple[float, float, float] = REQUESTER_WEIGHTS,
+                reject_invalid: bool = True) -> float:
+    """
+    Value score for one bid (higher is better, 0-100).
+
+    With reject_invalid, over-budget and zero-price bids score 0.0.
+    """
+    if reject_invalid and (price > budget or price == 0):
+        return 0.0
+
+    trust_weight, price_weight, risk_weight = weights
+    score = trust * trust_weight + (1.0 - price / budget) * price_weight
+    if risk_weight:
+        score = score + risk_penalty * risk_weight
+    return score * 100
+
+
+def score_bids(trust: Column, price: Column, budget: Column, risk_penalty: Column = 1.0,
+               weights: Tuple[float, float, float] = REQUESTER_WEIGHTS,
+               reject_invalid: bool = True) -> Dict:
+    """
+    Score a batch of bids.
+
+    Any argument may be a scalar or a column; columns must broadcast together.
+
+    Returns dict with:
+        value_score: scores (0.0 for invalid bids when reject_invalid)
+        over_budget: price > budget
+        zero_price: price == 0
+    """
+    np = _numpy()
+    if np is None:
+        return _score_bids_fallback(trust, price, budget, risk_penalty, weights, reject_invalid)
+
+    trust = np.asarray(trust, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    budget = np.asarray(budget, dtype=np.float64)
+    trust_weight, price_weight, risk_weight = weights
+
+    over_budget = price > budget
+    zero_price = price == 0
+
+    score = trust * trust_weight + (1.0 - price / budget) * price_weight
+    if risk_weight:
+        score = score + np.asarray(risk_penalty, dtype=np.float64) * risk_weight
+    score = score * 100
+
+    if reject_invalid:
+        score = np.where(over_budget | zero_price, 0.0, score)
+
+    return {'value_score': score, 'over_budget': over_budget, 'zero_price': zero_price}
+
+
+def _score_bids_fallback(trust, price, budget, risk_penalty, weights, reject_invalid) -> Dict:
+    """Pure-Python score_bids over flat sequences; returns array.array columns."""
+    columns = (trust, price, budget, risk_penalty)
+    n = max((len(c) for c in columns if isinstance(c, (list, tuple, array))), default=1)
+    trust, price, budget, risk_penalty = (
+        c if isinstance(c, (list, tuple, array)) else [c] * n for c in columns
+    )
+
+    scores = array('d')
+    over_budget = array('b')
+    zero_price = array('b')
+    for t, p, b, r in zip(trust, price, budget, risk_penalty):
+        over_budget.append(p > b)
+        zero_price.append(p == 0)
+        scores.append(value_score(t, p, b, r, weights, reject_invalid))
+
+    return {'value_score': scores, 'over_budget': over_budget, 'zero_price': zero_price}
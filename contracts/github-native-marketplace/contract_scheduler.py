@@ -0,0 +1,120 @@
+"""
+(issue x agent) contract analysis for run_agents.
+
+ContractScheduler builds one SubcontractingAgent per agent up front and
+analyzes every open issue with every agent. Results come back as one
+IssuePlan per issue, in issue order with strategies in agent order, however
+the work was split, so output is deterministic.
+
+Analysis is pure Python and cheap (about 1 µs per pair with warm parse
+caches), so by default it runs in-process. With workers > 1 issues are cut
+into chunks and fanned out over a ProcessPoolExecutor, each worker building
+its agents once; that pays off only for rounds large enough to cover the
+pool start-up, e.g. with multi-hop resolution over big knowledge bases.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from agents.agent_subcontracting import AgentKnowledge, ProfitLedger, SubcontractingAgent
+from marketplace_parsing import parse_issue_body
+
+DEFAULT_CHUNK_SIZE = 64
+
+# Per-process agents, built by the pool initializer
+_worker_agents: Dict[str, SubcontractingAgent] = {}
+
+
+class IssuePlan:
+    """One issue's parsed contract and every agent's strategy for it."""
+
+    __slots__ = ('number', 'title', 'query', 'budget', 'strategies')
+
+    def __init__(self, number, title: str, query: Optional[str], budget: Optional[float],
+                 strategies: List[Tuple[str, Dict]]):
+        self.number = number
+        self.title = title
+        self.query = query
+        self.budget = budget
+        self.strategies = strategies
+
+    @property
+    def error(self) -> Optional[str]:
+        """Why the issue could not be analyzed, if it could not."""
+        if not self.query:
+            return "Could not extract query"
+        if self.budget is None:
+            return "Could not extract budget"
+        return None
+
+    def bids(self) -> List[Tuple[str, str, str]]:
+        """(agent_id, amount, strategy note) for every agent that bids, in agent order."""
+        bids = []
+        for agent_id, strategy in self.strategies:
+            if strategy['action'] == 'bid_directly':
+                bids.append((agent_id, f"{strategy['bid_amount']:.2f}",
+                             "Direct knowledge - can solve immediately"))
+            elif strategy['action'] == 'subcontract':
+                bids.append((agent_id, f"{self.budget * 0.9:.2f}",
+                             f"Will subcontract for {strategy['subcontract_query']} to complete"))
+        return bids
+
+
+def analyze_issue(issue: Dict, agents: Dict[str, SubcontractingAgent]) -> IssuePlan:
+    """Parse one issue's contract and have every agent analyze it."""
+    contract = parse_issue_body(issue['body'])
+    plan = IssuePlan(issue['number'], issue['title'], contract['query'], contract['budget'], [])
+    if plan.error is None:
+        plan.strategies = [
+            (agent_id, agent.analyze_contract(plan.query, plan.budget))
+            for agent_id, agent in agents.items()
+        ]
+    return plan
+
+
+def _init_worker(knowledge: Dict[str, Dict[str, str]]):
+    # analyze_contract never touches the ledger, so workers run without one
+    # rather than each opening the ledger file
+    _worker_agents.clear()
+    for agent_id, agent_knowledge in knowledge.items():
+        _worker_agents[agent_id] = SubcontractingAgent(AgentKnowledge(agent_id, agent_knowledge), None)
+
+
+def _analyze_chunk(issues: List[Dict]) -> List[IssuePlan]:
+    """Worker entry point: one chunk of issues, every agent."""
+    return [analyze_issue(issue, _worker_agents) for issue in issues]
+
+
+class ContractScheduler:
+    """Analyzes issues with a fixed set of agents, built once."""
+
+    def __init__(self, agents: Dict[str, AgentKnowledge], ledger: ProfitLedger,
+                 workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            agents: {agent_id: AgentKnowledge}, in the order strategies are reported
+            workers: analysis processes; 1 analyzes in-process, None uses every CPU
+            chunk_size: issues per worker task
+        """
+        self.knowledge = agents
+        self.agents = {
+            agent_id: SubcontractingAgent(knowledge, ledger)
+            for agent_id, knowledge in agents.items()
+        }
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def analyze(self, issues: List[Dict]) -> List[IssuePlan]:
+        """One IssuePlan per issue, in issue order."""
+        if self.workers == 1 or len(issues) <= self.chunk_size:
+            return [analyze_issue(issue, self.agents) for issue in issues]
+
+        chunks = [issues[i:i + self.chunk_size] for i in range(0, len(issues), self.chunk_size)]
+        workers = min(self.workers or os.cpu_count() or 1, len(chunks))
+        knowledge = {agent_id: k.knowledge for agent_id, k in self.knowledge.items()}
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(knowledge,)) as executor:
+            # map() yields in submission order, so the result order is fixed
+            return [plan for chunk in executor.map(_analyze_chunk, chunks) for plan in chunk]
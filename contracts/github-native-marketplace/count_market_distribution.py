@@ -1,40 +1,25 @@
 #!/usr/bin/env python3
 """Count actual market distribution from agent knowledge bases."""
 
-import json
+import data_loader
 
-with open('agent_knowledge_bases.json') as f:
-    data = json.load(f)
-
-with open('master_query_database.json') as f:
-    master = json.load(f)
+data = data_loader.knowledge()
+master = data_loader.master_db()
+index = data_loader.knowledge_index()
 
 # Get all queries
 all_queries = set(master['queries'].keys())
 
-# Count agents per query
-query_counts = {}
-for agent_id, agent_data in data['agents'].items():
-    for query_id in agent_data['knowledge'].keys():
-        if query_id not in query_counts:
-            query_counts[query_id] = []
-        query_counts[query_id].append(agent_id)
-
 # Categorize by competition level
 monopoly = []  # 1 agent
 duopoly = []   # 2 agents
 high_comp = [] # 3+ agents
+by_market_type = {'monopoly': monopoly, 'duopoly': duopoly, 'high_competition': high_comp}
 
 for query_id in all_queries:
-    agents = query_counts.get(query_id, [])
-    num_agents = len(agents)
-
-    if num_agents == 1:
-        monopoly.append((query_id, agents))
-    elif num_agents == 2:
-        duopoly.append((query_id, agents))
-    elif num_agents >= 3:
-        high_comp.append((query_id, agents))
+    market_type = index.market_type(query_id)
+    if market_type:
+        by_market_type[market_type].append((query_id, list(index.holders(query_id))))
 
 print("="*80)
 print("MARKET DISTRIBUTION (Corrected)")
@@ -75,7 +60,7 @@ errors = []
 
 for query_key, listed_agents in comp_analysis.items():
     query_id = query_key.split('_')[0]
-    actual_agents = query_counts.get(query_id, [])
+    actual_agents = list(index.holders(query_id))
 
     listed_set = set(listed_agents)
     actual_set = set(actual_agents)
@@ -83,7 +68,7 @@ for query_key, listed_agents in comp_analysis.items():
     if listed_set != actual_set:
         errors.append({
             'query': query_id,
-            'listed': listed_agents,
+            'listed': list(listed_agents),
             'actual': actual_agents,
             'missing': list(actual_set - listed_set),
             'extra': list(listed_set - actual_set)
@@ -0,0 +1,211 @@
+"""
+Cached loaders for the marketplace data files.
+
+Every script used to open and parse master_query_database.json,
+agent_knowledge_bases.json and requester_trust_scores.json itself, at
+import time or once per call. DataLoader parses each file once per process
+and keeps the result keyed by path; each load re-checks the file's mtime
+and size (one stat) and re-parses only when the file changed, so a
+long-running agent picks up trust-score edits without a restart and does
+not re-parse unchanged files every round.
+
+Loaded documents are read-only views (dicts become MappingProxyType, lists
+become tuples) shared by every caller; use thaw() for a mutable copy.
+
+With sidecar=True (or MARKETPLACE_DATA_SIDECAR=1 for the default loader)
+the parsed document is also pickled to __datacache__/<name>.pickle next to
+the file, so a fresh process loads it without parsing JSON. A sidecar is
+only used while it matches the file's mtime and size.
+
+Relative names are looked up next to this module, not in the current
+directory.
+"""
+
+import json
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Optional, Tuple, Union
+
+DATA_DIR = Path(__file__).parent
+SIDECAR_DIR = "__datacache__"
+
+MASTER_DB_FILE = "master_query_database.json"
+KNOWLEDGE_FILE = "agent_knowledge_bases.json"
+TRUST_FILE = "requester_trust_scores.json"
+
+
+def freeze(value):
+    """Deep read-only view: dicts -> MappingProxyType, lists -> tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Mutable deep copy of a frozen document (plain dicts and lists)."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class DataLoader:
+    """Per-process cache of parsed JSON files, invalidated by mtime and size."""
+
+    def __init__(self, directory: Union[str, Path] = DATA_DIR, sidecar: bool = False):
+        self.directory = Path(directory)
+        self.sidecar = sidecar
+        self._documents: Dict[Path, Tuple[Tuple[int, int], object]] = {}
+        self._derived: Dict[Tuple[str, Path], Tuple[object, object]] = {}
+        self._lock = threading.Lock()
+        self.parses = 0  # files actually read (JSON or sidecar), for tests and stats
+
+    def path(self, name: Union[str, Path]) -> Path:
+        return self.directory / name
+
+    def load(self, name: Union[str, Path]):
+        """Read-only view of a JSON file, re-read only when it has changed."""
+        path = self.path(name)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._documents.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._documents.get(path)
+            if cached is None or cached[0] != version:
+                cached = (version, freeze(self._read(path, version)))
+                self._documents[path] = cached
+                self.parses += 1
+            return cached[1]
+
+    def derive(self, name: Union[str, Path], build: Callable, key: str = None):
+        """
+        build(document) for a file, cached until the file changes.
+
+        For structures computed from a document (e.g. the knowledge index);
+        `key` tells apart several builders over the same file.
+        """
+        document = self.load(name)
+        slot = (key or getattr(build, '__qualname__', repr(build)), self.path(name))
+        cached = self._derived.get(slot)
+        if cached is not None and cached[0] is document:
+            return cached[1]
+
+        value = build(document)
+        self._derived[slot] = (document, value)
+        return value
+
+    def invalidate(self, name: Optional[Union[str, Path]] = None):
+        """Forget one file (or everything); the next load re-reads it."""
+        with self._lock:
+            if name is None:
+                self._documents.clear()
+                self._derived.clear()
+                return
+            path = self.path(name)
+            self._documents.pop(path, None)
+            for slot in [slot for slot in self._derived if slot[1] == path]:
+                del self._derived[slot]
+
+    def _sidecar_path(self, path: Path) -> Path:
+        return path.parent / SIDECAR_DIR / (path.name + ".pickle")
+
+    def _read(self, path: Path, version: Tuple[int, int]):
+        if self.sidecar:
+            document = self._read_sidecar(path, version)
+            if document is not None:
+                return document
+
+        with open(path) as f:
+            document = json.load(f)
+
+        if self.sidecar:
+            self._write_sidecar(path, version, document)
+        return document
+
+    def _read_sidecar(self, path: Path, version: Tuple[int, int]):
+        try:
+            with open(self._sidecar_path(path), 'rb') as f:
+                sidecar_version, document = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        return document if sidecar_version == version else None
+
+    def _write_sidecar(self, path: Path, version: Tuple[int, int], document):
+        """Best effort: a read-only data directory just means no sidecar."""
+        sidecar = self._sidecar_path(path)
+        try:
+            sidecar.parent.mkdir(exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=sidecar.parent, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((version, document), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar)
+        except OSError:
+            pass
+
+
+_default = DataLoader(sidecar=os.environ.get("MARKETPLACE_DATA_SIDECAR") == "1")
+
+
+def default_loader() -> DataLoader:
+    """The process-wide loader used by the functions below."""
+    return _default
+
+
+def load_json(name: Union[str, Path]):
+    """Read-only view of a data file, re-read only when it has changed."""
+    return _default.load(name)
+
+
+def master_db():
+    """master_query_database.json"""
+    return _default.load(MASTER_DB_FILE)
+
+
+def knowledge():
+    """agent_knowledge_bases.json"""
+    return _default.load(KNOWLEDGE_FILE)
+
+
+def trust_data():
+    """requester_trust_scores.json"""
+    return _default.load(TRUST_FILE)
+
+
+def knowledge_index(name: Union[str, Path] = KNOWLEDGE_FILE):
+    """KnowledgeIndex over a knowledge file, rebuilt only when the file changes."""
+    from knowledge_index import KnowledgeIndex
+
+    return _default.derive(name, KnowledgeIndex.from_knowledge)
+
+
+# Module attributes the analysis scripts used to define at import time
+LEGACY_ATTRIBUTES = {
+    'master_db': master_db,
+    'knowledge': knowledge,
+    'trust_data': trust_data,
+    'index': knowledge_index,
+}
+
+
+def legacy_attribute(module_name: str, name: str):
+    """
+    Module __getattr__ body for the old data globals.
+
+    `analysis.index` and friends keep working for callers, but are loaded
+    on first access rather than on import.
+    """
+    loader = LEGACY_ATTRIBUTES.get(name)
+    if loader is None:
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+    return loader()
@@ -1,15 +1,12 @@
 #!/usr/bin/env python3
 """Quick demo of Q112 competition (3 agents know the answer)."""
 
-import json
+import data_loader
 
 # Load data
-with open('master_query_database.json') as f:
-    master_db = json.load(f)
-with open('agent_knowledge_bases.json') as f:
-    knowledge = json.load(f)
-with open('requester_trust_scores.json') as f:
-    trust_data = json.load(f)
+master_db = data_loader.master_db()
+knowledge = data_loader.knowledge()
+trust_data = data_loader.trust_data()
 
 query_id = "Q112"
 budget = 120
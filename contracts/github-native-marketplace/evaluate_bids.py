@@ -8,37 +8,60 @@ Usage:
 Helps requesters evaluate agent bids using their trust scores.
 """
 
-import json
+import heapq
 import sys
-from pathlib import Path
+import warnings
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import marketplace_parsing
+import trust_engine
+import trust_store
+from bid_scoring import score_bids, value_score
+from marketplace_records import Evaluation
 
-def load_trust_scores(requester_id: str = "dirk-ax") -> Dict:
-    """Load requester's trust assessments."""
-    trust_file = Path(__file__).parent / "requester_trust_scores.json"
-    with open(trust_file) as f:
-        data = json.load(f)
-    return data if data["requester_id"] == requester_id else {"trust_scores": {}}
 
+def trust_source(requester_id: str):
+    """
+    The one TrustEngine serving (and recording for) a requester, or None.
 
-def parse_bid(comment_body: str) -> Dict:
-    """Parse bid from GitHub issue comment."""
-    lines = comment_body.split("\n")
-    bid = {}
+    A requester with a shard in the trust store is served from the shard
+    alone, so jobs recorded through TrustStore.record are seen; others
+    fall back to the engine over requester_trust_scores.json.
+    """
+    engine = trust_store.default_store().engine(requester_id)
+    if engine is not None:
+        return engine
+    engine = trust_engine.default_engine()
+    return engine if requester_id in engine.requesters() else None
+
+
+def load_trust_scores(requester_id: str = "dirk-ax", db_path: Optional[str] = None) -> Dict:
+    """
+    Load requester's trust assessments (from a marketplace store if given).
+
+    Otherwise scores come from the requester's trust_source(), seeded from
+    its JSON document plus jobs recorded since; job lists are not
+    included. An unknown requester gets a warning and no scores, so every
+    agent is scored as unknown.
+    """
+    if db_path:
+        from marketplace_store import MarketplaceStore
+        with MarketplaceStore(db_path) as store:
+            if requester_id not in store.requester_ids():
+                warnings.warn(f"No trust scores for requester {requester_id!r} in {db_path}")
+            return store.trust_data(requester_id)
 
-    for line in lines:
-        if line.startswith("**Agent ID:**"):
-            bid["agent_id"] = line.split(":**")[1].strip()
-        elif line.startswith("**Bid Amount:**"):
-            amount_str = line.split(":**")[1].strip().replace(" TFC", "")
-            bid["bid_amount"] = float(amount_str)
-        elif '"test_response"' in line:
-            # Capability challenge passed (present in bid)
-            bid["capability_passed"] = True
+    engine = trust_source(requester_id)
+    if engine is None:
+        warnings.warn(f"No trust scores for requester {requester_id!r}")
+        return {"trust_scores": {}}
+    return engine.trust_data(requester_id)
 
-    return bid
+
+def parse_bid(comment_body: str) -> Dict:
+    """Parse bid from GitHub issue comment."""
+    return marketplace_parsing.parse_bid(comment_body)
 
 
 def compute_value_score(trust: float, price: float, budget: float, risk_penalty: float = 1.0) -> float:
@@ -54,31 +77,25 @@ def compute_value_score(trust: float, price: float, budget: float, risk_penalty:
     Returns:
         Value score (higher is better)
     """
-    if price > budget or price == 0:
-        return 0.0
+    return value_score(trust, price, budget, risk_penalty)
 
-    # Quality per TFC
-    quality_per_tfc = trust / price if trust > 0 else 0.0
 
-    # Normalize price (prefer lower prices within budget)
-    price_score = 1.0 - (price / budget)
+def _risk_penalty(jobs_done: int, bid_amount: float, risk_policy: Dict) -> float:
+    """Penalty for agents with little history; 0.0 means too risky."""
+    # Risk penalty for unknown agents
+    min_jobs = risk_policy.get("min_jobs_for_full_trust", 3)
+    risk_penalty = min(1.0, jobs_done / min_jobs) if jobs_done < min_jobs else 1.0
 
-    # Combined score
-    TRUST_WEIGHT = 0.6
-    PRICE_WEIGHT = 0.3
-    RISK_WEIGHT = 0.1
+    # Unknown agent budget cap
+    max_unknown = risk_policy.get("max_budget_for_unknown", 50)
+    if jobs_done == 0 and bid_amount > max_unknown:
+        risk_penalty = 0.0  # Too risky
 
-    score = (
-        trust * TRUST_WEIGHT +
-        price_score * PRICE_WEIGHT +
-        risk_penalty * RISK_WEIGHT
-    )
-
-    return score * 100  # Scale to 0-100
+    return risk_penalty
 
 
 def evaluate_bids(bids: List[Dict], trust_data: Dict, budget: float) -> List[Dict]:
-    """Evaluate all bids using requester's trust scores."""
+    """Evaluate all bids using requester's trust scores (best first)."""
     trust_scores = trust_data.get("trust_scores", {})
     risk_policy = trust_data.get("risk_policy", {})
 
@@ -94,17 +111,7 @@ def evaluate_bids(bids: List[Dict], trust_data: Dict, budget: float) -> List[Dic
         trust_score = trust_info.get("score", 0.0)
         jobs_done = trust_info.get("based_on_jobs", 0)
 
-        # Risk penalty for unknown agents
-        min_jobs = risk_policy.get("min_jobs_for_full_trust", 3)
-        risk_penalty = min(1.0, jobs_done / min_jobs) if jobs_done < min_jobs else 1.0
-
-        # Unknown agent budget cap
-        max_unknown = risk_policy.get("max_budget_for_unknown", 50)
-        if jobs_done == 0 and bid_amount > max_unknown:
-            risk_penalty = 0.0  # Too risky
-
-        # Compute scores
-        value_score = compute_value_score(trust_score, bid_amount, budget, risk_penalty)
+        risk_penalty = _risk_penalty(jobs_done, bid_amount, risk_policy)
 
         evaluations.append({
             "agent_id": agent_id,
@@ -113,17 +120,121 @@ def evaluate_bids(bids: List[Dict], trust_data: Dict, budget: float) -> List[Dic
             "jobs_done": jobs_done,
             "capability_passed": capability_passed,
             "risk_penalty": risk_penalty,
-            "value_score": value_score,
             "within_budget": bid_amount <= budget,
             "notes": trust_info.get("notes", "No history")
         })
 
+    # Compute scores for all bids in one pass
+    scores = score_bids(
+        [e["trust_score"] for e in evaluations],
+        [e["bid_amount"] for e in evaluations],
+        budget,
+        [e["risk_penalty"] for e in evaluations]
+    )["value_score"].tolist()
+    for evaluation, value in zip(evaluations, scores):
+        evaluation["value_score"] = value
+
     # Sort by value score (descending)
     evaluations.sort(key=lambda x: x["value_score"], reverse=True)
 
     return evaluations
 
 
+class BidEvaluator:
+    """
+    Streaming bid evaluation keeping only the top k.
+
+    Bids are scored as they arrive, exactly as evaluate_bids scores them
+    (over-budget and zero-price bids score 0, too-risky bids lose only the
+    risk term), and top() is the first k entries of evaluate_bids for the
+    same bids. Bids that cannot enter the current top k are dropped before
+    any evaluation is built. The top k live in a min-heap, so each bid
+    costs O(log k); the leader is tracked separately and is O(1). Ties keep
+    the earlier bid, as the stable sort in evaluate_bids does.
+
+    With acceptable_only, bids display_evaluation would never recommend -
+    over-budget, zero-price, failed capability test or too risky (risk
+    penalty 0) - are rejected outright and counted in `dropped`; the
+    ranking is then evaluate_bids' with those entries removed.
+    """
+
+    def __init__(self, trust_data: Dict, budget: float, k: int = 3,
+                 acceptable_only: bool = False):
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        self.trust_scores = trust_data.get("trust_scores", {})
+        self.risk_policy = trust_data.get("risk_policy", {})
+        self.budget = budget
+        self.k = k
+        self.acceptable_only = acceptable_only
+        self.seen = 0
+        self.dropped = 0  # bids rejected by acceptable_only
+        self._heap: List[Tuple[float, int, Evaluation]] = []  # (value_score, -arrival, evaluation)
+        self._leader: Optional[Evaluation] = None
+
+    def add(self, bid: Dict) -> Optional[Evaluation]:
+        """Score one bid; returns its evaluation if it entered the top k, else None."""
+        seq = self.seen
+        self.seen += 1
+
+        agent_id = bid.get("agent_id")
+        bid_amount = bid.get("bid_amount", 0)
+        within_budget = bid_amount <= self.budget
+
+        trust_info = self.trust_scores.get(agent_id, {})
+        jobs_done = trust_info.get("based_on_jobs", 0)
+        risk_penalty = _risk_penalty(jobs_done, bid_amount, self.risk_policy)
+        capability_passed = bid.get("capability_passed", False)
+        if self.acceptable_only and (not within_budget or bid_amount == 0 or not capability_passed
+                                     or risk_penalty == 0.0):
+            self.dropped += 1
+            return None
+
+        trust_score = trust_info.get("score", 0.0)
+        value_score = compute_value_score(trust_score, bid_amount, self.budget, risk_penalty)
+        if len(self._heap) >= self.k and value_score <= self._heap[0][0]:
+            return None
+
+        evaluation = Evaluation(
+            agent_id=agent_id,
+            bid_amount=bid_amount,
+            trust_score=trust_score,
+            jobs_done=jobs_done,
+            capability_passed=capability_passed,
+            risk_penalty=risk_penalty,
+            value_score=value_score,
+            within_budget=within_budget,
+            notes=trust_info.get("notes", "No history")
+        )
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, (value_score, -seq, evaluation))
+        else:
+            heapq.heapreplace(self._heap, (value_score, -seq, evaluation))
+
+        if self._leader is None or value_score > self._leader.value_score:
+            self._leader = evaluation
+        return evaluation
+
+    def extend(self, bids: Iterable[Dict]) -> 'BidEvaluator':
+        for bid in bids:
+            self.add(bid)
+        return self
+
+    @property
+    def leader(self) -> Optional[Evaluation]:
+        """Best bid so far, or None if every bid was dropped."""
+        return self._leader
+
+    def top(self) -> List[Evaluation]:
+        """Current top k, best first."""
+        return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+
+def select_top_bids(bids: Iterable[Dict], trust_data: Dict, budget: float, k: int = 3) -> List[Evaluation]:
+    """Winner and runners-up (best first): the first k entries of evaluate_bids."""
+    return BidEvaluator(trust_data, budget, k).extend(bids).top()
+
+
 def display_evaluation(evaluations: List[Dict], budget: float):
     """Display bid evaluation results."""
     print(f"\n{'='*80}")
@@ -173,26 +284,29 @@ def display_evaluation(evaluations: List[Dict], budget: float):
 def main():
     """Main entry point."""
     if len(sys.argv) < 3:
-        print("Usage: python evaluate_bids.py --budget <amount> [--requester <id>]")
+        print("Usage: python evaluate_bids.py --budget <amount> [--requester <id>] [--db <marketplace.db>]")
         print("Example: python evaluate_bids.py --budget 120")
         sys.exit(1)
 
     # Parse arguments
     budget = None
     requester_id = "dirk-ax"
+    db_path = None
 
     for i, arg in enumerate(sys.argv):
         if arg == "--budget" and i + 1 < len(sys.argv):
             budget = float(sys.argv[i + 1])
         elif arg == "--requester" and i + 1 < len(sys.argv):
             requester_id = sys.argv[i + 1]
+        elif arg == "--db" and i + 1 < len(sys.argv):
+            db_path = sys.argv[i + 1]
 
     if budget is None:
         print("Error: --budget required")
         sys.exit(1)
 
     # Load trust scores
-    trust_data = load_trust_scores(requester_id)
+    trust_data = load_trust_scores(requester_id, db_path)
 
     # Example bids (in real usage, would fetch from GitHub Issue)
     example_bids = [
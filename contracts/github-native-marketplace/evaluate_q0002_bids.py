@@ -4,11 +4,10 @@ Evaluate Q0002 bids using requester's trust scores.
 Demonstrates CORRECTED marketplace economics.
 """
 
-import json
+import data_loader
 
 # Load MY trust assessments
-with open('requester_trust_scores.json') as f:
-    trust_data = json.load(f)
+trust_data = data_loader.trust_data()
 
 trust_scores = trust_data['trust_scores']
 risk_policy = trust_data['risk_policy']
@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 """Evaluate Q112 bids - LIVE 3-way competition!"""
 
-import json
+import data_loader
 
 # Load requester's trust scores
-with open('requester_trust_scores.json') as f:
-    trust_data = json.load(f)
+trust_data = data_loader.trust_data()
 
 trust_scores = trust_data['trust_scores']
 budget = 120
@@ -0,0 +1,374 @@
+"""
+Async GitHub REST client for the marketplace.
+
+Replaces one `gh` subprocess per API call with pooled keep-alive HTTP/1.1
+connections on asyncio streams. The pool size bounds concurrency, so
+hundreds of bids can be in flight without opening hundreds of sockets.
+Rate-limit headers are honoured: when the quota is exhausted every request
+waits for X-RateLimit-Reset, and rate-limited 403/429 responses (which were
+never processed) are retried with Retry-After or exponential backoff.
+5xx responses and dropped connections are only retried for idempotent
+methods: a POST may have created its issue or comment before the error,
+so it is never resent once its bytes were written.
+
+base_url is configurable, so the client can be pointed at a local fake
+HTTP server in tests.
+"""
+
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_BASE_URL = "https://api.github.com"
+USER_AGENT = "goldstein-marketplace"
+
+# Safe to resend after a server error or a dropped connection
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+
+class GitHubError(Exception):
+    """A GitHub API request failed."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"GitHub API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class GitHubResponse:
+    """Status, headers (lower-cased names) and decoded JSON body."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+    def next_page(self) -> Optional[str]:
+        """URL of the next page from the Link header, if any."""
+        for part in self.headers.get('link', '').split(','):
+            section = part.split(';')
+            if len(section) > 1 and section[1].strip() == 'rel="next"':
+                return section[0].strip()[1:-1]
+        return None
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.written = False  # whether any request bytes went out
+
+    @property
+    def stale(self) -> bool:
+        """Closed by either side while idle."""
+        return self.writer.is_closing() or self.reader.at_eof()
+
+    async def request(self, raw: bytes) -> Tuple[GitHubResponse, bool]:
+        """Send a raw request; returns the response and whether to keep the socket."""
+        self.written = True
+        self.writer.write(raw)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get('connection', '').lower() != 'close'
+
+        if status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            keep_alive = False
+
+        return GitHubResponse(status, headers, body), keep_alive
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Trailers end with a blank line
+                while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        self.writer.close()
+
+
+class GitHubClient:
+    """Async GitHub REST client with a bounded keep-alive connection pool."""
+
+    def __init__(self, repo: str, token: Optional[str] = None,
+                 base_url: str = DEFAULT_BASE_URL, max_concurrency: int = 8,
+                 max_retries: int = 5, backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Args:
+            repo: "owner/name"
+            token: API token (anonymous if None)
+            base_url: API root, e.g. a local fake server in tests
+            max_concurrency: pooled connections / requests in flight
+            max_retries: retries for rate-limited responses (and 5xx for GET/HEAD)
+            backoff: first retry delay in seconds, doubled per attempt
+        """
+        self.repo = repo
+        self.token = token
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        url = urlsplit(base_url)
+        self._host = url.hostname
+        self._port = url.port or (443 if url.scheme == 'https' else 80)
+        self._ssl = ssl.create_default_context() if url.scheme == 'https' else None
+        self._prefix = url.path.rstrip('/')
+        self._host_header = url.netloc
+
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._idle: List[_Connection] = []
+
+        # Last seen rate-limit state, shared by all in-flight requests
+        self.rate_remaining: Optional[int] = None
+        self.rate_reset: float = 0.0
+
+    @classmethod
+    def from_env(cls, repo: Optional[str] = None, **kwargs) -> 'GitHubClient':
+        """
+        Build a client from GITHUB_TOKEN / GH_TOKEN and GITHUB_REPOSITORY,
+        falling back to the logged-in `gh` CLI for either.
+        """
+        token = os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN') or _gh(['auth', 'token'])
+        repo = repo or os.environ.get('GITHUB_REPOSITORY') or _gh(
+            ['repo', 'view', '--json', 'nameWithOwner', '--jq', '.nameWithOwner']
+        )
+        if not repo:
+            raise GitHubError(0, "No repository: set GITHUB_REPOSITORY or run inside a gh repo")
+        return cls(repo, token, **kwargs)
+
+    async def __aenter__(self) -> 'GitHubClient':
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Close all pooled connections."""
+        while self._idle:
+            self._idle.pop().close()
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None,
+                      json_body=None, headers: Optional[Dict[str, str]] = None,
+                      ok_statuses: Tuple[int, ...] = ()) -> GitHubResponse:
+        """
+        Send one API request, retrying rate-limited and server errors.
+
+        Args:
+            path: path under the API root, or an absolute URL (pagination)
+            ok_statuses: extra non-2xx statuses returned instead of raised (e.g. 304)
+        """
+        target = self._target(path, params)
+        body = json.dumps(json_body).encode() if json_body is not None else b''
+        raw = self._raw_request(method, target, body, headers or {})
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_quota()
+            async with self._slots:
+                response = await self._send(raw, idempotent)
+            self._record_rate_limit(response)
+
+            if 200 <= response.status < 300 or response.status in ok_statuses:
+                return response
+
+            delay = self._retry_delay(response, attempt, idempotent)
+            if delay is None or attempt == self.max_retries:
+                raise GitHubError(response.status, _error_message(response))
+            await asyncio.sleep(delay)
+
+    async def list_issues(self, labels: Optional[List[str]] = None, state: str = 'open',
+                          since: Optional[str] = None) -> List[Dict]:
+        """All issues (not pull requests) matching the filters, across pages."""
+        params = {'state': state, 'per_page': 100}
+        if labels:
+            params['labels'] = ','.join(labels)
+        if since:
+            params['since'] = since
+
+        issues = []
+        url = f"/repos/{self.repo}/issues"
+        while url:
+            response = await self.request('GET', url, params)
+            issues.extend(i for i in response.json() if 'pull_request' not in i)
+            url, params = response.next_page(), None
+        return issues
+
+    async def list_comments(self, issue_number: int, since: Optional[str] = None) -> List[Dict]:
+        """All comments on an issue, across pages."""
+        params = {'per_page': 100}
+        if since:
+            params['since'] = since
+
+        comments = []
+        url = f"/repos/{self.repo}/issues/{issue_number}/comments"
+        while url:
+            response = await self.request('GET', url, params)
+            comments.extend(response.json())
+            url, params = response.next_page(), None
+        return comments
+
+    async def create_issue(self, title: str, body: str, labels: Optional[List[str]] = None) -> Dict:
+        """Open an issue; returns the created issue (html_url, number, ...)."""
+        payload = {'title': title, 'body': body}
+        if labels:
+            payload['labels'] = labels
+        response = await self.request('POST', f"/repos/{self.repo}/issues", json_body=payload)
+        return response.json()
+
+    async def create_comment(self, issue_number: int, body: str) -> Dict:
+        """Comment on an issue; returns the created comment."""
+        response = await self.request(
+            'POST', f"/repos/{self.repo}/issues/{issue_number}/comments",
+            json_body={'body': body}
+        )
+        return response.json()
+
+    def _target(self, path: str, params: Optional[Dict]) -> str:
+        if path.startswith('http://') or path.startswith('https://'):
+            url = urlsplit(path)
+            target = url.path + (f"?{url.query}" if url.query else '')
+        else:
+            target = self._prefix + path
+        if params:
+            target += ('&' if '?' in target else '?') + urlencode(params)
+        return target
+
+    def _raw_request(self, method: str, target: str, body: bytes, extra: Dict[str, str]) -> bytes:
+        headers = {
+            'Host': self._host_header,
+            'User-Agent': USER_AGENT,
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28',
+            'Connection': 'keep-alive',
+            'Content-Length': str(len(body)),
+        }
+        if body:
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        headers.update(extra)
+
+        head = f"{method} {target} HTTP/1.1\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        return head.encode('latin-1') + b'\r\n' + body
+
+    async def _send(self, raw: bytes, idempotent: bool = True) -> GitHubResponse:
+        """
+        Send on a pooled connection, reconnecting once if it went stale.
+
+        A non-idempotent request is only resent if none of it was written;
+        otherwise the server may already have acted on it.
+        """
+        for reused in (True, False):
+            conn = None
+            while reused and self._idle:
+                conn = self._idle.pop()
+                if not conn.stale:
+                    break
+                conn.close()
+                conn = None
+            if conn is None:
+                reused = False
+                reader, writer = await asyncio.open_connection(self._host, self._port, ssl=self._ssl)
+                conn = _Connection(reader, writer)
+            try:
+                response, keep_alive = await conn.request(raw)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                if reused and (idempotent or not conn.written):
+                    continue
+                raise
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn.close()
+            return response
+
+    async def _wait_for_quota(self):
+        """Once the quota is used up, hold every request until X-RateLimit-Reset."""
+        while self.rate_remaining == 0:
+            delay = self.rate_reset - time.time()
+            if delay <= 0:
+                self.rate_remaining = None
+                break
+            await asyncio.sleep(delay)
+
+    def _record_rate_limit(self, response: GitHubResponse):
+        remaining = response.headers.get('x-ratelimit-remaining')
+        if remaining is not None:
+            self.rate_remaining = int(remaining)
+        reset = response.headers.get('x-ratelimit-reset')
+        if reset is not None:
+            self.rate_reset = float(reset)
+
+    def _retry_delay(self, response: GitHubResponse, attempt: int,
+                     idempotent: bool = True) -> Optional[float]:
+        """
+        Seconds to wait before retrying, or None if the error is final.
+
+        Rate-limited requests were never processed, so any method is
+        retried; a 5xx may come after a POST took effect, so only
+        idempotent requests are retried then.
+        """
+        retry_after = response.headers.get('retry-after')
+        if response.status in (403, 429):
+            if retry_after is not None:
+                return min(float(retry_after), self.max_backoff)
+            if response.headers.get('x-ratelimit-remaining') == '0':
+                return min(max(0.0, self.rate_reset - time.time()), self.max_backoff)
+            if response.status == 403:
+                return None
+        elif response.status < 500 or not idempotent:
+            return None
+        return min(self.backoff * (2 ** attempt), self.max_backoff)
+
+
+def _error_message(response: GitHubResponse) -> str:
+    try:
+        return response.json().get('message', '')
+    except (ValueError, AttributeError):
+        return response.body.decode('utf-8', 'replace')[:200]
+
+
+def _gh(args: List[str]) -> Optional[str]:
+    """Output of a `gh` CLI command, or None if gh is missing or fails."""
+    try:
+        result = subprocess.run(['gh'] + args, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
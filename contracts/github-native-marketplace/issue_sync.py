@@ -0,0 +1,239 @@
+"""
+Incremental sync of query-task issues and their comments.
+
+Keeps a file-backed cache of issues and comments and refreshes it with
+conditional requests: each listing is sent with the ETag of its last
+response (If-None-Match) and a since= cursor at the newest updated_at seen,
+so an unchanged repository costs one 304 per listing (the first round
+after the cursor moves re-reads just the newest items). Comments for all
+issues come from the repository-wide comments endpoint, not one listing
+per issue.
+
+Only items that actually changed are delivered. An issue counts as changed
+when its title, body, labels or state change - a new comment bumps the
+issue's updated_at, but does not re-deliver the issue.
+
+sync() only updates the cache in memory. The caller saves it with commit()
+once it has acted on what was delivered, so a round that crashes before
+then is delivered again; issues passed to commit(failed=...) are delivered
+again by the next sync().
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from github_client import GitHubClient
+
+CACHE_FILE = Path(__file__).parent / "issue_sync_cache.json"
+CACHE_VERSION = 1
+
+
+def _fingerprint(issue: Dict) -> List:
+    """The parts of an issue agents act on."""
+    return [
+        issue.get('title'),
+        issue.get('body'),
+        sorted(label['name'] for label in issue.get('labels', [])),
+        issue.get('state'),
+    ]
+
+
+def _issue_number(comment: Dict) -> int:
+    """Issue number from a comment's issue_url (.../issues/<number>)."""
+    return int(comment['issue_url'].rstrip('/').rsplit('/', 1)[1])
+
+
+class IssueSync:
+    """File-backed, ETag-conditional cache of issues and comments."""
+
+    def __init__(self, client: GitHubClient, cache_path=CACHE_FILE,
+                 labels: Tuple[str, ...] = ('query-task',)):
+        self.client = client
+        self.cache_path = Path(cache_path)
+        self.labels = list(labels)
+        self.requests = 0
+        self.not_modified = 0
+        self._load()
+
+    def _load(self):
+        state = {}
+        if self.cache_path.exists():
+            with open(self.cache_path) as f:
+                state = json.load(f)
+            # A cache for another repo or label set is useless
+            if (state.get('version') != CACHE_VERSION or state.get('repo') != self.client.repo
+                    or state.get('labels') != self.labels):
+                state = {}
+
+        self.issues: Dict[str, Dict] = state.get('issues', {})
+        self.fingerprints: Dict[str, List] = state.get('fingerprints', {})
+        self.comments: Dict[str, Dict[str, Dict]] = state.get('comments', {})
+        self.etags: Dict[str, Dict] = state.get('etags', {})
+        self.issues_since: Optional[str] = state.get('issues_since')
+        self.comments_since: Optional[str] = state.get('comments_since')
+        self.retry: List[str] = state.get('retry', [])
+
+    def save(self):
+        """Write the cache atomically (temp file + rename)."""
+        state = {
+            'version': CACHE_VERSION,
+            'repo': self.client.repo,
+            'labels': self.labels,
+            'issues': self.issues,
+            'fingerprints': self.fingerprints,
+            'comments': self.comments,
+            'etags': self.etags,
+            'issues_since': self.issues_since,
+            'comments_since': self.comments_since,
+            'retry': self.retry,
+        }
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def open_issues(self) -> List[Dict]:
+        """All cached open issues, by number."""
+        return [self.issues[n] for n in sorted(self.issues, key=int)]
+
+    def issue_comments(self, issue_number: int) -> List[Dict]:
+        """All cached comments on an issue, oldest first."""
+        comments = self.comments.get(str(issue_number), {})
+        return sorted(comments.values(), key=lambda c: (c['created_at'], c['id']))
+
+    async def sync(self) -> Dict:
+        """
+        Refresh the cache in memory; commit() saves it.
+
+        Returns dict with:
+            issues: open issues that are new or changed, plus those the
+                    last commit() marked as failed
+            closed: numbers of cached issues that were closed
+            comments: {issue number: new or edited comments}
+        """
+        warm = self.comments_since is not None
+        issues, closed = await self.sync_issues()
+        comments = await self.sync_comments()
+
+        # Issues first seen now may have comments older than the cursor
+        if warm:
+            for issue in issues:
+                key = str(issue['number'])
+                if key not in self.comments:
+                    backfill = await self.client.list_comments(issue['number'])
+                    self.requests += 1
+                    self.comments[key] = {str(c['id']): c for c in backfill}
+                    if backfill:
+                        comments[issue['number']] = backfill
+
+        delivered = {str(issue['number']) for issue in issues}
+        issues.extend(self.issues[key] for key in self.retry
+                      if key in self.issues and key not in delivered)
+        self.retry = []
+        return {'issues': issues, 'closed': closed, 'comments': comments}
+
+    def commit(self, failed: Iterable[int] = ()):
+        """
+        Save the cache once the synced issues have been handled.
+
+        Issues in `failed` (e.g. whose bids could not be posted) are
+        delivered again by the next sync().
+        """
+        self.retry = sorted({str(number) for number in failed}, key=int)
+        self.save()
+
+    async def sync_issues(self) -> Tuple[List[Dict], List[int]]:
+        """Fetch issues updated since the cursor; returns (changed open issues, closed numbers)."""
+        params = {'labels': ','.join(self.labels), 'per_page': 100}
+        if self.issues_since:
+            # state=all so closures show up as updates
+            params.update(state='all', since=self.issues_since)
+        else:
+            params['state'] = 'open'
+
+        fetched = await self._fetch(f"/repos/{self.client.repo}/issues", params)
+        if fetched is None:
+            return [], []
+
+        changed, closed = [], []
+        for issue in fetched:
+            if 'pull_request' in issue:
+                continue
+            key = str(issue['number'])
+            self.issues_since = max(self.issues_since or '', issue['updated_at'])
+
+            if issue['state'] != 'open':
+                if self.issues.pop(key, None) is not None:
+                    closed.append(issue['number'])
+                self.fingerprints.pop(key, None)
+                self.comments.pop(key, None)
+                continue
+
+            fingerprint = _fingerprint(issue)
+            if self.fingerprints.get(key) != fingerprint:
+                changed.append(issue)
+            self.issues[key] = issue
+            self.fingerprints[key] = fingerprint
+
+        return changed, closed
+
+    async def sync_comments(self) -> Dict[int, List[Dict]]:
+        """Fetch comments updated since the cursor on tracked issues."""
+        params = {'sort': 'updated', 'direction': 'asc', 'per_page': 100}
+        if self.comments_since:
+            params['since'] = self.comments_since
+
+        fetched = await self._fetch(f"/repos/{self.client.repo}/issues/comments", params)
+        if fetched is None:
+            return {}
+
+        changed: Dict[int, List[Dict]] = {}
+        for comment in fetched:
+            self.comments_since = max(self.comments_since or '', comment['updated_at'])
+            number = _issue_number(comment)
+            if str(number) not in self.issues:
+                continue
+
+            thread = self.comments.setdefault(str(number), {})
+            cached = thread.get(str(comment['id']))
+            # since= is inclusive, so the newest items come back once more
+            if cached is not None and cached['updated_at'] == comment['updated_at']:
+                continue
+            thread[str(comment['id'])] = comment
+            changed.setdefault(number, []).append(comment)
+
+        return changed
+
+    async def _fetch(self, path: str, params: Dict) -> Optional[List[Dict]]:
+        """
+        All pages of a listing, or None if the first page is unchanged (304).
+
+        One ETag is kept per listing, for the exact first-page URL it came
+        from; later pages are only fetched when the first one changed.
+        """
+        url_key = f"{path}?{urlencode(sorted(params.items()))}"
+        cached = self.etags.get(path)
+        headers = {'If-None-Match': cached['etag']} if cached and cached['url'] == url_key else {}
+
+        self.requests += 1
+        response = await self.client.request('GET', path, params, headers=headers, ok_statuses=(304,))
+        if response.status == 304:
+            self.not_modified += 1
+            return None
+
+        if 'etag' in response.headers:
+            self.etags[path] = {'url': url_key, 'etag': response.headers['etag']}
+        else:
+            self.etags.pop(path, None)
+
+        items = list(response.json())
+        url = response.next_page()
+        while url:
+            self.requests += 1
+            response = await self.client.request('GET', url)
+            items.extend(response.json())
+            url = response.next_page()
+        return items
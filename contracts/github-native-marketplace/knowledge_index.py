@@ -0,0 +1,147 @@
+"""
+Inverted index over agent knowledge bases.
+
+Maps each query to the agents who know its response (and each agent to the
+queries it knows), with queries bucketed by competition level. Built once
+from agent_knowledge_bases.json and shared by the simulation scripts, so
+"who knows Q112?" is a dict lookup instead of a scan over every agent.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+KNOWLEDGE_FILE = Path(__file__).parent / "agent_knowledge_bases.json"
+
+MARKET_TYPES = ('monopoly', 'duopoly', 'high_competition')
+
+
+def market_type_for(num_agents: int) -> Optional[str]:
+    """Classify a query by how many agents know its response."""
+    if num_agents <= 0:
+        return None
+    if num_agents == 1:
+        return 'monopoly'
+    if num_agents == 2:
+        return 'duopoly'
+    return 'high_competition'
+
+
+class KnowledgeIndex:
+    """Query -> holders and holder -> queries, with competition buckets."""
+
+    def __init__(self, agents: Dict[str, Dict[str, str]]):
+        """
+        Args:
+            agents: {agent_id: {query_id: response}}, in agent order
+        """
+        self._rank: Dict[str, int] = {}
+        self._queries: Dict[str, FrozenSet[str]] = {}
+        self._holders: Dict[str, Tuple[str, ...]] = {}
+        self._buckets: Dict[str, set] = {t: set() for t in MARKET_TYPES}
+
+        pending: Dict[str, List[str]] = {}
+        for agent_id, agent_knowledge in agents.items():
+            self._rank[agent_id] = len(self._rank)
+            self._queries[agent_id] = frozenset(agent_knowledge)
+            for query_id in agent_knowledge:
+                pending.setdefault(query_id, []).append(agent_id)
+
+        for query_id, holders in pending.items():
+            self._holders[query_id] = tuple(holders)
+            self._buckets[market_type_for(len(holders))].add(query_id)
+
+    @classmethod
+    def from_knowledge(cls, knowledge: Dict) -> 'KnowledgeIndex':
+        """Build from the parsed agent_knowledge_bases.json document."""
+        return cls({
+            agent_id: agent_data['knowledge']
+            for agent_id, agent_data in knowledge['agents'].items()
+        })
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'KnowledgeIndex':
+        """Build from an agent_knowledge_bases.json file."""
+        with open(path or KNOWLEDGE_FILE) as f:
+            return cls.from_knowledge(json.load(f))
+
+    def holders(self, query_id: str) -> Tuple[str, ...]:
+        """Agents who know the response to a query, in agent order."""
+        return self._holders.get(query_id, ())
+
+    def num_holders(self, query_id: str) -> int:
+        """Number of agents who know the response to a query."""
+        return len(self._holders.get(query_id, ()))
+
+    def queries_of(self, agent_id: str) -> FrozenSet[str]:
+        """Queries an agent knows the response to."""
+        return self._queries.get(agent_id, frozenset())
+
+    def knows(self, agent_id: str, query_id: str) -> bool:
+        """Check if an agent knows the response to a query."""
+        return query_id in self._queries.get(agent_id, ())
+
+    def market_type(self, query_id: str) -> Optional[str]:
+        """Competition level of a query, or None if nobody knows it."""
+        return market_type_for(self.num_holders(query_id))
+
+    def bucket(self, market_type: str) -> FrozenSet[str]:
+        """Queries at one competition level."""
+        return frozenset(self._buckets[market_type])
+
+    @property
+    def agents(self) -> List[str]:
+        """All indexed agents, in agent order."""
+        return list(self._rank)
+
+    @property
+    def queries(self) -> List[str]:
+        """All queries known by at least one agent."""
+        return list(self._holders)
+
+    def update_agent(self, agent_id: str, knowledge: Iterable[str]):
+        """
+        Replace one agent's knowledge, touching only the affected queries.
+
+        New agents are appended after the existing ones, so holder order
+        stays stable for everyone else.
+        """
+        old = self._queries.get(agent_id, frozenset())
+        new = frozenset(knowledge)
+        if agent_id not in self._rank:
+            self._rank[agent_id] = len(self._rank)
+        self._queries[agent_id] = new
+
+        for query_id in old - new:
+            self._set_holders(query_id, tuple(
+                a for a in self._holders[query_id] if a != agent_id
+            ))
+        for query_id in new - old:
+            holders = self._holders.get(query_id, ()) + (agent_id,)
+            self._set_holders(query_id, tuple(sorted(holders, key=self._rank.__getitem__)))
+
+    def remove_agent(self, agent_id: str):
+        """Drop an agent and all of its knowledge from the index."""
+        if agent_id not in self._rank:
+            return
+        self.update_agent(agent_id, ())
+        del self._queries[agent_id]
+        del self._rank[agent_id]
+
+    def _set_holders(self, query_id: str, holders: Tuple[str, ...]):
+        old_type = self.market_type(query_id)
+        if old_type:
+            self._buckets[old_type].discard(query_id)
+
+        if holders:
+            self._holders[query_id] = holders
+            self._buckets[market_type_for(len(holders))].add(query_id)
+        else:
+            self._holders.pop(query_id, None)
+
+
+def load_knowledge_index(path: Optional[str] = None) -> KnowledgeIndex:
+    """Shared knowledge index for a file, rebuilt only when the file changes."""
+    import data_loader
+
+    return data_loader.knowledge_index(path or KNOWLEDGE_FILE)
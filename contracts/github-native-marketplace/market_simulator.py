@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Discrete-event simulator for full marketplace rounds.
+
+Usage:
+    python market_simulator.py --agents 1000 --events 10000000 [--rate 5] [--seed 0]
+
+Unlike the single-shot simulations, contracts keep arriving over simulated
+time and every step is an event on one priority queue (heapq of plain
+tuples, so a run can process 10^7 events):
+
+    ARRIVAL   a contract is posted; candidate agents are notified
+    BID       an agent's analysis finishes after its bid latency: it runs
+              SubcontractingAgent.analyze_contract and bids (or not)
+    CLOSE     the sealed-bid auction closes (AuctionEngine); the winner
+              either starts working or posts a subcontract, which arrives
+              as a new contract
+    DELIVERY  the work is done: payment goes through the ProfitLedger,
+              the requester updates its trust in the agent, and a waiting
+              parent contract resumes
+
+Agents work one job at a time, so busy agents queue work; waiting and
+delivery times are reported so throughput and queueing can be studied,
+not just prices. Markets are synthetic (benchmark.py generators).
+"""
+
+import heapq
+import json
+import random
+import sys
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agents.agent_subcontracting import (
+    AgentKnowledge, ProfitLedger, QueryResolver, SubcontractingAgent
+)
+from auction_engine import AuctionEngine
+from marketplace_records import Bid
+from online_stats import StreamSummary
+
+ARRIVAL, BID, CLOSE, DELIVERY = range(4)
+EVENT_NAMES = ('arrival', 'bid', 'close', 'delivery')
+
+BUDGET = 120
+TRUST_ALPHA = 0.1  # EWMA weight of the newest job in trust updates
+STATS_CHUNK = 4096  # waits / turnarounds buffered before they are summarized
+
+
+class SimAgent:
+    """An agent plus its simulation state."""
+
+    __slots__ = ('agent', 'markup', 'quality', 'busy_until', 'busy_time', 'jobs')
+
+    def __init__(self, agent: SubcontractingAgent, markup: float, quality: float):
+        self.agent = agent
+        self.markup = markup      # multiplies analyze_contract's price
+        self.quality = quality    # mean delivered quality, hidden from requesters
+        self.busy_until = 0.0
+        self.busy_time = 0.0
+        self.jobs = 0
+
+
+class SimContract:
+    """One contract (top-level or subcontract) moving through the market."""
+
+    __slots__ = ('contract_id', 'query', 'budget', 'parent', 'arrived_at',
+                 'strategies', 'winner', 'price', 'awarded_at')
+
+    def __init__(self, contract_id: int, query: str, budget: float,
+                 parent: Optional['SimContract'], arrived_at: float):
+        self.contract_id = contract_id
+        self.query = query
+        self.budget = budget
+        self.parent = parent
+        self.arrived_at = arrived_at
+        self.strategies: Dict[str, Dict] = {}
+        self.winner: Optional[str] = None
+        self.price = 0.0
+        self.awarded_at = 0.0
+
+
+class MarketSimulator:
+    """Priority-queue scheduler over arrivals, bids, closes and deliveries."""
+
+    def __init__(self, knowledge_bases: Dict[str, Dict[str, str]], trust_data: Dict,
+                 ledger: ProfitLedger, arrival_rate: float = 5.0, bid_window: float = 1.0,
+                 bid_latency: float = 0.3, service_time: float = 2.0, max_depth: int = 3,
+                 max_bidders: int = 5, budget: float = BUDGET, seed: int = 0):
+        """
+        Args:
+            knowledge_bases: {agent_id: {query: response}}
+            trust_data: requester trust document; updated in place as jobs finish
+            arrival_rate: top-level contracts per unit of simulated time
+            bid_window: time from posting to sealed-bid close
+            bid_latency: mean time for an agent to analyze and bid
+            service_time: mean time for an agent to do one job
+            max_depth: contracts ask for 1..max_depth hops
+            max_bidders: agents notified per contract
+        """
+        self.rng = random.Random(seed)
+        self.ledger = ledger
+        self.trust_data = trust_data
+        self.trust_scores = trust_data.setdefault('trust_scores', {})
+        self.arrival_rate = arrival_rate
+        self.bid_window = bid_window
+        self.bid_latency = bid_latency
+        self.service_time = service_time
+        self.max_depth = max_depth
+        self.max_bidders = max_bidders
+        self.budget = budget
+
+        knowledge = [AgentKnowledge(a, kb) for a, kb in knowledge_bases.items()]
+        self.resolver = QueryResolver(knowledge)
+        self.agents = {
+            k.agent_id: SimAgent(
+                SubcontractingAgent(k, ledger, self.resolver),
+                markup=self.rng.uniform(0.8, 1.1),
+                quality=self.rng.uniform(0.4, 1.0)
+            )
+            for k in knowledge
+        }
+        self.roots = sorted({q for kb in knowledge_bases.values() for q in kb})
+
+        self.now = 0.0
+        self.engine = AuctionEngine(trust_data, clock=lambda: self.now)
+        self.contracts: Dict[int, SimContract] = {}
+        self._queue: List = []
+        self._seq = count()
+        self._contract_ids = count()
+
+        self.events = [0, 0, 0, 0]
+        self.stats = {
+            'contracts': 0, 'subcontracts': 0, 'awarded': 0, 'unawarded': 0,
+            'delivered': 0, 'failed': 0, 'late_bids': 0, 'paid': 0.0,
+        }
+        # Summarized a chunk at a time, so memory does not grow with the events
+        self.waits = StreamSummary()
+        self.turnarounds = StreamSummary()
+        self._pending_waits: List[float] = []
+        self._pending_turnarounds: List[float] = []
+
+    def schedule(self, at: float, kind: int, a=None, b=None):
+        heapq.heappush(self._queue, (at, next(self._seq), kind, a, b))
+
+    def run(self, max_events: Optional[int] = None, until: Optional[float] = None) -> Dict:
+        """Process events until the queue is empty, `until` or `max_events`."""
+        if not self._queue:
+            self.schedule(self.rng.expovariate(self.arrival_rate), ARRIVAL)
+
+        handlers = (self._on_arrival, self._on_bid, self._on_close, self._on_delivery)
+        queue = self._queue
+        events = self.events
+        processed = 0
+        while queue and (max_events is None or processed < max_events):
+            if until is not None and queue[0][0] > until:
+                break
+            self.now, _, kind, a, b = heapq.heappop(queue)
+            events[kind] += 1
+            handlers[kind](a, b)
+            processed += 1
+        return self.summary()
+
+    def _open(self, query: str, budget: float, parent: Optional[SimContract]):
+        contract = SimContract(next(self._contract_ids), query, budget, parent, self.now)
+        self.contracts[contract.contract_id] = contract
+        self.stats['subcontracts' if parent else 'contracts'] += 1
+        self.engine.open_contract(contract.contract_id, budget, sealed=True)
+        self.schedule(self.now + self.bid_window, CLOSE, contract)
+
+        plan = QueryResolver.compile(query)
+        holders = self.resolver.holders(plan.root) if plan else []
+        if len(holders) > self.max_bidders:
+            holders = self.rng.sample(holders, self.max_bidders)
+        for agent_id in holders:
+            self.schedule(self.now + self.rng.expovariate(1.0 / self.bid_latency), BID, contract, agent_id)
+
+    def _on_arrival(self, _, __):
+        self.schedule(self.now + self.rng.expovariate(self.arrival_rate), ARRIVAL)
+        depth = self.rng.randint(1, self.max_depth)
+        root = self.roots[self.rng.randrange(len(self.roots))]
+        self._open(f"What is {'response[' * depth}{root}{']' * depth}?", self.budget, None)
+
+    def _on_bid(self, contract: SimContract, agent_id: str):
+        sim_agent = self.agents[agent_id]
+        strategy = sim_agent.agent.analyze_contract(contract.query, contract.budget)
+        if strategy['action'] == 'bid_directly':
+            price = strategy['bid_amount']
+        elif strategy['action'] == 'subcontract':
+            price = contract.budget * 0.9
+        else:
+            return
+
+        # Only agents able to answer bid, so the capability test is passed
+        bid = Bid(agent_id, round(price * sim_agent.markup, 2), capability_passed=True)
+        if self.engine.submit(contract.contract_id, bid):
+            contract.strategies[agent_id] = strategy
+        elif not self.engine.is_open(contract.contract_id):
+            self.stats['late_bids'] += 1
+
+    def _on_close(self, contract: SimContract, _):
+        event = self.engine.close(contract.contract_id)
+        self.engine.discard(contract.contract_id)
+        strategies, contract.strategies = contract.strategies, {}
+
+        if event['type'] == 'no_award':
+            self.stats['unawarded'] += 1
+            self._fail(contract)
+            return
+
+        self.stats['awarded'] += 1
+        contract.winner = event['winner']['agent_id']
+        contract.price = event['winner']['bid_amount']
+        contract.awarded_at = self.now
+
+        strategy = strategies[contract.winner]
+        if strategy['action'] == 'subcontract':
+            # The winner's own work starts once the subcontract is delivered
+            self._open(strategy['subcontract_query'], strategy['subcontract_budget'], contract)
+        else:
+            self._start_work(contract)
+
+    def _start_work(self, contract: SimContract):
+        sim_agent = self.agents[contract.winner]
+        start = max(self.now, sim_agent.busy_until)
+        duration = self.rng.expovariate(1.0 / self.service_time)
+        sim_agent.busy_until = start + duration
+        sim_agent.busy_time += duration
+        self._pending_waits.append(start - self.now)
+        if len(self._pending_waits) >= STATS_CHUNK:
+            self._flush_stats()
+        self.schedule(start + duration, DELIVERY, contract)
+
+    def _on_delivery(self, contract: SimContract, _):
+        sim_agent = self.agents[contract.winner]
+        sim_agent.jobs += 1
+        self.stats['delivered'] += 1
+        self.stats['paid'] += contract.price
+        self._pending_turnarounds.append(self.now - contract.arrived_at)
+        if len(self._pending_turnarounds) >= STATS_CHUNK:
+            self._flush_stats()
+
+        self.ledger.record_revenue(contract.winner, str(contract.contract_id), contract.price,
+                                   f"Delivered {contract.query}")
+        parent = contract.parent
+        if parent is None:
+            self._update_trust(contract.winner, sim_agent.quality)
+        else:
+            self.ledger.record_cost(parent.winner, str(parent.contract_id), contract.price,
+                                    contract.winner, f"Subcontract {contract.query}")
+            self._start_work(parent)
+        del self.contracts[contract.contract_id]
+
+    def _fail(self, contract: SimContract):
+        """An unawarded contract fails its whole chain of parents."""
+        while contract is not None:
+            self.stats['failed'] += 1
+            del self.contracts[contract.contract_id]
+            contract = contract.parent
+
+    def _update_trust(self, agent_id: str, quality: float):
+        observed = min(1.0, max(0.0, self.rng.gauss(quality, 0.1)))
+        info = self.trust_scores.get(agent_id)
+        if info is None:
+            self.trust_scores[agent_id] = {'score': observed, 'based_on_jobs': 1}
+        else:
+            info['score'] += TRUST_ALPHA * (observed - info.get('score', 0.0))
+            info['based_on_jobs'] = info.get('based_on_jobs', 0) + 1
+
+    def _flush_stats(self):
+        self.waits.update(self._pending_waits)
+        self.turnarounds.update(self._pending_turnarounds)
+        self._pending_waits = []
+        self._pending_turnarounds = []
+
+    def summary(self) -> Dict:
+        def percentiles(summary: StreamSummary):
+            if summary.n == 0:
+                return None
+            return {'mean': summary.mean, 'p50': summary.percentile(50), 'p99': summary.percentile(99)}
+
+        self._flush_stats()
+
+        elapsed = self.now or 1.0
+        busy = [a.busy_time for a in self.agents.values()]
+        return {
+            'sim_time': self.now,
+            'events': dict(zip(EVENT_NAMES, self.events)),
+            **self.stats,
+            'throughput': self.stats['delivered'] / elapsed,
+            'open_contracts': len(self.contracts),
+            'wait': percentiles(self.waits),
+            'turnaround': percentiles(self.turnarounds),
+            'mean_utilization': float(np.mean(busy)) / elapsed if busy else 0.0,
+        }
+
+
+def main():
+    from benchmark import SyntheticMarket
+
+    num_agents = 1000
+    max_events = 1_000_000
+    rate = 5.0
+    seed = 0
+
+    for i, arg in enumerate(sys.argv):
+        if arg == "--agents" and i + 1 < len(sys.argv):
+            num_agents = int(sys.argv[i + 1])
+        elif arg == "--events" and i + 1 < len(sys.argv):
+            max_events = int(sys.argv[i + 1])
+        elif arg == "--rate" and i + 1 < len(sys.argv):
+            rate = float(sys.argv[i + 1])
+        elif arg == "--seed" and i + 1 < len(sys.argv):
+            seed = int(sys.argv[i + 1])
+
+    print("="*80)
+    print(f"DISCRETE-EVENT MARKET SIMULATION (agents={num_agents}, events={max_events:,}, rate={rate})")
+    print("="*80)
+    print()
+
+    market = SyntheticMarket(num_agents, seed)
+    knowledge_bases = {a: d['knowledge'] for a, d in market.knowledge['agents'].items()}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ledger_path = Path(workdir) / "sim_ledger.json"
+        ledger_path.write_text(json.dumps({'agents': {}}))
+        # The journal is scratch here: no fsyncs, no snapshot rewrites mid-run
+        with ProfitLedger(str(ledger_path), sync_every=sys.maxsize, compact_every=sys.maxsize) as ledger:
+            simulator = MarketSimulator(knowledge_bases, market.trust_data, ledger,
+                                        arrival_rate=rate, seed=seed)
+            start = time.perf_counter()
+            summary = simulator.run(max_events=max_events)
+            wall = time.perf_counter() - start
+
+    processed = sum(summary['events'].values())
+    print(json.dumps(summary, indent=2))
+    print()
+    print(f"{processed:,} events in {wall:.1f}s ({processed / wall:,.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+In-memory marketplace graph.
+
+Same schema as the Neo4j graph (see neo4j_loader):
+    (Agent)-[:KNOWS]->(Knowledge)
+    (Agent)-[:POSTED {reason, margin, expected_profit}]->(Contract:SUBCONTRACT)
+    (Agent)-[:BID]->(Bid)-[:BID_ON]->(Contract)
+    (Contract:SUBCONTRACT)-[:SUBCONTRACT_OF]->(Contract:PRIMARY)
+plus (Agent)-[:PAID {contract_id, amount}]->(Agent) from ledger costs.
+
+Built from the same events: neo4j_loader rows (add_rows) and ProfitLedger
+journal records (apply). Every edge is kept in adjacency lists in both
+directions, keyed by agent id / issue number / query, so the documented
+queries - subcontract chains, profit flow, who can solve a query - are
+answered natively. Path queries walk parent pointers or an explicit
+stack, never recursion, so they cost O(path length) / O(subtree size)
+and work on graphs with millions of edges.
+
+to_rows() returns the graph as loader rows, and export() loads it into
+Neo4j through a Neo4jBulkLoader.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class MarketplaceGraph:
+    """Agents, knowledge, contracts and bids with adjacency lists."""
+
+    def __init__(self):
+        self.agents: Dict[str, Dict] = {}              # id -> {total_revenue, total_costs, net_profit}
+        self.knowledge: Dict[str, Dict[str, str]] = {}  # agent -> {query: response}
+        self.contracts: Dict[int, Dict] = {}           # issue number -> properties
+        self.bids: List[Dict] = []
+
+        self._holders: Dict[str, List[str]] = {}       # query -> agents who KNOW it
+        self._parent: Dict[int, int] = {}              # sub -> parent (SUBCONTRACT_OF)
+        self._children: Dict[int, List[int]] = {}      # parent -> subs
+        self._posted: Dict[int, Tuple[str, Dict]] = {}  # sub -> (agent, POSTED properties)
+        self._posted_by: Dict[str, List[int]] = {}     # agent -> subs it POSTED
+        self._bids_on: Dict[int, List[int]] = {}       # contract -> bid indexes
+        self._bids_by: Dict[str, List[int]] = {}       # agent -> bid indexes
+        self._paid: Dict[str, List[Dict]] = {}         # payer -> PAID edges
+
+    # Building
+
+    @classmethod
+    def from_rows(cls, rows: Dict[str, Iterable[Dict]]) -> 'MarketplaceGraph':
+        graph = cls()
+        graph.add_rows(rows)
+        return graph
+
+    def add_rows(self, rows: Dict[str, Iterable[Dict]]):
+        """Add neo4j_loader rows ({kind: rows}), endpoints before relationships."""
+        from neo4j_loader import LOAD_ORDER
+
+        handlers = {
+            'agents': self.add_agent,
+            'knowledge': self.add_knowledge,
+            'contracts': self.add_contract,
+            'subcontracts': self.add_subcontract,
+            'bids': self.add_bid,
+        }
+        for kind in LOAD_ORDER:
+            for row in rows.get(kind, ()):
+                handlers[kind](row)
+
+    def add_agent(self, row: Dict):
+        agent = self._agent(row['id'])
+        for key in ('total_revenue', 'total_costs', 'net_profit'):
+            agent[key] = row.get(key, 0.0)
+
+    def add_knowledge(self, row: Dict):
+        agent_id, query = row['agent_id'], row['query']
+        self._agent(agent_id)
+        facts = self.knowledge.setdefault(agent_id, {})
+        if query not in facts:
+            self._holders.setdefault(query, []).append(agent_id)
+        facts[query] = row['response']
+
+    def add_contract(self, row: Dict):
+        self.contracts.setdefault(row['issue_number'], {}).update(row)
+
+    def add_subcontract(self, row: Dict):
+        """SUBCONTRACT_OF sub -> parent, and POSTED by the agent that needs it."""
+        sub, parent, agent_id = row['issue_number'], row['parent'], row['posted_by']
+        for number in (sub, parent):
+            self.contracts.setdefault(number, {'issue_number': number})
+        self._agent(agent_id)
+
+        previous = self._parent.get(sub)
+        if previous is not None and previous != parent:
+            self._children[previous].remove(sub)
+        if previous != parent:
+            self._parent[sub] = parent
+            self._children.setdefault(parent, []).append(sub)
+
+        if sub not in self._posted:
+            self._posted_by.setdefault(agent_id, []).append(sub)
+        self._posted[sub] = (agent_id, {
+            key: row.get(key) for key in ('reason', 'margin', 'expected_profit')
+        })
+
+    def add_bid(self, row: Dict):
+        issue_number, agent_id = row['issue_number'], row['agent_id']
+        self.contracts.setdefault(issue_number, {'issue_number': issue_number})
+        self._agent(agent_id)
+
+        index = len(self.bids)
+        self.bids.append(dict(row))
+        self._bids_on.setdefault(issue_number, []).append(index)
+        self._bids_by.setdefault(agent_id, []).append(index)
+
+    def apply(self, record: Dict):
+        """Fold one ProfitLedger journal record (revenue or cost) into the graph."""
+        agent = self._agent(record['agent_id'])
+        if record['type'] == 'revenue':
+            agent['total_revenue'] += record['amount']
+        else:
+            agent['total_costs'] += record['amount']
+            if record.get('paid_to'):
+                self._add_payment(record['agent_id'], record)
+        agent['net_profit'] = agent['total_revenue'] - agent['total_costs']
+
+    @classmethod
+    def from_ledger(cls, ledger: Dict, graph: Optional['MarketplaceGraph'] = None) -> 'MarketplaceGraph':
+        """Agents and payments from a payment_ledger.json snapshot."""
+        graph = cls() if graph is None else graph
+        for agent_id, account in ledger['agents'].items():
+            graph.add_agent(dict(account, id=agent_id))
+            for transaction in account.get('transactions', ()):
+                if transaction.get('type') == 'cost' and transaction.get('paid_to'):
+                    graph._add_payment(agent_id, transaction)
+        return graph
+
+    def _agent(self, agent_id: str) -> Dict:
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            agent = self.agents[agent_id] = {'total_revenue': 0.0, 'total_costs': 0.0, 'net_profit': 0.0}
+        return agent
+
+    def _add_payment(self, payer: str, record: Dict):
+        self._agent(record['paid_to'])
+        self._paid.setdefault(payer, []).append({
+            'paid_to': record['paid_to'],
+            'contract_id': record['contract_id'],
+            'amount': record['amount'],
+        })
+
+    # Queries
+
+    def holders(self, query: str) -> List[str]:
+        """Agents who know the response to a query (the "who can solve" query)."""
+        return list(self._holders.get(query, ()))
+
+    def bids_on(self, issue_number: int) -> List[Dict]:
+        return [self.bids[i] for i in self._bids_on.get(issue_number, ())]
+
+    def bids_by(self, agent_id: str) -> List[Dict]:
+        return [self.bids[i] for i in self._bids_by.get(agent_id, ())]
+
+    def posted_by(self, agent_id: str) -> List[int]:
+        """Subcontracts an agent posted."""
+        return list(self._posted_by.get(agent_id, ()))
+
+    def poster(self, issue_number: int) -> Optional[Tuple[str, Dict]]:
+        """(agent_id, POSTED properties) for a subcontract, None for other contracts."""
+        return self._posted.get(issue_number)
+
+    def payments_by(self, agent_id: str) -> List[Dict]:
+        return list(self._paid.get(agent_id, ()))
+
+    def parent(self, issue_number: int) -> Optional[int]:
+        return self._parent.get(issue_number)
+
+    def subcontracts(self, issue_number: int) -> List[int]:
+        return list(self._children.get(issue_number, ()))
+
+    def chain(self, issue_number: int) -> List[int]:
+        """Contracts from the root down to this one, following SUBCONTRACT_OF."""
+        chain = [issue_number]
+        seen = {issue_number}
+        parent = self._parent.get(issue_number)
+        while parent is not None and parent not in seen:
+            chain.append(parent)
+            seen.add(parent)
+            parent = self._parent.get(parent)
+        chain.reverse()
+        return chain
+
+    def roots(self) -> List[int]:
+        """Contracts that are not subcontracts of anything (PRIMARY contracts)."""
+        return [number for number in self.contracts if number not in self._parent]
+
+    def subcontract_paths(self, root: Optional[int] = None) -> Iterator[Tuple[int, ...]]:
+        """
+        Every path root <- ... <- sub, one per descendant, depth first.
+
+        The native form of
+            MATCH path = (primary:Contract {type: 'PRIMARY'})<-[:SUBCONTRACT_OF*]-(sub)
+        for one root or every root.
+        """
+        for start in (self.roots() if root is None else [root]):
+            path = [start]
+            stack = [iter(self._children.get(start, ()))]
+            while stack:
+                child = next(stack[-1], None)
+                if child is None:
+                    stack.pop()
+                    path.pop()
+                    continue
+                if child in path:  # defensive: a cycle in bad data
+                    continue
+                path.append(child)
+                yield tuple(path)
+                stack.append(iter(self._children.get(child, ())))
+
+    def profit_flow(self) -> List[Dict]:
+        """
+        One row per (subcontract, bid on it): what the contractor who posted
+        the subcontract bid on the parent, and keeps after paying the subcontractor.
+
+        Covers every SUBCONTRACT_OF edge, so deeper chains appear once per level.
+        """
+        rows = []
+        for sub, (contractor, posted) in self._posted.items():
+            parent = self._parent.get(sub)
+            if parent is None:
+                continue
+            prime_bids = [bid for bid in self.bids_on(parent) if bid['agent_id'] == contractor]
+            if not prime_bids:
+                continue
+            prime_bid = prime_bids[0]['amount']
+            for bid in self.bids_on(sub):
+                rows.append({
+                    'contract': parent,
+                    'subcontract': sub,
+                    'total_value': self.contracts[parent].get('budget'),
+                    'prime_contractor': contractor,
+                    'prime_bid': prime_bid,
+                    'prime_expected_profit': posted.get('expected_profit'),
+                    'subcontractor': bid['agent_id'],
+                    'subcontract_bid': bid['amount'],
+                    'prime_actual_profit': prime_bid - bid['amount'],
+                })
+        return rows
+
+    def trace(self, query_text: str) -> Dict:
+        """
+        Who knows each hop of a recursive query, innermost first.
+
+        Returns dict with 'hops' ([{query, holders, response}]), 'answer'
+        (None when a hop is unknown) and 'resolvable'.
+        """
+        from agents.agent_subcontracting import QueryParser
+
+        chain, depth = QueryParser.parse(query_text)
+        hops = []
+        query = chain[0] if chain else None
+        for _ in range(depth):
+            holders = self.holders(query) if query is not None else []
+            response = self.knowledge[holders[0]][query] if holders else None
+            hops.append({'query': query, 'holders': holders, 'response': response})
+            if response is None:
+                return {'hops': hops, 'answer': None, 'resolvable': False}
+            query = response
+        return {'hops': hops, 'answer': query if hops else None, 'resolvable': bool(hops)}
+
+    # Export
+
+    def to_rows(self) -> Dict[str, List[Dict]]:
+        """The graph as neo4j_loader rows."""
+        return {
+            'agents': [dict(agent, id=agent_id) for agent_id, agent in self.agents.items()],
+            'knowledge': [
+                {'agent_id': agent_id, 'query': query, 'response': response}
+                for agent_id, facts in self.knowledge.items()
+                for query, response in facts.items()
+            ],
+            'contracts': [dict(contract) for contract in self.contracts.values()],
+            'subcontracts': [
+                dict(posted, issue_number=sub, parent=self._parent[sub], posted_by=agent_id)
+                for sub, (agent_id, posted) in self._posted.items()
+            ],
+            'bids': [dict(bid) for bid in self.bids],
+        }
+
+    def export(self, loader, clear: bool = False) -> Dict[str, Dict]:
+        """Load the graph into Neo4j through a neo4j_loader.Neo4jBulkLoader (clear: wipe it first)."""
+        return loader.load(self.to_rows(), clear=clear)
@@ -0,0 +1,177 @@
+"""
+Parsing of contract issue bodies and bid comments.
+
+All patterns are compiled once here. A body is scanned in a single pass by
+one alternation regex that yields `**Label:** value` fields, the
+"## Bid from <agent>" header and the capability proof, instead of
+splitting it into lines and testing each line with startswith().
+
+Comment parses are cached by (comment id, updated_at), so re-polling a
+long thread only parses comments that are new or were edited.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# One pass over the whole body; exactly one named group matches per token
+_TOKEN = re.compile(
+    r'^(?:[ \t]*[-*>][ \t]+|[ \t]*)\*\*(?P<label>Query|Budget|Agent ID|Agent|Bid Amount|Strategy|Status'
+    r'|Posted by|Parent Contract):\*\*'
+    r'[ \t]*(?P<value>[^\r\n]*)'
+    r'|^##[ \t]+Bid from[ \t]+(?P<bidder>[^\r\n]+)'
+    r'|(?P<test>"test_response")(?:[ \t]*:[ \t]*(?:"(?P<proof>[^"]*)"|(?P<raw_proof>[^,}\r\n]*)))?',
+    re.MULTILINE
+)
+_AMOUNT = re.compile(r'[-+]?\d[\d,]*(?:\.\d+)?')
+_GROUPED_AMOUNT = re.compile(r'[-+]?\d{1,3}(?:,\d{3})+(?:\.\d+)?')
+_ISSUE_REF = re.compile(r'#(\d+)')
+
+DEFAULT_CACHE_SIZE = 10000
+
+
+def tokenize(body: str) -> Dict[str, str]:
+    """
+    Extract marketplace fields from an issue body or comment.
+
+    Returns {label: raw value} for Query, Budget, Agent ID, Agent,
+    Bid Amount, Strategy, Status, Posted by and Parent Contract, plus
+    'bidder' and 'proof' when present. 'proof' is the test_response value
+    (a string's contents, any other value as written, '' if it has none).
+    The first occurrence of each field wins.
+    """
+    fields: Dict[str, str] = {}
+    for match in _TOKEN.finditer(body or ''):
+        if match.group('label'):
+            fields.setdefault(match.group('label'), match.group('value').strip())
+        elif match.group('bidder'):
+            fields.setdefault('bidder', match.group('bidder').strip())
+        else:
+            proof = match.group('proof')
+            if proof is None:
+                proof = (match.group('raw_proof') or '').strip()
+            fields.setdefault('proof', proof)
+    return fields
+
+
+def parse_amount(value: Optional[str]) -> Optional[float]:
+    """
+    First number in a field like "120 TFC", "$9.00" or "1,200 TFC", or None.
+
+    Commas are only accepted as thousands separators; anything else
+    ("1,2 TFC") is unparsable rather than read as a smaller number.
+    """
+    match = _AMOUNT.search(value or '')
+    if not match:
+        return None
+    number = match.group(0).rstrip(',')
+    if ',' in number:
+        if not _GROUPED_AMOUNT.fullmatch(number):
+            return None
+        number = number.replace(',', '')
+    return float(number)
+
+
+def parse_issue_body(body: str) -> Dict:
+    """
+    Parse a contract issue body.
+
+    Returns dict with 'query' and 'budget' (None when missing or unparsable).
+    """
+    fields = tokenize(body)
+    return {
+        'query': fields.get('Query') or None,
+        'budget': parse_amount(fields.get('Budget')),
+    }
+
+
+def parse_subcontract(body: str) -> Dict:
+    """
+    Parse the subcontract fields of an issue body.
+
+    Returns dict with 'posted_by' (agent id) and 'parent' (parent issue
+    number from a "#13" reference), None when missing.
+    """
+    fields = tokenize(body)
+    parent = _ISSUE_REF.search(fields.get('Parent Contract', ''))
+    return {
+        'posted_by': fields.get('Posted by') or None,
+        'parent': int(parent.group(1)) if parent else None,
+    }
+
+
+def parse_bid(comment_body: str) -> Dict:
+    """
+    Parse a bid from an issue comment.
+
+    Returns only the keys found: agent_id, bid_amount, capability_passed
+    (and capability_proof, the test_response value).
+    """
+    fields = tokenize(comment_body)
+    bid = {}
+
+    agent_id = fields.get('Agent ID') or fields.get('Agent') or fields.get('bidder')
+    if agent_id:
+        bid['agent_id'] = agent_id
+
+    amount = parse_amount(fields.get('Bid Amount'))
+    if amount is not None:
+        bid['bid_amount'] = amount
+
+    if '"test_response"' in (comment_body or ''):
+        # Capability challenge passed (present in bid)
+        bid['capability_passed'] = True
+        if 'proof' in fields:
+            bid['capability_proof'] = fields['proof']
+
+    return bid
+
+
+class CommentParseCache:
+    """LRU of parsed bids keyed by (comment id, updated_at)."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache: 'OrderedDict[Tuple, Dict]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, comment: Dict) -> Dict:
+        """Parse a GitHub comment dict (id, updated_at, body), reusing cached results."""
+        if comment.get('id') is None:
+            return parse_bid(comment.get('body', ''))
+
+        key = (comment['id'], comment.get('updated_at'))
+        parsed = self._cache.get(key)
+        if parsed is None:
+            self.misses += 1
+            parsed = parse_bid(comment.get('body', ''))
+            self._cache[key] = parsed
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return dict(parsed)
+
+    def clear(self):
+        self._cache.clear()
+
+
+_default_cache = CommentParseCache()
+
+
+def parse_comment(comment: Dict) -> Dict:
+    """Parse a GitHub comment through the process-wide cache."""
+    return _default_cache.parse(comment)
+
+
+def parse_bids(comments: List[Dict], cache: Optional[CommentParseCache] = None) -> List[Dict]:
+    """Bids (comments with an agent and an amount) from a thread, in order."""
+    cache = cache or _default_cache
+    bids = []
+    for comment in comments:
+        bid = cache.parse(comment)
+        if 'agent_id' in bid and 'bid_amount' in bid:
+            bids.append(bid)
+    return bids
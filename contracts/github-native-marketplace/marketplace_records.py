@@ -0,0 +1,186 @@
+"""
+Compact records for bids and evaluations.
+
+Bid and Evaluation are __slots__ classes: no per-instance dict, so one
+record is a fraction of the size of the equivalent dict with string keys.
+They keep the dict interface the rest of the code reads them through
+(record['value_score'], record.get('notes'), keys(), items(), item
+assignment) and convert to and from the existing dict shapes. Every
+declared field is a key, even when its value is None; only undeclared
+keys raise KeyError.
+
+RecordColumns goes further for bulk storage: one array.array per numeric
+field (struct of arrays), a few bytes per value instead of a Python float.
+
+Ledger transactions have their own slotted record, Transaction, in
+agents/agent_subcontracting.py next to ProfitLedger.
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+
+class Record:
+    """Slotted record with dict-style access to its declared fields."""
+
+    __slots__ = ()
+
+    # field -> array typecode used by RecordColumns ('' keeps Python objects)
+    COLUMN_TYPES: Dict[str, str] = {}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Record':
+        """Build from a dict; keys that are not fields are ignored."""
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def to_dict(self) -> Dict:
+        """The dict shape this record replaces."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Bid(Record):
+    """One bid on a contract (evaluate_bids.parse_bid shape)."""
+
+    __slots__ = ('agent_id', 'bid_amount', 'capability_passed', 'capability_proof')
+
+    COLUMN_TYPES = {'agent_id': '', 'bid_amount': 'd', 'capability_passed': 'b',
+                    'capability_proof': ''}
+
+    def __init__(self, agent_id=None, bid_amount=None, capability_passed=None,
+                 capability_proof=None):
+        self.agent_id = agent_id
+        self.bid_amount = bid_amount
+        self.capability_passed = capability_passed
+        self.capability_proof = capability_proof
+
+
+class Evaluation(Record):
+    """
+    A scored bid.
+
+    Field order follows evaluate_bids.evaluate_bids; run_single_query
+    evaluations use the subset agent_id, bid_amount, trust_score,
+    value_score and quality_per_tfc.
+    """
+
+    __slots__ = ('agent_id', 'bid_amount', 'trust_score', 'jobs_done', 'capability_passed',
+                 'risk_penalty', 'value_score', 'within_budget', 'notes', 'quality_per_tfc')
+
+    COLUMN_TYPES = {'agent_id': '', 'bid_amount': 'd', 'trust_score': 'd', 'jobs_done': 'q',
+                    'capability_passed': 'b', 'risk_penalty': 'd', 'value_score': 'd',
+                    'within_budget': 'b', 'notes': '', 'quality_per_tfc': 'd'}
+
+    def __init__(self, agent_id=None, bid_amount=None, trust_score=None, jobs_done=None,
+                 capability_passed=None, risk_penalty=None, value_score=None,
+                 within_budget=None, notes=None, quality_per_tfc=None):
+        self.agent_id = agent_id
+        self.bid_amount = bid_amount
+        self.trust_score = trust_score
+        self.jobs_done = jobs_done
+        self.capability_passed = capability_passed
+        self.risk_penalty = risk_penalty
+        self.value_score = value_score
+        self.within_budget = within_budget
+        self.notes = notes
+        self.quality_per_tfc = quality_per_tfc
+
+
+# Missing-value markers per typecode (fields are otherwise never negative)
+_MISSING = {'d': math.nan, 'b': -1, 'q': -1}
+
+
+class RecordColumns:
+    """
+    Struct-of-arrays storage for many records of one type.
+
+    Numeric fields are array.array columns (8 bytes per float, 1 per bool);
+    strings stay in lists, where repeated values share one object.
+    Indexing returns a record; to_dicts() returns the dict shape.
+    """
+
+    def __init__(self, record_type=Evaluation, records: Iterable = ()):
+        self.record_type = record_type
+        self.columns = {
+            name: array(code) if code else []
+            for name, code in record_type.COLUMN_TYPES.items()
+        }
+        self.extend(records)
+
+    @classmethod
+    def from_dicts(cls, dicts: Iterable[Dict], record_type=Evaluation) -> 'RecordColumns':
+        return cls(record_type, dicts)
+
+    def append(self, record):
+        """Append a record (or a dict of the same shape)."""
+        for name, column in self.columns.items():
+            value = record.get(name)
+            code = self.record_type.COLUMN_TYPES[name]
+            column.append(_MISSING[code] if code and value is None else value)
+
+    def extend(self, records: Iterable):
+        for record in records:
+            self.append(record)
+
+    def column(self, name: str):
+        """One field as a column (an array.array for numeric fields)."""
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(self.columns['agent_id'])
+
+    def __getitem__(self, i: int):
+        fields = {}
+        for name, column in self.columns.items():
+            value = column[i]
+            code = self.record_type.COLUMN_TYPES[name]
+            if code == 'd':
+                value = None if value != value else value
+            elif code:
+                value = None if value < 0 else (bool(value) if code == 'b' else value)
+            fields[name] = value
+        return self.record_type(**fields)
+
+    def __iter__(self) -> Iterator:
+        return (self[i] for i in range(len(self)))
+
+    def to_dicts(self) -> List[Dict]:
+        return [record.to_dict() for record in self]
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed marketplace store.
+
+Usage:
+    python marketplace_store.py import marketplace.db
+    python marketplace_store.py export marketplace.db <output_dir>
+
+Holds queries, agent knowledge, requester trust (scores and job history),
+contracts, bids and ledger entries in indexed tables, so scripts can ask
+for exactly what they need ("who knows Q112?", "bids on contract 13")
+instead of loading every JSON file wholesale. Imports from and exports to
+the existing JSON formats; fields outside the tables (descriptions, notes,
+policies) are kept per document so an import/export round trip is lossless.
+"""
+
+import json
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from knowledge_index import KnowledgeIndex
+
+DATA_DIR = Path(__file__).parent
+
+JSON_FILES = {
+    'master_db': 'master_query_database.json',
+    'knowledge': 'agent_knowledge_bases.json',
+    'trust': 'requester_trust_scores.json',
+    'ledger': 'agents/payment_ledger.json',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query_id TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    difficulty TEXT
+);
+CREATE TABLE IF NOT EXISTS agents (
+    rank INTEGER PRIMARY KEY,
+    agent_id TEXT NOT NULL UNIQUE,
+    specialization TEXT
+);
+CREATE TABLE IF NOT EXISTS knowledge (
+    agent_id TEXT NOT NULL,
+    query_id TEXT NOT NULL,
+    response TEXT NOT NULL,
+    PRIMARY KEY (agent_id, query_id)
+);
+CREATE INDEX IF NOT EXISTS knowledge_by_query ON knowledge (query_id);
+CREATE TABLE IF NOT EXISTS trust_scores (
+    requester_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    based_on_jobs INTEGER NOT NULL,
+    avg_quality REAL,
+    avg_speed REAL,
+    notes TEXT,
+    PRIMARY KEY (requester_id, agent_id)
+);
+CREATE TABLE IF NOT EXISTS trust_jobs (
+    job_id INTEGER PRIMARY KEY,
+    requester_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    query_id TEXT,
+    quality REAL,
+    speed REAL,
+    paid NUMERIC,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS trust_jobs_by_pair ON trust_jobs (requester_id, agent_id);
+CREATE TABLE IF NOT EXISTS contracts (
+    contract_id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    budget REAL NOT NULL,
+    type TEXT,
+    status TEXT,
+    parent_contract TEXT,
+    posted_by TEXT,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS contracts_by_parent ON contracts (parent_contract);
+CREATE TABLE IF NOT EXISTS bids (
+    bid_id INTEGER PRIMARY KEY,
+    contract_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    bid_amount REAL NOT NULL,
+    capability_passed INTEGER NOT NULL DEFAULT 0,
+    strategy TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS bids_by_contract ON bids (contract_id, bid_amount);
+CREATE INDEX IF NOT EXISTS bids_by_agent ON bids (agent_id);
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    seq INTEGER PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    contract_id TEXT,
+    amount REAL NOT NULL,
+    paid_to TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS ledger_by_agent ON ledger_entries (agent_id);
+"""
+
+BID_COLUMNS = ('contract_id', 'agent_id', 'bid_amount', 'capability_passed', 'strategy', 'created_at')
+
+
+class MarketplaceStore:
+    """Indexed SQLite storage for marketplace state."""
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'MarketplaceStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction."""
+        with self.conn:
+            yield self.conn
+
+    # ------------------------------------------------------------------
+    # Queries and knowledge
+
+    def response(self, query_id: str) -> Optional[str]:
+        """Correct response for a query, or None if unknown."""
+        row = self.conn.execute(
+            'SELECT response FROM queries WHERE query_id = ?', (query_id,)
+        ).fetchone()
+        return row['response'] if row else None
+
+    def query_ids(self) -> List[str]:
+        return [row[0] for row in self.conn.execute('SELECT query_id FROM queries ORDER BY rowid')]
+
+    def holders(self, query_id: str) -> List[str]:
+        """Agents who know the response to a query, in agent order."""
+        return [row[0] for row in self.conn.execute(
+            'SELECT k.agent_id FROM knowledge k JOIN agents a USING (agent_id) '
+            'WHERE k.query_id = ? ORDER BY a.rank', (query_id,)
+        )]
+
+    def knowledge_index(self, query_ids: Optional[Iterable[str]] = None) -> KnowledgeIndex:
+        """KnowledgeIndex over all knowledge, or only the given queries."""
+        sql = ('SELECT k.agent_id, k.query_id, k.response FROM knowledge k '
+               'JOIN agents a USING (agent_id)')
+        params: List[str] = []
+        if query_ids is not None:
+            params = list(query_ids)
+            sql += f" WHERE k.query_id IN ({','.join('?' * len(params))})"
+        sql += ' ORDER BY a.rank'
+
+        agents: Dict[str, Dict[str, str]] = {}
+        for row in self.conn.execute(sql, params):
+            agents.setdefault(row['agent_id'], {})[row['query_id']] = row['response']
+        return KnowledgeIndex(agents)
+
+    # ------------------------------------------------------------------
+    # Trust
+
+    def trust_score(self, requester_id: str, agent_id: str) -> Dict:
+        """One agent's trust entry for a requester ({} if never worked together)."""
+        row = self.conn.execute(
+            'SELECT score, based_on_jobs, avg_quality, avg_speed, notes FROM trust_scores '
+            'WHERE requester_id = ? AND agent_id = ?', (requester_id, agent_id)
+        ).fetchone()
+        return dict(row) if row else {}
+
+    def trust_data(self, requester_id: str, with_jobs: bool = False) -> Dict:
+        """
+        A requester's trust document in the requester_trust_scores.json shape.
+
+        Job history is only loaded when with_jobs is set; bid evaluation
+        needs the aggregates alone.
+        """
+        metadata = self._metadata(f'trust:{requester_id}')
+        if metadata is None:
+            return {"trust_scores": {}}
+
+        scores = {}
+        for row in self.conn.execute(
+            'SELECT * FROM trust_scores WHERE requester_id = ? ORDER BY rowid', (requester_id,)
+        ):
+            entry = {
+                'score': row['score'],
+                'based_on_jobs': row['based_on_jobs'],
+                'avg_quality': row['avg_quality'],
+                'avg_speed': row['avg_speed'],
+            }
+            if with_jobs:
+                entry['jobs'] = self.trust_jobs(requester_id, row['agent_id'])
+            entry['notes'] = row['notes']
+            scores[row['agent_id']] = entry
+        metadata['trust_scores'] = scores
+        return metadata
+
+    def trust_jobs(self, requester_id: str, agent_id: str) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(
+            'SELECT query_id, quality, speed, paid, date FROM trust_jobs '
+            'WHERE requester_id = ? AND agent_id = ? ORDER BY job_id', (requester_id, agent_id)
+        )]
+
+    # ------------------------------------------------------------------
+    # Contracts and bids
+
+    def add_contract(self, contract_id: str, query: str, budget: float, type: str = 'PRIMARY',
+                     status: str = 'OPEN', parent_contract: Optional[str] = None,
+                     posted_by: Optional[str] = None, url: Optional[str] = None):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO contracts VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (contract_id, query, budget, type, status, parent_contract, posted_by, url)
+            )
+
+    def contract(self, contract_id: str) -> Optional[Dict]:
+        row = self.conn.execute('SELECT * FROM contracts WHERE contract_id = ?', (contract_id,)).fetchone()
+        return dict(row) if row else None
+
+    def subcontracts(self, contract_id: str) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(
+            'SELECT * FROM contracts WHERE parent_contract = ?', (contract_id,)
+        )]
+
+    def add_bids(self, bids: Iterable[Dict]):
+        """Insert bids in one transaction (dicts with BID_COLUMNS keys)."""
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO bids ({', '.join(BID_COLUMNS)}) VALUES ({', '.join('?' * len(BID_COLUMNS))})",
+                (
+                    (b['contract_id'], b['agent_id'], b['bid_amount'],
+                     int(bool(b.get('capability_passed', False))),
+                     b.get('strategy'), b.get('created_at'))
+                    for b in bids
+                )
+            )
+
+    def iter_bids(self, contract_id: str, max_amount: Optional[float] = None) -> Iterator[Dict]:
+        """Stream a contract's bids (cheapest first), optionally capped at a budget."""
+        sql = 'SELECT * FROM bids WHERE contract_id = ?'
+        params: List = [contract_id]
+        if max_amount is not None:
+            sql += ' AND bid_amount <= ?'
+            params.append(max_amount)
+        for row in self.conn.execute(sql + ' ORDER BY bid_amount, bid_id', params):
+            bid = dict(row)
+            bid['capability_passed'] = bool(bid['capability_passed'])
+            yield bid
+
+    def bid_count(self, contract_id: str) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM bids WHERE contract_id = ?', (contract_id,)).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Ledger
+
+    def add_ledger_entry(self, agent_id: str, type: str, contract_id: str, amount: float,
+                         description: str, paid_to: Optional[str] = None):
+        with self.conn:
+            self._insert_ledger_entry(agent_id, {
+                'type': type, 'contract_id': contract_id, 'amount': amount,
+                'paid_to': paid_to, 'description': description
+            })
+
+    def agent_totals(self, agent_id: str) -> Dict[str, float]:
+        """Revenue, costs and net profit for one agent."""
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(CASE WHEN type = 'revenue' THEN amount END), 0.0), "
+            "COALESCE(SUM(CASE WHEN type = 'cost' THEN amount END), 0.0) "
+            "FROM ledger_entries WHERE agent_id = ?", (agent_id,)
+        ).fetchone()
+        return {'total_revenue': row[0], 'total_costs': row[1], 'net_profit': row[0] - row[1]}
+
+    # ------------------------------------------------------------------
+    # JSON import
+
+    def import_master_db(self, data: Dict):
+        with self.conn:
+            self._set_metadata('master_db', data, 'queries')
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO queries VALUES (?, ?, ?)',
+                ((q, v['response'], v.get('difficulty')) for q, v in data['queries'].items())
+            )
+
+    def import_knowledge(self, data: Dict):
+        with self.conn:
+            self._set_metadata('knowledge', data, 'agents')
+            self.conn.execute('DELETE FROM knowledge')
+            self.conn.execute('DELETE FROM agents')
+            for rank, (agent_id, agent_data) in enumerate(data['agents'].items()):
+                self.conn.execute('INSERT INTO agents VALUES (?, ?, ?)',
+                                  (rank, agent_id, agent_data.get('specialization')))
+                self.conn.executemany(
+                    'INSERT INTO knowledge VALUES (?, ?, ?)',
+                    ((agent_id, q, r) for q, r in agent_data['knowledge'].items())
+                )
+
+    def import_trust(self, data: Dict):
+        requester_id = data['requester_id']
+        with self.conn:
+            self._set_metadata(f'trust:{requester_id}', data, 'trust_scores')
+            self.conn.execute('DELETE FROM trust_scores WHERE requester_id = ?', (requester_id,))
+            self.conn.execute('DELETE FROM trust_jobs WHERE requester_id = ?', (requester_id,))
+            for agent_id, entry in data['trust_scores'].items():
+                self.conn.execute(
+                    'INSERT INTO trust_scores VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (requester_id, agent_id, entry['score'], entry['based_on_jobs'],
+                     entry.get('avg_quality'), entry.get('avg_speed'), entry.get('notes'))
+                )
+                self.conn.executemany(
+                    'INSERT INTO trust_jobs (requester_id, agent_id, query_id, quality, speed, paid, date) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    ((requester_id, agent_id, j.get('query_id'), j.get('quality'),
+                      j.get('speed'), j.get('paid'), j.get('date')) for j in entry.get('jobs', []))
+                )
+
+    def import_ledger(self, data: Dict):
+        """
+        Import a payment ledger as returned by agent_subcontracting.load_ledger
+        (the raw payment_ledger.json snapshot lacks its journaled transactions).
+        """
+        with self.conn:
+            self._set_metadata('ledger', data, 'agents')
+            self.conn.execute('DELETE FROM ledger_entries')
+            # Agents with no transactions still appear in the export
+            self._set_metadata('ledger_agents', list(data['agents']))
+            for agent_id, agent in data['agents'].items():
+                for transaction in agent['transactions']:
+                    self._insert_ledger_entry(agent_id, transaction)
+
+    def import_json_files(self, directory: Path = DATA_DIR):
+        """Import every marketplace JSON file from a directory."""
+        directory = Path(directory)
+        importers = {
+            'master_db': self.import_master_db,
+            'knowledge': self.import_knowledge,
+            'trust': self.import_trust,
+            'ledger': self.import_ledger,
+        }
+        for name, filename in JSON_FILES.items():
+            if name == 'ledger':
+                # Snapshot plus the transactions journaled since it was written
+                from agents.agent_subcontracting import load_ledger
+                importers[name](load_ledger(str(directory / filename)))
+                continue
+            with open(directory / filename) as f:
+                importers[name](json.load(f))
+
+    # ------------------------------------------------------------------
+    # JSON export
+
+    def export_master_db(self) -> Dict:
+        data = self._metadata('master_db') or {}
+        data['queries'] = {
+            row['query_id']: _without_none({'response': row['response'], 'difficulty': row['difficulty']})
+            for row in self.conn.execute('SELECT * FROM queries ORDER BY rowid')
+        }
+        return data
+
+    def export_knowledge(self) -> Dict:
+        data = self._metadata('knowledge') or {}
+        agents = {}
+        for row in self.conn.execute('SELECT * FROM agents ORDER BY rank'):
+            agents[row['agent_id']] = _without_none({
+                'knowledge': {
+                    k['query_id']: k['response'] for k in self.conn.execute(
+                        'SELECT query_id, response FROM knowledge WHERE agent_id = ? ORDER BY rowid',
+                        (row['agent_id'],)
+                    )
+                },
+                'specialization': row['specialization'],
+            })
+        data['agents'] = agents
+        return data
+
+    def export_trust(self, requester_id: str) -> Dict:
+        return self.trust_data(requester_id, with_jobs=True)
+
+    def export_ledger(self) -> Dict:
+        data = self._metadata('ledger') or {}
+        agents = {agent_id: None for agent_id in self._metadata('ledger_agents') or []}
+        for row in self.conn.execute('SELECT DISTINCT agent_id FROM ledger_entries ORDER BY seq'):
+            agents.setdefault(row['agent_id'], None)
+
+        for agent_id in agents:
+            transactions = [
+                _without_none({k: row[k] for k in ('type', 'contract_id', 'amount', 'paid_to', 'description')})
+                for row in self.conn.execute(
+                    'SELECT * FROM ledger_entries WHERE agent_id = ? ORDER BY seq', (agent_id,)
+                )
+            ]
+            agents[agent_id] = {**self.agent_totals(agent_id), 'transactions': transactions}
+        data['agents'] = agents
+        return data
+
+    def requester_ids(self) -> List[str]:
+        return [row[0][len('trust:'):] for row in self.conn.execute(
+            "SELECT name FROM documents WHERE name LIKE 'trust:%' ORDER BY rowid"
+        )]
+
+    def export_json_files(self, directory: Path):
+        """Write every marketplace JSON file (one trust file per requester)."""
+        directory = Path(directory)
+        (directory / 'agents').mkdir(parents=True, exist_ok=True)
+
+        documents = {
+            JSON_FILES['master_db']: self.export_master_db(),
+            JSON_FILES['knowledge']: self.export_knowledge(),
+            JSON_FILES['ledger']: self.export_ledger(),
+        }
+        requesters = self.requester_ids()
+        for requester_id in requesters:
+            filename = JSON_FILES['trust'] if len(requesters) == 1 else f"requester_trust_scores.{requester_id}.json"
+            documents[filename] = self.export_trust(requester_id)
+
+        for filename, data in documents.items():
+            with open(directory / filename, 'w') as f:
+                json.dump(data, f, indent=2)
+
+    # ------------------------------------------------------------------
+
+    def _insert_ledger_entry(self, agent_id: str, transaction: Dict):
+        self.conn.execute(
+            'INSERT INTO ledger_entries (agent_id, type, contract_id, amount, paid_to, description) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (agent_id, transaction['type'], transaction.get('contract_id'), transaction['amount'],
+             transaction.get('paid_to'), transaction.get('description'))
+        )
+
+    def _set_metadata(self, name: str, data, table_key: Optional[str] = None):
+        """Store a document minus its tabular part (kept as a placeholder for key order)."""
+        if table_key is not None:
+            data = {k: (None if k == table_key else v) for k, v in data.items()}
+        self.conn.execute('INSERT OR REPLACE INTO documents VALUES (?, ?)', (name, json.dumps(data)))
+
+    def _metadata(self, name: str):
+        row = self.conn.execute('SELECT metadata FROM documents WHERE name = ?', (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def _without_none(d: Dict) -> Dict:
+    return {k: v for k, v in d.items() if v is not None}
+
+
+def main():
+    """Import the JSON files into a database, or export them back out."""
+    if len(sys.argv) < 3 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python marketplace_store.py import <db>")
+        print("       python marketplace_store.py export <db> <output_dir>")
+        sys.exit(1)
+
+    command, db_path = sys.argv[1], sys.argv[2]
+
+    with MarketplaceStore(db_path) as store:
+        if command == 'import':
+            store.import_json_files(DATA_DIR)
+            print(f"Imported {len(store.query_ids())} queries and "
+                  f"{len(store.requester_ids())} requester(s) into {db_path}")
+        else:
+            if len(sys.argv) < 4:
+                print("Error: export needs an output directory")
+                sys.exit(1)
+            store.export_json_files(Path(sys.argv[3]))
+            print(f"Exported {db_path} to {sys.argv[3]}")
+
+
+if __name__ == "__main__":
+    main()
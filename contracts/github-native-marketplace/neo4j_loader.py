@@ -0,0 +1,346 @@
+"""
+Bulk loader for the marketplace graph in Neo4j.
+
+Graph schema:
+    (Agent)-[:KNOWS]->(Knowledge)
+    (Agent)-[:POSTED {reason, margin, expected_profit}]->(Contract:SUBCONTRACT)
+    (Agent)-[:BID]->(Bid)-[:BID_ON]->(Contract)
+    (Contract:SUBCONTRACT)-[:SUBCONTRACT_OF]->(Contract:PRIMARY)
+
+Data is loaded as rows, one dict per node or relationship, grouped by kind
+(agents, knowledge, contracts, subcontracts, bids). Each kind has one
+parameterized statement, `UNWIND $rows AS row ...`, run once per batch of
+rows in a write transaction on a single session, so a million knowledge
+facts are a hundred round trips rather than a million literal CREATEs.
+Constraints and indexes are created first, so every MATCH on an agent id
+or issue number while loading is an index lookup.
+
+Rows come from the JSON data (agent_knowledge_bases.json, the payment
+ledger, the issue sync cache) via the *_rows() functions below, and are
+consumed lazily in batches.
+
+The neo4j driver is optional and only imported by connect(); FakeDriver
+records statements instead of running them (dry runs and tests).
+"""
+
+import itertools
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from marketplace_parsing import parse_comment, parse_issue_body, parse_subcontract, tokenize
+
+DEFAULT_BATCH_SIZE = 10000
+
+SCHEMA = [
+    "CREATE CONSTRAINT agent_id IF NOT EXISTS FOR (a:Agent) REQUIRE a.id IS UNIQUE",
+    "CREATE CONSTRAINT contract_id IF NOT EXISTS FOR (c:Contract) REQUIRE c.issue_number IS UNIQUE",
+    "CREATE INDEX knowledge_query IF NOT EXISTS FOR (k:Knowledge) ON (k.query)",
+]
+
+CLEAR = """
+MATCH (n)
+WHERE n:Contract OR n:Agent OR n:Bid OR n:Knowledge
+CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+# One statement per row kind; LOAD_ORDER loads endpoints before relationships
+STATEMENTS = {
+    'agents': """
+        UNWIND $rows AS row
+        MERGE (a:Agent {id: row.id})
+        SET a.total_revenue = row.total_revenue,
+            a.total_costs = row.total_costs,
+            a.net_profit = row.net_profit
+    """,
+    'knowledge': """
+        UNWIND $rows AS row
+        MATCH (a:Agent {id: row.agent_id})
+        CREATE (a)-[:KNOWS]->(:Knowledge {query: row.query, response: row.response})
+    """,
+    'contracts': """
+        UNWIND $rows AS row
+        MERGE (c:Contract {issue_number: row.issue_number})
+        SET c.title = row.title, c.query = row.query, c.budget = row.budget,
+            c.type = row.type, c.status = row.status, c.url = row.url,
+            c.created_at = coalesce(datetime(row.created_at), c.created_at, datetime())
+    """,
+    'subcontracts': """
+        UNWIND $rows AS row
+        MATCH (sub:Contract {issue_number: row.issue_number})
+        MATCH (parent:Contract {issue_number: row.parent})
+        MATCH (a:Agent {id: row.posted_by})
+        MERGE (sub)-[:SUBCONTRACT_OF]->(parent)
+        MERGE (a)-[p:POSTED]->(sub)
+        SET p.reason = row.reason, p.margin = row.margin, p.expected_profit = row.expected_profit
+    """,
+    'bids': """
+        UNWIND $rows AS row
+        MATCH (c:Contract {issue_number: row.issue_number})
+        MATCH (a:Agent {id: row.agent_id})
+        CREATE (b:Bid {amount: row.amount, strategy: row.strategy, status: row.status,
+                       timestamp: coalesce(datetime(row.timestamp), datetime())})
+        CREATE (a)-[:BID]->(b)
+        CREATE (b)-[:BID_ON]->(c)
+    """,
+}
+
+LOAD_ORDER = ('agents', 'knowledge', 'contracts', 'subcontracts', 'bids')
+
+
+def agent_rows(ledger: Optional[Dict] = None, knowledge: Optional[Dict] = None,
+               agent_ids: Iterable[str] = ()) -> List[Dict]:
+    """
+    Agent rows: ledger agents with their totals, then agents only in the
+    knowledge base or in `agent_ids` (e.g. bidders), with zero totals.
+    """
+    rows = {}
+    for agent_id, account in ((ledger or {}).get('agents') or {}).items():
+        rows[agent_id] = {
+            'id': agent_id,
+            'total_revenue': account.get('total_revenue', 0.0),
+            'total_costs': account.get('total_costs', 0.0),
+            'net_profit': account.get('net_profit', 0.0),
+        }
+    for agent_id in itertools.chain((knowledge or {}).get('agents') or {}, agent_ids):
+        rows.setdefault(agent_id, {'id': agent_id, 'total_revenue': 0.0,
+                                   'total_costs': 0.0, 'net_profit': 0.0})
+    return list(rows.values())
+
+
+def knowledge_rows(knowledge: Dict) -> Iterator[Dict]:
+    """One row per fact of an agent_knowledge_bases.json document, generated lazily."""
+    for agent_id, agent_data in knowledge['agents'].items():
+        for query, response in agent_data['knowledge'].items():
+            yield {'agent_id': agent_id, 'query': query, 'response': response}
+
+
+def contract_rows(issues: Iterable[Dict]) -> Iterator[Dict]:
+    """Contract rows from GitHub issues (e.g. the issue sync cache)."""
+    for issue in issues:
+        contract = parse_issue_body(issue.get('body'))
+        yield {
+            'issue_number': issue['number'],
+            'title': issue.get('title'),
+            'query': contract['query'],
+            'budget': contract['budget'],
+            'type': 'SUBCONTRACT' if (issue.get('title') or '').startswith('[SUBCONTRACT]') else 'PRIMARY',
+            'status': (issue.get('state') or 'open').upper(),
+            'url': issue.get('html_url'),
+            'created_at': issue.get('created_at'),
+        }
+
+
+def subcontract_rows(issues: Iterable[Dict]) -> Iterator[Dict]:
+    """SUBCONTRACT_OF / POSTED rows for subcontract issues naming a parent and poster."""
+    for issue in issues:
+        link = parse_subcontract(issue.get('body'))
+        if link['parent'] is None or link['posted_by'] is None:
+            continue
+        yield {
+            'issue_number': issue['number'],
+            'parent': link['parent'],
+            'posted_by': link['posted_by'],
+            'reason': None,
+            'margin': None,
+            'expected_profit': None,
+        }
+
+
+def bid_rows(comments_by_issue: Dict) -> Iterator[Dict]:
+    """
+    Bid rows from {issue number: comments}; comments that are not bids are skipped.
+
+    Comments may be a list or, as in the issue sync cache, {comment id: comment}.
+    """
+    for issue_number, comments in comments_by_issue.items():
+        if isinstance(comments, dict):
+            comments = sorted(comments.values(), key=lambda c: (c['created_at'], c['id']))
+        for comment in comments:
+            bid = parse_comment(comment)
+            if 'agent_id' not in bid or 'bid_amount' not in bid:
+                continue
+            fields = tokenize(comment.get('body'))
+            yield {
+                'issue_number': int(issue_number),
+                'agent_id': bid['agent_id'],
+                'amount': bid['bid_amount'],
+                'strategy': fields.get('Strategy'),
+                'status': fields.get('Status'),
+                'timestamp': comment.get('created_at'),
+            }
+
+
+def marketplace_rows(knowledge: Optional[Dict] = None, ledger: Optional[Dict] = None,
+                     issues: Iterable[Dict] = (), comments: Optional[Dict] = None) -> Dict[str, Iterable]:
+    """
+    Rows of every kind from whichever sources are given.
+
+    Subcontract and bid rows are built up front so that every agent they
+    name gets an Agent row; knowledge rows stay lazy.
+    """
+    issues = list(issues)
+    subcontracts = list(subcontract_rows(issues))
+    bids = list(bid_rows(comments or {}))
+    named = [row['posted_by'] for row in subcontracts] + [row['agent_id'] for row in bids]
+    return {
+        'agents': agent_rows(ledger, knowledge, named),
+        'knowledge': knowledge_rows(knowledge) if knowledge else [],
+        'contracts': contract_rows(issues),
+        'subcontracts': subcontracts,
+        'bids': bids,
+    }
+
+
+def batches(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Consecutive lists of at most `size` rows."""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _run_batch(tx, statement: str, batch: List[Dict]):
+    return tx.run(statement, rows=batch).consume()
+
+
+class Neo4jBulkLoader:
+    """Loads row batches through one session on a (pooled) driver."""
+
+    def __init__(self, driver, database: Optional[str] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        self.driver = driver
+        self.database = database
+        self.batch_size = batch_size
+        self._session = None
+        self.stats: Dict[str, Dict] = {}
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self.driver.session(database=self.database)
+        return self._session
+
+    def create_schema(self):
+        """Constraints and indexes; run before loading so MATCHes are index lookups."""
+        for statement in SCHEMA:
+            self.session.run(statement).consume()
+
+    def clear(self):
+        """Delete every marketplace node (itself batched server-side)."""
+        self.session.run(CLEAR).consume()
+
+    def load_rows(self, statement: str, rows: Iterable[Dict]) -> Dict:
+        """Run `statement` over rows, one write transaction per batch."""
+        count = 0
+        batch_count = 0
+        start = time.perf_counter()
+        for batch in batches(rows, self.batch_size):
+            self.session.execute_write(_run_batch, statement, batch)
+            count += len(batch)
+            batch_count += 1
+        return {'rows': count, 'batches': batch_count, 'seconds': time.perf_counter() - start}
+
+    def load(self, rows: Dict[str, Iterable], clear: bool = False) -> Dict[str, Dict]:
+        """
+        Create the schema, then load every kind in LOAD_ORDER.
+
+        clear=True first deletes every marketplace node already in the
+        database; by default rows are added to what is there.
+
+        Returns {kind: {'rows', 'batches', 'seconds'}}.
+        """
+        self.create_schema()
+        if clear:
+            self.clear()
+        for kind in LOAD_ORDER:
+            if kind in rows:
+                self.stats[kind] = self.load_rows(STATEMENTS[kind], rows[kind])
+        return self.stats
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self) -> 'Neo4jBulkLoader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect(uri: Optional[str] = None, user: Optional[str] = None,
+            password: Optional[str] = None):
+    """
+    Driver for a Neo4j server (NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD).
+
+    The driver keeps a connection pool; share one per process.
+    """
+    try:
+        from neo4j import GraphDatabase
+    except ImportError as e:
+        raise ImportError("The neo4j driver is not installed (pip install neo4j); "
+                          "use FakeDriver for a dry run") from e
+
+    uri = uri or os.environ.get('NEO4J_URI', 'bolt://localhost:7687')
+    user = user or os.environ.get('NEO4J_USER', 'neo4j')
+    password = password or os.environ.get('NEO4J_PASSWORD', '')
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    driver.verify_connectivity()
+    return driver
+
+
+class FakeDriver:
+    """
+    Stand-in for a neo4j driver that records what would run.
+
+    `statements` is a list of (statement, parameters) in execution order;
+    `transactions` counts write transactions.
+    """
+
+    def __init__(self):
+        self.statements: List = []
+        self.transactions = 0
+        self.sessions = 0
+
+    def session(self, database: Optional[str] = None) -> 'FakeSession':
+        self.sessions += 1
+        return FakeSession(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeResult:
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    """Session / transaction stand-in: run() records, execute_write() calls through."""
+
+    def __init__(self, driver: FakeDriver):
+        self.driver = driver
+
+    def run(self, statement: str, parameters: Optional[Dict] = None, **kwargs) -> FakeResult:
+        self.driver.statements.append((statement, dict(parameters or {}, **kwargs)))
+        return FakeResult()
+
+    def execute_write(self, work, *args, **kwargs):
+        self.driver.transactions += 1
+        return work(self, *args, **kwargs)
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> 'FakeSession':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
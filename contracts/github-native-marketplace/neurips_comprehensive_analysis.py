@@ -4,135 +4,126 @@ NeurIPS-Level Comprehensive Analysis of Knowledge-Based Marketplace
 Runs all 25 queries with statistical rigor, ablation studies, and baseline comparisons
 """
 
+import argparse
 import json
-import numpy as np
-from scipy import stats
 from typing import Dict, List, Tuple
 import itertools
 
-# Load data
-with open('master_query_database.json') as f:
-    master_db = json.load(f)
-with open('agent_knowledge_bases.json') as f:
-    knowledge = json.load(f)
-with open('requester_trust_scores.json') as f:
-    trust_data = json.load(f)
+import data_loader
+from bid_scoring import market_weights, value_score
+from knowledge_index import KnowledgeIndex, market_type_for
+from marketplace_records import Evaluation
+
+# NumPy and SciPy are imported inside the functions that use them, and the
+# data files are loaded on first use (data_loader), so importing this module
+# or running --help stays cheap.
+
+
+def __getattr__(name):
+    # master_db, knowledge, trust_data and index, loaded on first access
+    return data_loader.legacy_attribute(__name__, name)
+
 
 BUDGET = 120
 
 
 def simulate_bid(agent_id: str, trust_score: float, num_competitors: int,
-                 strategy: str = "default") -> float:
+                 strategy: str = "default", budget: float = BUDGET) -> float:
     """Simulate agent bidding strategy."""
 
     if strategy == "default":
         # Default competitive strategy
         if num_competitors == 0:
             # Monopoly
-            return BUDGET * 0.9
+            return budget * 0.9
         elif num_competitors == 1:
             # Duopoly
-            return BUDGET * (0.5 + trust_score * 0.27)
+            return budget * (0.5 + trust_score * 0.27)
         else:
             # High competition
-            return BUDGET * (0.5 + trust_score * 0.3)
+            return budget * (0.5 + trust_score * 0.3)
 
     elif strategy == "aggressive":
         # More aggressive pricing
         if num_competitors == 0:
-            return BUDGET * 0.95
+            return budget * 0.95
         else:
-            return BUDGET * (0.45 + trust_score * 0.25)
+            return budget * (0.45 + trust_score * 0.25)
 
     elif strategy == "conservative":
         # More conservative pricing
         if num_competitors == 0:
-            return BUDGET * 0.85
+            return budget * 0.85
         else:
-            return BUDGET * (0.55 + trust_score * 0.35)
+            return budget * (0.55 + trust_score * 0.35)
 
-    return BUDGET * 0.5
+    return budget * 0.5
 
 
 def evaluate_bid(bid_amount: float, trust_score: float, budget: float,
                  trust_weight: float = 0.6, price_weight: float = 0.4) -> float:
     """Evaluate bid using trust/price formula."""
-    price_score = 1.0 - (bid_amount / budget)
-    value_score = (trust_score * trust_weight + price_score * price_weight) * 100
-    return value_score
+    return value_score(trust_score, bid_amount, budget,
+                       weights=market_weights(trust_weight, price_weight), reject_invalid=False)
 
 
 def run_single_query(query_id: str, trust_weight: float = 0.6,
-                     strategy: str = "default") -> Dict:
-    """Simulate marketplace for a single query."""
+                     strategy: str = "default", budget: float = BUDGET,
+                     knowledge_index: KnowledgeIndex = None, trust_scores: Dict = None) -> Dict:
+    """
+    Simulate marketplace for a single query.
 
-    # Find knowledgeable agents
-    knowledgeable_agents = []
-    trust_scores_map = trust_data['trust_scores']
+    knowledge_index / trust_scores default to the loaded marketplace data;
+    pass others to run on synthetic markets (see benchmark.py).
+    """
+    knowledge_index = data_loader.knowledge_index() if knowledge_index is None else knowledge_index
 
-    for agent_id, agent_data in knowledge['agents'].items():
-        if query_id in agent_data['knowledge']:
-            knowledgeable_agents.append(agent_id)
+    # Find knowledgeable agents
+    knowledgeable_agents = knowledge_index.holders(query_id)
+    trust_scores_map = data_loader.trust_data()['trust_scores'] if trust_scores is None else trust_scores
 
     if len(knowledgeable_agents) == 0:
         return None
 
-    # Simulate bids
-    bids = []
+    # Simulate and evaluate bids
+    price_weight = 1.0 - trust_weight
     num_competitors = len(knowledgeable_agents) - 1
+    evaluations = []
 
     for agent_id in knowledgeable_agents:
         trust_info = trust_scores_map.get(agent_id, {})
         trust_score = trust_info.get('score', 0.5)
 
-        bid_amount = simulate_bid(agent_id, trust_score, num_competitors, strategy)
+        bid_amount = simulate_bid(agent_id, trust_score, num_competitors, strategy, budget)
+        value_score = evaluate_bid(bid_amount, trust_score, budget, trust_weight, price_weight)
 
-        bids.append({
-            'agent_id': agent_id,
-            'bid_amount': bid_amount,
-            'trust_score': trust_score
-        })
+        evaluations.append(Evaluation(
+            agent_id=agent_id,
+            bid_amount=bid_amount,
+            trust_score=trust_score,
+            value_score=value_score,
+            quality_per_tfc=trust_score / bid_amount
+        ))
 
-    # Evaluate bids
-    price_weight = 1.0 - trust_weight
-    evaluations = []
-
-    for bid in bids:
-        value_score = evaluate_bid(
-            bid['bid_amount'],
-            bid['trust_score'],
-            BUDGET,
-            trust_weight,
-            price_weight
-        )
-
-        evaluations.append({
-            **bid,
-            'value_score': value_score,
-            'quality_per_tfc': bid['trust_score'] / bid['bid_amount']
-        })
-
-    # Find winner
-    evaluations.sort(key=lambda x: x['value_score'], reverse=True)
-    winner = evaluations[0]
+    # Find winner (first of equal scores, as a stable descending sort would)
+    winner = max(evaluations, key=lambda x: x.value_score)
 
     return {
         'query_id': query_id,
         'num_agents': len(knowledgeable_agents),
-        'market_type': 'monopoly' if len(knowledgeable_agents) == 1 else
-                      'duopoly' if len(knowledgeable_agents) == 2 else
-                      'high_competition',
-        'winning_bid': winner['bid_amount'],
-        'winner_trust': winner['trust_score'],
-        'winner_value': winner['value_score'],
-        'winner_quality_per_tfc': winner['quality_per_tfc'],
-        'all_bids': [e['bid_amount'] for e in evaluations],
-        'winner_id': winner['agent_id']
+        'market_type': market_type_for(len(knowledgeable_agents)),
+        'winning_bid': winner.bid_amount,
+        'winner_trust': winner.trust_score,
+        'winner_value': winner.value_score,
+        'winner_quality_per_tfc': winner.quality_per_tfc,
+        'all_bids': [e.bid_amount for e in evaluations],
+        'winner_id': winner.agent_id
     }
 
 
 def run_comprehensive_experiments() -> Dict:
     """Run all 25 queries through marketplace."""
+    master_db = data_loader.master_db()
 
     results = {
         'monopoly': [],
@@ -150,105 +141,84 @@ def run_comprehensive_experiments() -> Dict:
     return results
 
 
-def statistical_analysis(results: Dict) -> Dict:
-    """Perform rigorous statistical analysis."""
+def statistical_analysis(results) -> Dict:
+    """
+    Perform rigorous statistical analysis.
 
-    stats_results = {}
+    `results` is {market_type: [query results]} or a results_table.ResultsTable;
+    every market type's statistics come from one grouped pass over its columns.
+    """
+    from results_table import ResultsTable
 
-    for market_type, queries in results.items():
-        if len(queries) == 0:
-            continue
+    table = results if isinstance(results, ResultsTable) else ResultsTable.from_results(results)
 
-        bids = [q['winning_bid'] for q in queries]
-        pct_of_budget = [(b / BUDGET) * 100 for b in bids]
-        quality_per_tfc = [q['winner_quality_per_tfc'] for q in queries]
+    bids = table.describe('winning_bid', median=True)
+    pct_of_budget = table.describe('winning_bid', scale=100 / BUDGET)
+    quality_per_tfc = table.describe('winner_quality_per_tfc')
 
+    stats_results = {}
+    for market_type, bid_stats in bids.items():
         stats_results[market_type] = {
-            'n': len(queries),
-            'winning_bid': {
-                'mean': np.mean(bids),
-                'std': np.std(bids, ddof=1),
-                'min': np.min(bids),
-                'max': np.max(bids),
-                'median': np.median(bids),
-                'ci_95': stats.t.interval(
-                    0.95,
-                    len(bids)-1,
-                    loc=np.mean(bids),
-                    scale=stats.sem(bids)
-                ) if len(bids) > 1 else (np.mean(bids), np.mean(bids))
-            },
-            'pct_of_budget': {
-                'mean': np.mean(pct_of_budget),
-                'std': np.std(pct_of_budget, ddof=1),
-                'ci_95': stats.t.interval(
-                    0.95,
-                    len(pct_of_budget)-1,
-                    loc=np.mean(pct_of_budget),
-                    scale=stats.sem(pct_of_budget)
-                ) if len(pct_of_budget) > 1 else (np.mean(pct_of_budget), np.mean(pct_of_budget))
-            },
-            'quality_per_tfc': {
-                'mean': np.mean(quality_per_tfc),
-                'std': np.std(quality_per_tfc, ddof=1),
-                'ci_95': stats.t.interval(
-                    0.95,
-                    len(quality_per_tfc)-1,
-                    loc=np.mean(quality_per_tfc),
-                    scale=stats.sem(quality_per_tfc)
-                ) if len(quality_per_tfc) > 1 else (np.mean(quality_per_tfc), np.mean(quality_per_tfc))
-            }
+            'n': bid_stats['n'],
+            'winning_bid': {key: bid_stats[key] for key in ('mean', 'std', 'min', 'max', 'median', 'ci_95')},
+            'pct_of_budget': {key: pct_of_budget[market_type][key] for key in ('mean', 'std', 'ci_95')},
+            'quality_per_tfc': {key: quality_per_tfc[market_type][key] for key in ('mean', 'std', 'ci_95')},
         }
 
     return stats_results
 
 
-def hypothesis_tests(results: Dict) -> Dict:
-    """Perform hypothesis tests for key claims."""
+def hypothesis_tests(results) -> Dict:
+    """
+    Perform hypothesis tests for key claims.
 
-    tests = {}
-
-    # Test 1: Competition reduces prices
-    monopoly_bids = [q['winning_bid'] for q in results['monopoly']]
-    duopoly_bids = [q['winning_bid'] for q in results['duopoly']]
+    Each test reports the pooled (Student) t-test, Welch's t-test for
+    unequal variances, and Cohen's d, all from the grouped moments.
+    """
+    from results_table import ResultsTable
 
-    if len(monopoly_bids) > 0 and len(duopoly_bids) > 0:
-        # Two-sample t-test: monopoly > duopoly
-        t_stat, p_value = stats.ttest_ind(monopoly_bids, duopoly_bids, alternative='greater')
+    table = results if isinstance(results, ResultsTable) else ResultsTable.from_results(results)
+    tests = {}
 
+    # Test 1: Competition reduces prices (monopoly > duopoly)
+    comparison = table.compare('winning_bid', ['monopoly'], ['duopoly'], alternative='greater')
+    if comparison:
         tests['monopoly_vs_duopoly_pricing'] = {
             'null_hypothesis': 'Monopoly and duopoly have same pricing',
             'alternative': 'Monopoly pricing > Duopoly pricing',
-            't_statistic': t_stat,
-            'p_value': p_value,
-            'significant_at_0.05': p_value < 0.05,
-            'effect_size_cohens_d': (np.mean(monopoly_bids) - np.mean(duopoly_bids)) /
-                                    np.sqrt((np.var(monopoly_bids, ddof=1) + np.var(duopoly_bids, ddof=1)) / 2)
+            **_test_fields(comparison)
         }
 
     # Test 2: Quality per TFC improves with competition
-    monopoly_quality = [q['winner_quality_per_tfc'] for q in results['monopoly']]
-    competitive_quality = [q['winner_quality_per_tfc'] for q in results['duopoly']] + \
-                         [q['winner_quality_per_tfc'] for q in results.get('high_competition', [])]
-
-    if len(monopoly_quality) > 0 and len(competitive_quality) > 0:
-        t_stat, p_value = stats.ttest_ind(competitive_quality, monopoly_quality, alternative='greater')
-
+    comparison = table.compare('winner_quality_per_tfc', ['duopoly', 'high_competition'], ['monopoly'],
+                               alternative='greater')
+    if comparison:
         tests['quality_improvement_with_competition'] = {
             'null_hypothesis': 'Quality/TFC same for monopoly and competition',
             'alternative': 'Competition quality/TFC > Monopoly quality/TFC',
-            't_statistic': t_stat,
-            'p_value': p_value,
-            'significant_at_0.05': p_value < 0.05,
-            'effect_size_cohens_d': (np.mean(competitive_quality) - np.mean(monopoly_quality)) /
-                                    np.sqrt((np.var(competitive_quality, ddof=1) + np.var(monopoly_quality, ddof=1)) / 2)
+            **_test_fields(comparison)
         }
 
     return tests
 
 
+def _test_fields(comparison: Dict) -> Dict:
+    return {
+        't_statistic': comparison['t_statistic'],
+        'p_value': comparison['p_value'],
+        'significant_at_0.05': comparison['p_value'] < 0.05,
+        'welch_t_statistic': comparison['welch_t_statistic'],
+        'welch_df': comparison['welch_df'],
+        'welch_p_value': comparison['welch_p_value'],
+        'effect_size_cohens_d': comparison['effect_size_cohens_d'],
+    }
+
+
 def ablation_study() -> Dict:
     """Test sensitivity to trust_weight parameter."""
+    import numpy as np
+
+    master_db = data_loader.master_db()
 
     ablation_results = {}
     trust_weights = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
@@ -274,8 +244,21 @@ def ablation_study() -> Dict:
     return ablation_results
 
 
-def baseline_comparisons(results: Dict) -> Dict:
-    """Compare trust-based selection to baselines."""
+def baseline_comparisons(results: Dict, streams=None) -> Dict:
+    """
+    Compare trust-based selection to baselines.
+
+    The random-selection baseline picks each query's agent from that
+    query's own stream (default rng_streams.default_streams()).
+    """
+    import numpy as np
+    from rng_streams import default_streams
+
+    streams = default_streams() if streams is None else streams
+
+    master_db = data_loader.master_db()
+    trust_data = data_loader.trust_data()
+    index = data_loader.knowledge_index()
 
     comparisons = {}
     all_queries = list(master_db['queries'].keys())
@@ -283,14 +266,12 @@ def baseline_comparisons(results: Dict) -> Dict:
     # Baseline 1: Random selection
     random_results = []
     for query_id in all_queries:
-        knowledgeable = []
-        for agent_id, agent_data in knowledge['agents'].items():
-            if query_id in agent_data['knowledge']:
-                knowledgeable.append(agent_id)
+        knowledgeable = index.holders(query_id)
 
         if len(knowledgeable) > 0:
             # Random agent
-            random_agent = np.random.choice(knowledgeable)
+            rng = streams.generator('baseline_comparisons', 'random_selection', query_id)
+            random_agent = rng.choice(knowledgeable)
             trust_info = trust_data['trust_scores'].get(random_agent, {})
             trust_score = trust_info.get('score', 0.5)
 
@@ -310,30 +291,27 @@ def baseline_comparisons(results: Dict) -> Dict:
         if result and len(result['all_bids']) > 0:
             lowest_bid = min(result['all_bids'])
             # Find agent with lowest bid
-            for agent_id, agent_data in knowledge['agents'].items():
-                if query_id in agent_data['knowledge']:
-                    trust_info = trust_data['trust_scores'].get(agent_id, {})
-                    trust_score = trust_info.get('score', 0.5)
-                    num_competitors = len([a for a, d in knowledge['agents'].items()
-                                         if query_id in d['knowledge']]) - 1
-                    bid = simulate_bid(agent_id, trust_score, num_competitors)
-                    if abs(bid - lowest_bid) < 0.01:
-                        lowest_bid_results.append({
-                            'bid': bid,
-                            'trust': trust_score,
-                            'quality_per_tfc': trust_score / bid
-                        })
-                        break
+            num_competitors = index.num_holders(query_id) - 1
+            for agent_id in index.holders(query_id):
+                trust_info = trust_data['trust_scores'].get(agent_id, {})
+                trust_score = trust_info.get('score', 0.5)
+                bid = simulate_bid(agent_id, trust_score, num_competitors)
+                if abs(bid - lowest_bid) < 0.01:
+                    lowest_bid_results.append({
+                        'bid': bid,
+                        'trust': trust_score,
+                        'quality_per_tfc': trust_score / bid
+                    })
+                    break
 
     # Baseline 3: Highest trust wins (ignore price)
     highest_trust_results = []
     for query_id in all_queries:
         knowledgeable = []
-        for agent_id, agent_data in knowledge['agents'].items():
-            if query_id in agent_data['knowledge']:
-                trust_info = trust_data['trust_scores'].get(agent_id, {})
-                trust_score = trust_info.get('score', 0.5)
-                knowledgeable.append((agent_id, trust_score))
+        for agent_id in index.holders(query_id):
+            trust_info = trust_data['trust_scores'].get(agent_id, {})
+            trust_score = trust_info.get('score', 0.5)
+            knowledgeable.append((agent_id, trust_score))
 
         if len(knowledgeable) > 0:
             # Highest trust agent
@@ -384,6 +362,17 @@ def baseline_comparisons(results: Dict) -> Dict:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=None,
+                        help="root seed for the random baseline (default MARKETPLACE_SEED or 0)")
+    args = parser.parse_args()
+
+    # Imported after parsing (rng_streams pulls in NumPy), so --help stays fast
+    from rng_streams import RngStreams
+
+    streams = RngStreams(args.seed)
+
     print("="*80)
     print("NeurIPS-Level Comprehensive Analysis")
     print("Knowledge-Based Competitive Marketplace")
@@ -434,6 +423,8 @@ if __name__ == "__main__":
         print(f"  H1: {test_data['alternative']}")
         print(f"  t-statistic: {test_data['t_statistic']:.4f}")
         print(f"  p-value: {test_data['p_value']:.6f}")
+        print(f"  Welch t: {test_data['welch_t_statistic']:.4f} (df={test_data['welch_df']:.1f}), "
+              f"p-value: {test_data['welch_p_value']:.6f}")
         print(f"  Significant at α=0.05: {'YES ✓' if test_data['significant_at_0.05'] else 'NO ✗'}")
         print(f"  Effect size (Cohen's d): {test_data['effect_size_cohens_d']:.4f}")
 
@@ -458,7 +449,7 @@ if __name__ == "__main__":
     print("BASELINE COMPARISONS")
     print("="*80)
 
-    baselines = baseline_comparisons(results)
+    baselines = baseline_comparisons(results, streams=streams)
     print("\nMethod              | Mean Bid | Mean Trust | Quality/TFC")
     print("-" * 65)
     for method, data in baselines['methods'].items():
@@ -4,32 +4,46 @@ Sensitivity Analysis and Robustness Checks for NeurIPS Submission
 Tests marketplace behavior under various perturbations
 """
 
+import argparse
 import json
-import numpy as np
-from scipy import stats
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
-
-# Load data
-with open('master_query_database.json') as f:
-    master_db = json.load(f)
-with open('agent_knowledge_bases.json') as f:
-    knowledge = json.load(f)
-with open('requester_trust_scores.json') as f:
-    trust_data = json.load(f)
+
+import data_loader
+from bid_scoring import MARKET_WEIGHTS, score_bids, value_score
+
+# NumPy, matplotlib and batched_market are imported inside the functions that
+# use them, and the data files are loaded on first use (data_loader), so
+# importing this module or running --help stays cheap.
+
+
+def __getattr__(name):
+    # master_db, knowledge, trust_data and index, loaded on first access
+    return data_loader.legacy_attribute(__name__, name)
+
 
 BUDGET = 120
 
 
-def simulate_market_with_noise(query_id, trust_noise_std=0.0, bid_noise_std=0.0):
-    """Simulate market with noise in trust scores and bids."""
+def simulate_market_with_noise(query_id, trust_noise_std=0.0, bid_noise_std=0.0, rng=None,
+                               knowledge_index=None, trust_scores=None, run=0):
+    """
+    Simulate market with noise in trust scores and bids.
+
+    Per-call reference path; batched_market.simulate_markets draws the same
+    noise in the same order and is what the Monte Carlo loops use.
+    Without an rng, the noise comes from the (query_id, run) stream of
+    rng_streams.default_streams(), so a call is reproducible on its own.
+    knowledge_index / trust_scores default to the loaded marketplace data.
+    """
+    import numpy as np
+
+    if rng is None:
+        from rng_streams import default_streams
+        rng = default_streams().generator('simulate_market_with_noise', query_id, run)
+    knowledge_index = data_loader.knowledge_index() if knowledge_index is None else knowledge_index
+    trust_scores = data_loader.trust_data()['trust_scores'] if trust_scores is None else trust_scores
 
     # Find knowledgeable agents
-    knowledgeable = []
-    for agent_id, agent_data in knowledge['agents'].items():
-        if query_id in agent_data['knowledge']:
-            knowledgeable.append(agent_id)
+    knowledgeable = knowledge_index.holders(query_id)
 
     if len(knowledgeable) == 0:
         return None
@@ -39,11 +53,11 @@ def simulate_market_with_noise(query_id, trust_noise_std=0.0, bid_noise_std=0.0)
     num_competitors = len(knowledgeable) - 1
 
     for agent_id in knowledgeable:
-        trust_info = trust_data['trust_scores'].get(agent_id, {})
+        trust_info = trust_scores.get(agent_id, {})
         base_trust = trust_info.get('score', 0.5)
 
         # Add noise to trust
-        trust = base_trust + np.random.normal(0, trust_noise_std)
+        trust = base_trust + rng.normal(0, trust_noise_std)
         trust = np.clip(trust, 0, 1)  # Keep in [0,1]
 
         # Calculate bid
@@ -55,7 +69,7 @@ def simulate_market_with_noise(query_id, trust_noise_std=0.0, bid_noise_std=0.0)
             bid = BUDGET * (0.5 + 0.3 * trust)
 
         # Add noise to bid
-        bid = bid + np.random.normal(0, bid_noise_std)
+        bid = bid + rng.normal(0, bid_noise_std)
         bid = np.clip(bid, 0, BUDGET)  # Keep in [0, B]
 
         bids.append({
@@ -65,11 +79,10 @@ def simulate_market_with_noise(query_id, trust_noise_std=0.0, bid_noise_std=0.0)
         })
 
     # Select winner
-    values = []
-    for b in bids:
-        price_score = 1.0 - (b['bid'] / BUDGET)
-        value = (0.6 * b['trust'] + 0.4 * price_score) * 100
-        values.append(value)
+    values = score_bids(
+        [b['trust'] for b in bids], [b['bid'] for b in bids], BUDGET,
+        weights=MARKET_WEIGHTS, reject_invalid=False
+    )['value_score']
 
     winner_idx = np.argmax(values)
     winner = bids[winner_idx]
@@ -80,55 +93,80 @@ def simulate_market_with_noise(query_id, trust_noise_std=0.0, bid_noise_std=0.0)
     }
 
 
-def robustness_to_noise():
-    """Test robustness to noise in trust scores and bids."""
+def robustness_to_noise(runs=100, streams=None):
+    """
+    Test robustness to noise in trust scores and bids.
+
+    Winning bids are summarized block by block (online_stats), so memory
+    does not grow with `runs`. Each noise level draws from its own
+    ('robustness', cell) streams (default rng_streams.default_streams()),
+    the same ones sweep_runner uses, so a parallel sweep reproduces these
+    numbers exactly.
+    """
+    from batched_market import MarketLayout, iter_market_blocks
+    from online_stats import RunningStats
+    from rng_streams import default_streams
+    from sweep_runner import DEFAULT_CELL, cell_name
+
+    streams = default_streams() if streams is None else streams
 
     print("="*80)
     print("ROBUSTNESS TO NOISE")
     print("="*80)
     print()
 
-    all_queries = list(master_db['queries'].keys())
+    all_queries = list(data_loader.master_db()['queries'].keys())
+    layout = MarketLayout(data_loader.knowledge_index(), data_loader.trust_data()['trust_scores'],
+                          all_queries, BUDGET)
     trust_noise_levels = [0.0, 0.05, 0.1, 0.15, 0.2]
     bid_noise_levels = [0.0, 5.0, 10.0, 15.0, 20.0]
 
     results = {}
 
+    def winning_bid_stats(**noise):
+        cell = dict(DEFAULT_CELL, **noise)
+        stats = RunningStats()
+        for _, shard_runs, rng in streams.shards(runs, 'robustness', cell_name(cell)):
+            # Summarized shard by shard and merged in order, as sweep_runner does
+            shard = RunningStats()
+            for block in iter_market_blocks(layout, shard_runs, trust_noise_std=cell['trust_noise'],
+                                            bid_noise_std=cell['bid_noise'], rng=rng):
+                shard.update(block['winning_bid'])
+            stats.merge(shard)
+        return stats
+
     # Test trust noise
     print("Testing trust score noise...")
     for noise_std in trust_noise_levels:
-        wins = []
-        for _ in range(100):  # Monte Carlo samples
-            for query_id in all_queries:
-                result = simulate_market_with_noise(query_id, trust_noise_std=noise_std)
-                if result:
-                    wins.append(result['winning_bid'])
+        # 100 Monte Carlo samples by default
+        stats = winning_bid_stats(trust_noise=noise_std)
 
         results[f'trust_noise_{noise_std}'] = {
-            'mean': np.mean(wins),
-            'std': np.std(wins)
+            'mean': stats.mean,
+            'std': stats.std()
         }
-        print(f"  Trust noise σ={noise_std:.2f}: Mean bid = {np.mean(wins):.2f} ± {np.std(wins):.2f}")
+        print(f"  Trust noise σ={noise_std:.2f}: Mean bid = {stats.mean:.2f} ± {stats.std():.2f}")
 
     # Test bid noise
     print("\nTesting bid noise...")
     for noise_std in bid_noise_levels:
-        wins = []
-        for _ in range(100):  # Monte Carlo samples
-            for query_id in all_queries:
-                result = simulate_market_with_noise(query_id, bid_noise_std=noise_std)
-                if result:
-                    wins.append(result['winning_bid'])
+        # 100 Monte Carlo samples by default
+        stats = winning_bid_stats(bid_noise=noise_std)
 
         results[f'bid_noise_{noise_std}'] = {
-            'mean': np.mean(wins),
-            'std': np.std(wins)
+            'mean': stats.mean,
+            'std': stats.std()
         }
-        print(f"  Bid noise σ={noise_std:.2f}: Mean bid = {np.mean(wins):.2f} ± {np.std(wins):.2f}")
+        print(f"  Bid noise σ={noise_std:.2f}: Mean bid = {stats.mean:.2f} ± {stats.std():.2f}")
 
     return results
 
 
+def market_value(trust, bid):
+    """Value score of one bid under the 0.6/0.4 market weighting."""
+    return value_score(trust, bid, BUDGET, weights=MARKET_WEIGHTS, reject_invalid=False)
+
+
 def test_strategic_manipulation():
     """Test if agents can manipulate by mis-reporting."""
 
@@ -152,8 +190,8 @@ def test_strategic_manipulation():
         bid_low = BUDGET * (0.5 + 0.27 * trust_low) * (1 - discount)
 
         # Calculate values
-        value_low = (0.6 * trust_low + 0.4 * (1 - bid_low/BUDGET)) * 100
-        value_high = (0.6 * trust_high + 0.4 * (1 - bid_high/BUDGET)) * 100
+        value_low = market_value(trust_low, bid_low)
+        value_high = market_value(trust_high, bid_high)
 
         winner = "LOW" if value_low > value_high else "HIGH"
 
@@ -190,8 +228,8 @@ def test_collusion_resistance():
     bid_a_collusion = BUDGET * 0.85
     bid_b_collusion = BUDGET * 0.85
 
-    value_a = (0.6 * trust_a + 0.4 * (1 - bid_a_collusion/BUDGET)) * 100
-    value_b = (0.6 * trust_b + 0.4 * (1 - bid_b_collusion/BUDGET)) * 100
+    value_a = market_value(trust_a, bid_a_collusion)
+    value_b = market_value(trust_b, bid_b_collusion)
 
     print(f"\nCollusion (both bid 85% of budget):")
     print(f"  Agent A: {bid_a_collusion:.2f} TFC, value={value_a:.2f}")
@@ -201,7 +239,7 @@ def test_collusion_resistance():
     # But a defector can win by bidding lower
     bid_defector = BUDGET * 0.75
     trust_defector = 0.6  # Even lower trust
-    value_defector = (0.6 * trust_defector + 0.4 * (1 - bid_defector/BUDGET)) * 100
+    value_defector = market_value(trust_defector, bid_defector)
 
     print(f"\nDefector joins (bids 75% despite lower trust):")
     print(f"  Defector: {bid_defector:.2f} TFC, trust={trust_defector}, value={value_defector:.2f}")
@@ -210,38 +248,61 @@ def test_collusion_resistance():
     print("\nConclusion: Collusion unstable - defectors can undercut and win")
 
 
-def monte_carlo_winners():
-    """Monte Carlo simulation to check winner distribution."""
+def monte_carlo_winners(runs=1000, streams=None):
+    """
+    Monte Carlo simulation to check winner distribution.
+
+    One StreamSummary (moments, quantile sketch, histogram) per competition
+    level, fed block by block, so memory stays constant in `runs`; returns
+    the summaries, which merge with those of other workers. Runs are drawn
+    shard by shard from the 'monte_carlo_winners' streams (default
+    rng_streams.default_streams()).
+    """
+    import numpy as np
+    from batched_market import MarketLayout, iter_market_blocks
+    from online_stats import Histogram, StreamSummary
+    from rng_streams import default_streams
+
+    streams = default_streams() if streams is None else streams
 
     print("\n" + "="*80)
     print("MONTE CARLO WINNER DISTRIBUTION")
     print("="*80)
     print()
 
-    all_queries = list(master_db['queries'].keys())
-    winner_counts = {}
+    all_queries = list(data_loader.master_db()['queries'].keys())
+    layout = MarketLayout(data_loader.knowledge_index(), data_loader.trust_data()['trust_scores'],
+                          all_queries, BUDGET)
+
+    columns = {
+        f"{num_agents}_agents": layout.num_agents == num_agents
+        for num_agents in np.unique(layout.num_agents)
+    }
+    winner_counts = {key: StreamSummary(histogram=Histogram(0, BUDGET, 120)) for key in columns}
 
-    for _ in range(1000):  # 1000 Monte Carlo runs
-        for query_id in all_queries:
-            result = simulate_market_with_noise(query_id, trust_noise_std=0.05, bid_noise_std=2.0)
-            if result:
-                num_agents = result['num_agents']
-                key = f"{num_agents}_agents"
-                if key not in winner_counts:
-                    winner_counts[key] = []
-                winner_counts[key].append(result['winning_bid'])
+    # 1000 Monte Carlo runs by default
+    for _, shard_runs, rng in streams.shards(runs, 'monte_carlo_winners'):
+        for block in iter_market_blocks(layout, shard_runs, trust_noise_std=0.05,
+                                        bid_noise_std=2.0, rng=rng):
+            for key, mask in columns.items():
+                winner_counts[key].update(block['winning_bid'][:, mask])
 
     print("Winner bid distributions with noise (σ_trust=0.05, σ_bid=2.0):")
     for key in sorted(winner_counts.keys()):
         bids = winner_counts[key]
         print(f"\n{key}:")
-        print(f"  Mean: {np.mean(bids):.2f} TFC")
-        print(f"  Std: {np.std(bids):.2f} TFC")
-        print(f"  95% CI: [{np.percentile(bids, 2.5):.2f}, {np.percentile(bids, 97.5):.2f}]")
+        print(f"  Mean: {bids.mean:.2f} TFC")
+        print(f"  Std: {bids.std():.2f} TFC")
+        print(f"  95% CI: [{bids.percentile(2.5):.2f}, {bids.percentile(97.5):.2f}]")
+
+    return winner_counts
 
 
 def generate_plots():
     """Generate plots for paper."""
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend
+    import matplotlib.pyplot as plt
 
     print("\n" + "="*80)
     print("GENERATING PLOTS")
@@ -289,6 +350,17 @@ def generate_plots():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=None,
+                        help="root seed for the Monte Carlo streams (default MARKETPLACE_SEED or 0)")
+    args = parser.parse_args()
+
+    # Imported after parsing (rng_streams pulls in NumPy), so --help stays fast
+    from rng_streams import RngStreams
+
+    streams = RngStreams(args.seed)
+
     print("="*80)
     print("SENSITIVITY ANALYSIS & ROBUSTNESS CHECKS")
     print("For NeurIPS Submission")
@@ -296,10 +368,10 @@ if __name__ == "__main__":
     print()
 
     # Run all analyses
-    noise_results = robustness_to_noise()
+    noise_results = robustness_to_noise(streams=streams)
     test_strategic_manipulation()
     test_collusion_resistance()
-    monte_carlo_winners()
+    monte_carlo_winners(streams=streams)
     generate_plots()
 
     # Save results
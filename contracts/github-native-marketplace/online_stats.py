@@ -0,0 +1,296 @@
+"""
+Streaming, mergeable statistics for Monte Carlo loops.
+
+Accumulators take values a NumPy chunk at a time and keep constant-size
+state however many runs are fed in, and any two accumulators of the same
+kind can be merged, so parallel workers can each summarize their own runs
+and the parent combines the partial results:
+
+    RunningStats    count, mean, variance (Welford; chunks combined with
+                    Chan et al.'s pairwise update), min and max
+    QuantileSketch  t-digest style centroids, accurate in the tails
+                    (2.5 / 97.5 percentiles) with a bounded centroid count
+    Histogram       fixed-range bin counts with under/overflow
+    StreamSummary   the three together, with to_dict() for reports
+
+All state is plain attributes and arrays, so accumulators pickle cheaply
+between processes.
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 200
+
+
+class RunningStats:
+    """Count, mean, sum of squared deviations, min and max of a stream."""
+
+    __slots__ = ('n', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Welford's update for one value."""
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def update(self, values):
+        """Fold in a chunk of values (any shape)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        chunk = RunningStats()
+        chunk.n = values.size
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(np.square(values - chunk.mean).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Combine another accumulator into this one (Chan et al.); returns self."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def var(self, ddof: int = 0) -> float:
+        return self.m2 / (self.n - ddof) if self.n > ddof else math.nan
+
+    def std(self, ddof: int = 0) -> float:
+        return math.sqrt(self.var(ddof))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch (a merging t-digest).
+
+    Values are buffered and merged into weighted centroids once the buffer
+    holds `buffer_size` values; until then quantiles are exact.
+    Centroid sizes follow the arcsine scale function, so clusters near the
+    extremes hold few points and tail quantiles stay accurate; at most
+    about `compression` centroids are kept. Min and max are exact.
+    """
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION, buffer_size: int = 1 << 16):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum()) + self._buffered
+
+    def update(self, values):
+        """Add a chunk of values (any shape)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer.append(values)
+        self._buffered += values.size
+        if self._buffered >= self.buffer_size:
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Combine another sketch into this one (`other` is left as it was); returns self."""
+        if other.count == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(other.means) == 0:
+            # Only raw values: buffer them as update() would, staying exact while they fit
+            self._buffer.extend(other._buffer)
+            self._buffered += other._buffered
+            if self._buffered >= self.buffer_size:
+                self._compress()
+            return self
+        self._compress(np.concatenate([other.means] + other._buffer),
+                       np.concatenate([other.weights] + [np.ones(len(b)) for b in other._buffer]))
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile, q in [0, 1] (exact until the first compression)."""
+        if len(self.means) == 0 and self._buffer:
+            # Never compressed: the buffer (at most buffer_size values) is the stream
+            return float(np.quantile(np.concatenate(self._buffer), q))
+        self._compress()
+        if len(self.means) == 0:
+            return math.nan
+        if len(self.means) == 1:
+            return float(self.means[0])
+        if np.all(self.weights == 1):
+            # Nothing merged yet: the centroids are the sorted values themselves
+            return float(np.quantile(self.means, q))
+
+        total = self.weights.sum()
+        target = q * total
+        # Centroid i's mass is centred at cumulative weight mid[i]; the ends
+        # are pinned to the exact min and max
+        mid = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate(([0.0], mid, [total]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        return float(np.interp(target, positions, values))
+
+    def percentile(self, p: float) -> float:
+        return self.quantile(p / 100)
+
+    def _compress(self, means: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None):
+        """Merge the buffer (and extra centroids) into the centroids."""
+        parts_means = [self.means] + self._buffer
+        parts_weights = [self.weights] + [np.ones(len(b)) for b in self._buffer]
+        if means is not None:
+            parts_means.append(means)
+            parts_weights.append(weights)
+        self._buffer = []
+        self._buffered = 0
+
+        all_means = np.concatenate(parts_means)
+        all_weights = np.concatenate(parts_weights)
+        if len(all_means) <= 1:
+            self.means, self.weights = all_means, all_weights
+            return
+
+        order = np.argsort(all_means, kind='stable')
+        all_means, all_weights = all_means[order], all_weights[order]
+
+        # Cluster by the integer part of the arcsine scale k(q) at each
+        # item's cumulative-weight midpoint; clusters are contiguous runs
+        total = all_weights.sum()
+        q = (np.cumsum(all_weights) - all_weights / 2) / total
+        k = self.compression / math.pi * (np.arcsin(2 * q - 1) + math.pi / 2)
+        cluster = np.floor(k).astype(np.int64)
+        _, cluster = np.unique(cluster, return_inverse=True)
+
+        weights = np.bincount(cluster, weights=all_weights)
+        self.means = np.bincount(cluster, weights=all_means * all_weights) / weights
+        self.weights = weights
+
+
+class Histogram:
+    """Counts over equal-width bins of [low, high), plus under/overflow."""
+
+    def __init__(self, low: float, high: float, bins: int = 100):
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, len(self.counts) + 1)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        bins = len(self.counts)
+        index = np.floor((values - self.low) * (bins / (self.high - self.low))).astype(np.int64)
+        # The upper edge itself lands in the last bin (e.g. bids at the budget)
+        index[values == self.high] = bins - 1
+        self.underflow += int((index < 0).sum())
+        self.overflow += int((index >= bins).sum())
+        inside = index[(index >= 0) & (index < bins)]
+        self.counts += np.bincount(inside, minlength=bins)
+
+    def merge(self, other: 'Histogram') -> 'Histogram':
+        if (other.low, other.high, len(other.counts)) != (self.low, self.high, len(self.counts)):
+            raise ValueError("Histograms with different bins cannot be merged")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            'edges': self.edges.tolist(),
+            'counts': self.counts.tolist(),
+            'underflow': self.underflow,
+            'overflow': self.overflow,
+        }
+
+
+class StreamSummary:
+    """Moments, quantiles and (optionally) a histogram of one stream."""
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION,
+                 histogram: Optional[Histogram] = None):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(compression)
+        self.histogram = histogram
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.stats.update(values)
+        self.sketch.update(values)
+        if self.histogram is not None:
+            self.histogram.update(values)
+
+    def merge(self, other: 'StreamSummary') -> 'StreamSummary':
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram.merge(other.histogram)
+        return self
+
+    @property
+    def n(self) -> int:
+        return self.stats.n
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    def std(self, ddof: int = 0) -> float:
+        return self.stats.std(ddof)
+
+    def percentile(self, p: float) -> float:
+        return self.sketch.percentile(p)
+
+    def to_dict(self, percentiles: Iterable[float] = (2.5, 50, 97.5)) -> Dict:
+        summary = {
+            'n': self.stats.n,
+            'mean': self.stats.mean,
+            'std': self.stats.std(),
+            'min': self.stats.min,
+            'max': self.stats.max,
+            'percentiles': {p: self.percentile(p) for p in percentiles},
+        }
+        if self.histogram is not None:
+            summary['histogram'] = self.histogram.to_dict()
+        return summary
+
+
+def merge_all(accumulators: Iterable):
+    """Merge partial results (e.g. one per worker) into the first; None if empty."""
+    merged = None
+    for accumulator in accumulators:
+        merged = accumulator if merged is None else merged.merge(accumulator)
+    return merged
@@ -1,89 +1,25 @@
 #!/usr/bin/env python3
 """
-Query and visualize the marketplace graph from Neo4j.
-"""
-
-import json
-
-
-def print_section(title):
-    print()
-    print("="*80)
-    print(title)
-    print("="*80)
-    print()
+Query and visualize the marketplace graph.
 
+Usage:
+    python query_marketplace_graph.py                   # the Issue #13/#14 scenario
+    python query_marketplace_graph.py --knowledge --ledger agents/payment_ledger.json \\
+        --issues issue_sync_cache.json
+    python query_marketplace_graph.py --who-knows 10 --trace "What is response[response[222]]?"
+    python query_marketplace_graph.py --export          # also load it into Neo4j
 
-def main():
-    print_section("MARKETPLACE GRAPH VISUALIZATION")
-
-    # This would be populated by MCP neo4j queries
-    # For now, showing the structure
-
-    print("""
-Graph Schema:
-------------
+The graph is built in memory (marketplace_graph) from the same rows
+setup_neo4j_tracking loads, and the documented queries are answered
+natively; the equivalent Cypher is printed for use against Neo4j.
+"""
 
-(Agent)-[:KNOWS]->(Knowledge)
-(Agent)-[:POSTED {reason, margin, expected_profit}]->(Contract:SUBCONTRACT)
-(Agent)-[:BID]->(Bid)-[:BID_ON]->(Contract)
-(Contract:SUBCONTRACT)-[:SUBCONTRACT_OF]->(Contract:PRIMARY)
+import sys
+import time
 
-Current State:
--------------
-
-Agent_Proof_Generator_1:
-  KNOWS: {12→22, 222→10}
-  POSTED: Issue #14 (subcontract)
-    - Reason: "Needs response[10] to complete primary"
-    - Expected profit: $7.00
-    - Margin: 70%
-  BID: $9.00 on Issue #13
-    - Strategy: "Will subcontract for What is response[10]?"
-
-Agent_Proof_Generator_2:
-  KNOWS: {10→44, 34→09}
-  BID: $2.40 on Issue #14
-    - Strategy: "Direct knowledge - can solve immediately"
-
-Agent_Proof_Generator_3:
-  KNOWS: {44→88, 55→77}
-  (no activity yet)
-
-Contract Chain:
---------------
-
-Issue #13 (PRIMARY)
-  Query: "What is response[response[222]]?"
-  Budget: $10.00
-  Status: OPEN
-  ↑
-  |
-  SUBCONTRACT_OF
-  |
-Issue #14 (SUBCONTRACT)
-  Query: "What is response[10]?"
-  Budget: $3.00
-  Status: OPEN
-  Posted by: Agent_Proof_Generator_1
-
-Resolution Path:
----------------
-
-1. Agent_Proof_Generator_1 wins Issue #13 for $9.00
-2. Agent_Proof_Generator_1 accepts Agent_Proof_Generator_2's bid on Issue #14 for $2.40
-3. Agent_Proof_Generator_2 provides response[10] = 44
-4. Agent_Proof_Generator_1 completes response[response[222]]:
-   - response[222] = 10 (own knowledge)
-   - response[10] = 44 (from Agent_Proof_Generator_2)
-   - Final answer: 44
-5. Profit distribution:
-   - Agent_Proof_Generator_1: $9.00 - $2.40 = $6.60
-   - Agent_Proof_Generator_2: $2.40
-
-Query Examples:
---------------
+from marketplace_graph import MarketplaceGraph
 
+CYPHER_EXAMPLES = """
 # Find all subcontracting chains
 MATCH path = (primary:Contract {type: 'PRIMARY'})<-[:SUBCONTRACT_OF*]-(sub:Contract)
 RETURN path
@@ -121,7 +57,228 @@ RETURN
   a2.id as knows_second_hop,
   k2.query + '→' + k2.response as second_hop,
   k2.response as final_answer
-    """)
+"""
+
+# Agents with more facts than this are summarized rather than listed
+MAX_LISTED_FACTS = 10
+
+
+def print_section(title):
+    print()
+    print("="*80)
+    print(title)
+    print("="*80)
+    print()
+
+
+def _money(amount) -> str:
+    return "?" if amount is None else f"${amount:.2f}"
+
+
+def print_agents(graph: MarketplaceGraph):
+    for agent_id in graph.agents:
+        facts = graph.knowledge.get(agent_id, {})
+        posted = graph.posted_by(agent_id)
+        bids = graph.bids_by(agent_id)
+        payments = graph.payments_by(agent_id)
+
+        print(f"{agent_id}:")
+        if len(facts) > MAX_LISTED_FACTS:
+            print(f"  KNOWS: {len(facts)} facts")
+        elif facts:
+            print("  KNOWS: {" + ", ".join(f"{q}→{r}" for q, r in facts.items()) + "}")
+        for sub in posted:
+            _, props = graph.poster(sub)
+            print(f"  POSTED: Issue #{sub} (subcontract)")
+            if props.get('reason'):
+                print(f"    - Reason: \"{props['reason']}\"")
+            if props.get('expected_profit') is not None:
+                print(f"    - Expected profit: {_money(props['expected_profit'])}")
+            if props.get('margin') is not None:
+                print(f"    - Margin: {props['margin']:.0%}")
+        for bid in bids:
+            print(f"  BID: {_money(bid['amount'])} on Issue #{bid['issue_number']}")
+            if bid.get('strategy'):
+                print(f"    - Strategy: \"{bid['strategy']}\"")
+        for payment in payments:
+            print(f"  PAID: {_money(payment['amount'])} to {payment['paid_to']} "
+                  f"({payment['contract_id']})")
+        if not (posted or bids or payments):
+            print("  (no activity yet)")
+        print()
+
+
+def print_chains(graph: MarketplaceGraph):
+    paths = list(graph.subcontract_paths())
+    if not paths:
+        print("(no subcontracts)")
+        return
+    # Print maximal paths only: a path that is a prefix of the next is covered by it
+    for path, following in zip(paths, paths[1:] + [()]):
+        if following[:len(path)] == path:
+            continue
+        for i, number in enumerate(path):
+            contract = graph.contracts.get(number, {})
+            if i:
+                print("  ↑\n  |\n  SUBCONTRACT_OF\n  |")
+            print(f"Issue #{number} ({contract.get('type') or 'UNKNOWN'})")
+            if contract.get('query'):
+                print(f"  Query: \"{contract['query']}\"")
+            print(f"  Budget: {_money(contract.get('budget'))}")
+            if contract.get('status'):
+                print(f"  Status: {contract['status']}")
+            if graph.poster(number) is not None:
+                print(f"  Posted by: {graph.poster(number)[0]}")
+        print()
+
+
+def print_profit_flow(graph: MarketplaceGraph) -> list:
+    flow = graph.profit_flow()
+    if not flow:
+        print("(no subcontract with bids on both levels)")
+    for row in flow:
+        print(f"Issue #{row['contract']} ← Issue #{row['subcontract']} "
+              f"(total value {_money(row['total_value'])})")
+        print(f"  {row['prime_contractor']}: bid {_money(row['prime_bid'])}, "
+              f"expected profit {_money(row['prime_expected_profit'])}")
+        print(f"  {row['subcontractor']}: subcontract bid {_money(row['subcontract_bid'])}")
+        print(f"  {row['prime_contractor']}: {_money(row['prime_bid'])} - "
+              f"{_money(row['subcontract_bid'])} = {_money(row['prime_actual_profit'])}")
+        print()
+    return flow
+
+
+def print_who_knows(graph: MarketplaceGraph, query: str):
+    holders = graph.holders(query)
+    print(f"Query '{query}':")
+    if not holders:
+        print("  nobody knows it")
+    for agent_id in holders:
+        print(f"  {agent_id} → {graph.knowledge[agent_id][query]}")
+    print()
+
+
+def print_trace(graph: MarketplaceGraph, query_text: str):
+    result = graph.trace(query_text)
+    print(f"\"{query_text}\"")
+    for i, hop in enumerate(result['hops'], 1):
+        who = ", ".join(hop['holders']) or "nobody"
+        answer = "?" if hop['response'] is None else hop['response']
+        print(f"  hop {i}: {hop['query']}→{answer}  (known by {who})")
+    if result['resolvable']:
+        print(f"  Final answer: {result['answer']}")
+    else:
+        print("  Not resolvable with the current knowledge")
+    print()
+
+
+def build_graph(argv) -> tuple:
+    """The graph and a description of its source, from the command line."""
+    knowledge = ledger = sync_state = None
+    for i, arg in enumerate(argv):
+        if arg == "--knowledge":
+            import data_loader
+            knowledge = data_loader.knowledge()
+        elif arg == "--ledger" and i + 1 < len(argv):
+            from agents.agent_subcontracting import load_ledger
+            ledger = load_ledger(argv[i + 1])
+        elif arg == "--issues" and i + 1 < len(argv):
+            sync_state = _load_json(argv[i + 1])
+
+    if knowledge is None and ledger is None and sync_state is None:
+        from setup_neo4j_tracking import demo_rows
+        return MarketplaceGraph.from_rows(demo_rows()), "Issue #13/#14 scenario"
+
+    from neo4j_loader import marketplace_rows
+    graph = MarketplaceGraph.from_rows(marketplace_rows(
+        knowledge=knowledge,
+        issues=(sync_state or {}).get('issues', {}).values(),
+        comments=(sync_state or {}).get('comments', {}),
+    ))
+    if ledger is not None:
+        # Totals and PAID edges from the ledger (snapshot plus journal)
+        MarketplaceGraph.from_ledger(ledger, graph)
+    return graph, "JSON data"
+
+
+def _load_json(path: str):
+    import json
+    with open(path) as f:
+        return json.load(f)
+
+
+def _option(argv, name: str):
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return None
+
+
+def main():
+    start = time.perf_counter()
+    graph, source = build_graph(sys.argv)
+    elapsed = time.perf_counter() - start
+
+    print_section("MARKETPLACE GRAPH VISUALIZATION")
+    print(f"Source: {source}  ({len(graph.agents)} agents, {len(graph.contracts)} contracts, "
+          f"{len(graph.bids)} bids; built in {elapsed*1000:.1f} ms)")
+    print("""
+Graph Schema:
+------------
+
+(Agent)-[:KNOWS]->(Knowledge)
+(Agent)-[:POSTED {reason, margin, expected_profit}]->(Contract:SUBCONTRACT)
+(Agent)-[:BID]->(Bid)-[:BID_ON]->(Contract)
+(Contract:SUBCONTRACT)-[:SUBCONTRACT_OF]->(Contract:PRIMARY)
+""")
+
+    print("Current State:\n-------------\n")
+    print_agents(graph)
+
+    print("Contract Chains:\n---------------\n")
+    print_chains(graph)
+
+    print("Profit Flow:\n-----------\n")
+    flow = print_profit_flow(graph)
+
+    print("Who Can Solve:\n-------------\n")
+    who_knows = _option(sys.argv, "--who-knows")
+    if who_knows is None:
+        # Each subcontract's query is the one its poster could not answer
+        who_knows_queries = []
+        for row in flow:
+            query_text = graph.contracts[row['subcontract']].get('query') or ''
+            hops = graph.trace(query_text)['hops']
+            if hops:
+                who_knows_queries.append(hops[0]['query'])
+        who_knows_queries = list(dict.fromkeys(who_knows_queries))
+    else:
+        who_knows_queries = [who_knows]
+    for query in who_knows_queries:
+        print_who_knows(graph, query)
+
+    print("Knowledge Dependencies:\n----------------------\n")
+    trace_query = _option(sys.argv, "--trace")
+    if trace_query is None:
+        trace_queries = [graph.contracts[number].get('query') for number in graph.roots()]
+        trace_queries = [q for q in trace_queries if q]
+    else:
+        trace_queries = [trace_query]
+    for query_text in trace_queries:
+        print_trace(graph, query_text)
+
+    print("Query Examples (Neo4j):\n----------------------")
+    print(CYPHER_EXAMPLES)
+
+    if "--export" in sys.argv:
+        from neo4j_loader import Neo4jBulkLoader, connect
+        driver = connect()
+        try:
+            with Neo4jBulkLoader(driver) as loader:
+                stats = graph.export(loader)
+        finally:
+            driver.close()
+        print(f"Exported to Neo4j: {sum(s['rows'] for s in stats.values())} rows")
 
 
 if __name__ == "__main__":
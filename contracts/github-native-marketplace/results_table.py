@@ -0,0 +1,361 @@
+"""
+Columnar experiment results with grouped statistics.
+
+ResultsTable stores one row per simulated auction as typed NumPy columns
+(float64 measurements, int32 agent counts) plus an int8 market-type code
+(an index into knowledge_index.MARKET_TYPES), instead of one dict per query.
+Rows are appended a chunk at a time - from the per-query result dicts of
+run_single_query, or straight from batched_market blocks - and every chunk
+is folded into per-group moments (count, mean, M2, min, max) with
+np.bincount as it arrives, so summaries, confidence intervals and two-sample
+tests are computed from the moments in one grouped pass over the data.
+
+With keep_rows=False only the moments are kept: memory stays constant and
+10^8 auctions can be summarized; medians then need the rows and are None.
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from knowledge_index import MARKET_TYPES
+
+MARKET_CODES = {market_type: code for code, market_type in enumerate(MARKET_TYPES)}
+
+# Column -> dtype; the names match run_single_query's result keys
+COLUMNS = {
+    'winning_bid': np.float64,
+    'winner_trust': np.float64,
+    'winner_value': np.float64,
+    'winner_quality_per_tfc': np.float64,
+    'num_agents': np.int32,
+}
+
+
+def market_codes_for(num_agents: np.ndarray) -> np.ndarray:
+    """Vectorized market_type_for: int8 codes (-1 where no agent knows the query)."""
+    num_agents = np.asarray(num_agents)
+    codes = np.full(num_agents.shape, MARKET_CODES['high_competition'], dtype=np.int8)
+    codes[num_agents == 2] = MARKET_CODES['duopoly']
+    codes[num_agents == 1] = MARKET_CODES['monopoly']
+    codes[num_agents <= 0] = -1
+    return codes
+
+
+class Moments:
+    """Count, mean, M2 (sum of squared deviations), min and max of one sample."""
+
+    __slots__ = ('n', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 min: float = np.inf, max: float = -np.inf):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    @property
+    def var(self) -> float:
+        """Sample variance (ddof=1); nan below two observations."""
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.var)
+
+    def merge(self, other: 'Moments') -> 'Moments':
+        """Moments of the union of two samples (Chan et al.)."""
+        if other.n == 0:
+            return Moments(self.n, self.mean, self.m2, self.min, self.max)
+        if self.n == 0:
+            return Moments(other.n, other.mean, other.m2, other.min, other.max)
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        return Moments(
+            n,
+            self.mean + delta * other.n / n,
+            self.m2 + other.m2 + delta * delta * self.n * other.n / n,
+            min(self.min, other.min),
+            max(self.max, other.max),
+        )
+
+
+class GroupMoments:
+    """Moments of one column for every group, updated a chunk at a time."""
+
+    def __init__(self, groups: int = len(MARKET_TYPES)):
+        self.n = np.zeros(groups, dtype=np.int64)
+        self.mean = np.zeros(groups)
+        self.m2 = np.zeros(groups)
+        self.min = np.full(groups, np.inf)
+        self.max = np.full(groups, -np.inf)
+
+    def update(self, codes: np.ndarray, values: np.ndarray):
+        """Fold in a chunk: codes are group indexes, values the column."""
+        groups = len(self.n)
+        n = np.bincount(codes, minlength=groups)
+        present = n > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(codes, weights=values, minlength=groups) / n
+        deviation = values - mean[codes]
+        m2 = np.bincount(codes, weights=deviation * deviation, minlength=groups)
+
+        chunk_min = np.full(groups, np.inf)
+        chunk_max = np.full(groups, -np.inf)
+        np.minimum.at(chunk_min, codes, values)
+        np.maximum.at(chunk_max, codes, values)
+
+        # Chan et al. pairwise combination of the running and chunk moments
+        total = self.n + n
+        delta = np.where(present, mean - self.mean, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(present, n / total, 0.0)
+            cross = np.where(present, delta * delta * self.n * weight, 0.0)
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + np.where(present, m2, 0.0) + cross
+        self.n = total
+        self.min = np.minimum(self.min, chunk_min)
+        self.max = np.maximum(self.max, chunk_max)
+
+    def group(self, code: int) -> Moments:
+        return Moments(int(self.n[code]), self.mean[code], self.m2[code],
+                       self.min[code], self.max[code])
+
+    def merged(self, codes: Iterable[int]) -> Moments:
+        """Moments of several groups pooled together."""
+        moments = Moments()
+        for code in codes:
+            moments = moments.merge(self.group(code))
+        return moments
+
+
+def t_interval(mean, std, n, confidence: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Student t confidence interval for the mean, vectorized over groups.
+
+    Same as stats.t.interval(confidence, n - 1, loc=mean, scale=std / sqrt(n));
+    for n == 1 the interval collapses to (mean, mean).
+    """
+    from scipy import stats
+
+    mean, std, n = np.asarray(mean, dtype=float), np.asarray(std, dtype=float), np.asarray(n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        half = stats.t.ppf((1 + confidence) / 2, n - 1) * std / np.sqrt(n)
+    half = np.where(n > 1, half, 0.0)
+    return mean - half, mean + half
+
+
+def _p_value(t_stat: float, df: float, alternative: str) -> float:
+    from scipy import stats
+
+    if alternative == 'greater':
+        return stats.t.sf(t_stat, df)
+    if alternative == 'less':
+        return stats.t.cdf(t_stat, df)
+    return 2 * stats.t.sf(abs(t_stat), df)
+
+
+def student_t_test(a: Moments, b: Moments, alternative: str = 'two-sided') -> Dict:
+    """Pooled-variance two-sample t-test (stats.ttest_ind with equal_var=True)."""
+    df = a.n + b.n - 2
+    pooled = (a.m2 + b.m2) / df
+    t_stat = (a.mean - b.mean) / np.sqrt(pooled * (1 / a.n + 1 / b.n))
+    return {'t_statistic': t_stat, 'df': df, 'p_value': _p_value(t_stat, df, alternative)}
+
+
+def welch_t_test(a: Moments, b: Moments, alternative: str = 'two-sided') -> Dict:
+    """Unequal-variance (Welch) two-sample t-test with Welch-Satterthwaite df."""
+    va, vb = a.var / a.n, b.var / b.n
+    t_stat = (a.mean - b.mean) / np.sqrt(va + vb)
+    df = (va + vb) ** 2 / (va ** 2 / (a.n - 1) + vb ** 2 / (b.n - 1))
+    return {'t_statistic': t_stat, 'df': df, 'p_value': _p_value(t_stat, df, alternative)}
+
+
+def cohens_d(a: Moments, b: Moments) -> float:
+    """Mean difference over the root mean of the two sample variances."""
+    return (a.mean - b.mean) / np.sqrt((a.var + b.var) / 2)
+
+
+class ResultsTable:
+    """Typed columns of auction results, grouped by market type."""
+
+    def __init__(self, columns: Dict = None, keep_rows: bool = True, capacity: int = 1024):
+        """
+        Args:
+            columns: {name: dtype}, default COLUMNS
+            keep_rows: keep the rows (needed for medians and row access);
+                       False keeps only the grouped moments
+            capacity: initial rows allocated (grown by doubling)
+        """
+        self.dtypes = dict(COLUMNS if columns is None else columns)
+        self.keep_rows = keep_rows
+        self._size = 0
+        self._codes = np.empty(capacity if keep_rows else 0, dtype=np.int8)
+        self._columns = {
+            name: np.empty(capacity if keep_rows else 0, dtype=dtype)
+            for name, dtype in self.dtypes.items()
+        }
+        self.moments = {name: GroupMoments() for name in self.dtypes}
+
+    @classmethod
+    def from_results(cls, results: Dict[str, List], **kwargs) -> 'ResultsTable':
+        """From {market_type: [run_single_query results]} (the experiments' shape)."""
+        table = cls(**kwargs)
+        for market_type, rows in results.items():
+            if rows:
+                table.extend(market_type, rows)
+        return table
+
+    @classmethod
+    def from_market_blocks(cls, layout, blocks: Iterable[Dict[str, np.ndarray]],
+                           **kwargs) -> 'ResultsTable':
+        """
+        From batched_market blocks ((runs x queries) arrays), one row per
+        (run, query) auction, without materializing per-query results.
+        """
+        table = cls(**kwargs)
+        query_codes = market_codes_for(layout.num_agents)
+        num_agents = layout.num_agents.astype(np.int32)
+        for block in blocks:
+            runs = block['winning_bid'].shape[0]
+            values = {
+                'winning_bid': block['winning_bid'],
+                'num_agents': np.broadcast_to(num_agents, (runs, len(num_agents))),
+            }
+            if 'winner_trust' in block:
+                values['winner_trust'] = block['winner_trust']
+                values['winner_quality_per_tfc'] = block['winner_trust'] / block['winning_bid']
+            table.append(np.broadcast_to(query_codes, (runs, len(query_codes))).ravel(),
+                         **{name: value.ravel() for name, value in values.items()})
+        return table
+
+    def extend(self, market_type: str, rows: Sequence):
+        """Append result dicts (or records) of one market type."""
+        code = MARKET_CODES[market_type]
+        self.append(
+            np.full(len(rows), code, dtype=np.int8),
+            **{name: np.fromiter((row[name] for row in rows), dtype=dtype, count=len(rows))
+               for name, dtype in self.dtypes.items() if name in rows[0]}
+        )
+
+    def append(self, codes: np.ndarray, **values: np.ndarray):
+        """
+        Append a chunk: market codes plus one array per (known) column.
+
+        Rows coded -1 (queries no agent knows, so no auction) are dropped.
+        """
+        codes = np.asarray(codes, dtype=np.int8)
+        held = codes >= 0
+        if not held.all():
+            codes = codes[held]
+            values = {name: np.asarray(column)[held] for name, column in values.items()}
+        size = len(codes)
+        for name, column in values.items():
+            column = np.asarray(column, dtype=self.dtypes[name])
+            self.moments[name].update(codes, column.astype(np.float64, copy=False))
+            values[name] = column
+
+        if self.keep_rows:
+            self._reserve(self._size + size)
+            end = self._size + size
+            self._codes[self._size:end] = codes
+            for name, column in values.items():
+                self._columns[name][self._size:end] = column
+            # Columns left out of this chunk read as nan / 0
+            for name in self.dtypes.keys() - values.keys():
+                self._columns[name][self._size:end] = 0 if self.dtypes[name] is np.int32 else np.nan
+        self._size += size
+
+    def _reserve(self, size: int):
+        capacity = len(self._codes)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        self._codes = np.resize(self._codes, capacity)
+        for name in self._columns:
+            self._columns[name] = np.resize(self._columns[name], capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def codes(self) -> np.ndarray:
+        self._require_rows()
+        return self._codes[:self._size]
+
+    def column(self, name: str) -> np.ndarray:
+        """All values of a column (a view, in append order)."""
+        self._require_rows()
+        return self._columns[name][:self._size]
+
+    def values(self, name: str, market_type: str) -> np.ndarray:
+        """A column's values for one market type."""
+        return self.column(name)[self.codes == MARKET_CODES[market_type]]
+
+    def counts(self) -> Dict[str, int]:
+        """Rows per market type (market types with none left out)."""
+        n = next(iter(self.moments.values())).n if self.moments else np.zeros(len(MARKET_TYPES))
+        return {market_type: int(n[code]) for market_type, code in MARKET_CODES.items() if n[code]}
+
+    def describe(self, name: str, confidence: float = 0.95, scale: float = 1.0,
+                 median: bool = False) -> Dict[str, Dict]:
+        """
+        Per market type: n, mean, std, min, max, ci_95 (and median) of a column.
+
+        All groups' intervals come from one vectorized computation over the
+        grouped moments; `scale` multiplies the column (e.g. 100 / budget).
+        """
+        moments = self.moments[name]
+        n = moments.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(n > 1, np.sqrt(moments.m2 / (n - 1)), np.nan) * scale
+        mean = moments.mean * scale
+        low, high = t_interval(mean, std, n, confidence)
+
+        summary = {}
+        for market_type, code in MARKET_CODES.items():
+            if not n[code]:
+                continue
+            summary[market_type] = {
+                'n': int(n[code]),
+                'mean': mean[code],
+                'std': std[code],
+                'min': moments.min[code] * scale,
+                'max': moments.max[code] * scale,
+                'ci_95': (low[code], high[code]),
+            }
+            if median:
+                summary[market_type]['median'] = (
+                    np.median(self.values(name, market_type)) * scale if self.keep_rows else None
+                )
+        return summary
+
+    def compare(self, name: str, a: Sequence[str], b: Sequence[str],
+                alternative: str = 'greater') -> Dict:
+        """
+        Two-sample tests of a column between two sets of market types.
+
+        Returns Student (pooled) and Welch t statistics and p-values and
+        Cohen's d, or {} when either side is empty.
+        """
+        moments = self.moments[name]
+        first = moments.merged(MARKET_CODES[m] for m in a)
+        second = moments.merged(MARKET_CODES[m] for m in b)
+        if first.n == 0 or second.n == 0:
+            return {}
+        student = student_t_test(first, second, alternative)
+        welch = welch_t_test(first, second, alternative)
+        return {
+            'n': (first.n, second.n),
+            't_statistic': student['t_statistic'],
+            'p_value': student['p_value'],
+            'welch_t_statistic': welch['t_statistic'],
+            'welch_df': welch['df'],
+            'welch_p_value': welch['p_value'],
+            'effect_size_cohens_d': cohens_d(first, second),
+        }
+
+    def _require_rows(self):
+        if not self.keep_rows:
+            raise ValueError("ResultsTable was built with keep_rows=False; only grouped moments are kept")
@@ -0,0 +1,119 @@
+"""
+Reproducible random streams for the stochastic simulations.
+
+Every stream is a numpy Generator seeded by a SeedSequence whose spawn key
+is computed from a path such as
+
+    (experiment, cell, shard, query)
+
+rather than from the order streams are handed out. The whole path - each
+element tagged with its type and length - is hashed into a fixed-width
+spawn key, so two different paths (say ('robustness',) and two ints that
+happen to spell its hash) never share a stream. Any stream can be rebuilt
+on its own: re-running one failing cell or shard needs none of the others'
+draws, and splitting work across workers cannot change what each piece
+draws.
+
+Monte Carlo runs are cut into fixed-size shards (shards()), each with its
+own stream keyed by shard index, so a serial loop and a sharded parallel
+run of the same cell draw bit-for-bit the same numbers (and summarized
+shard by shard, in shard order, give the same statistics).
+
+The root seed is DEFAULT_SEED unless MARKETPLACE_SEED is set.
+"""
+
+import hashlib
+import os
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_SEED = 0
+RUNS_PER_SHARD = 1000
+
+PathPart = Union[int, str, float]
+
+# Spawn keys are this many 32-bit words (SeedSequence's word size)
+KEY_WORDS = 4
+
+
+def key_part(part: PathPart) -> bytes:
+    """
+    Encoding of one path element: its type, its length, then its value.
+
+    Ints (Python or numpy) share a type, as do floats, so 3 and np.int64(3)
+    are the same element while 3, 3.0 and '3' are all different.
+    """
+    if isinstance(part, (int, np.integer)) and not isinstance(part, (bool, np.bool_)):
+        kind, value = b'i', str(int(part))
+    elif isinstance(part, (float, np.floating)):
+        kind, value = b'f', repr(float(part))
+    elif isinstance(part, str):
+        kind, value = b's', part
+    else:
+        kind, value = type(part).__name__.encode(), repr(part)
+    data = value.encode()
+    return kind + len(kind).to_bytes(1, 'little') + len(data).to_bytes(8, 'little') + data
+
+
+def spawn_key(path: Tuple[PathPart, ...]) -> Tuple[int, ...]:
+    """KEY_WORDS 32-bit words hashed from a whole path."""
+    digest = hashlib.blake2b(b''.join(key_part(p) for p in path), digest_size=4 * KEY_WORDS).digest()
+    return tuple(int.from_bytes(digest[i:i + 4], 'little') for i in range(0, len(digest), 4))
+
+
+class RngStreams:
+    """Streams derived from one root seed, optionally under a path prefix."""
+
+    def __init__(self, seed: Optional[int] = None, prefix: Tuple[PathPart, ...] = ()):
+        if seed is None:
+            seed = int(os.environ.get('MARKETPLACE_SEED', DEFAULT_SEED))
+        self.seed = seed
+        self.prefix = tuple(prefix)
+
+    def seed_sequence(self, *path: PathPart) -> np.random.SeedSequence:
+        return np.random.SeedSequence(
+            self.seed, spawn_key=spawn_key(self.prefix + path)
+        )
+
+    def generator(self, *path: PathPart) -> np.random.Generator:
+        """The stream for a path (the same Generator state every time)."""
+        return np.random.Generator(np.random.PCG64(self.seed_sequence(*path)))
+
+    def child(self, *path: PathPart) -> 'RngStreams':
+        """Streams under a longer prefix, e.g. one experiment's or one cell's."""
+        return RngStreams(self.seed, self.prefix + path)
+
+    def shards(self, runs: int, *path: PathPart,
+               runs_per_shard: int = RUNS_PER_SHARD) -> Iterator[Tuple[int, int, np.random.Generator]]:
+        """
+        (shard index, runs in shard, stream) covering `runs` Monte Carlo runs.
+
+        Shard i always holds runs [i * runs_per_shard, ...) and draws from
+        path + (i,), whoever runs it.
+        """
+        for shard_index in range(num_shards(runs, runs_per_shard)):
+            yield (shard_index, shard_runs(runs, shard_index, runs_per_shard),
+                   self.generator(*path, shard_index))
+
+    def __repr__(self) -> str:
+        return f"RngStreams(seed={self.seed}, prefix={self.prefix!r})"
+
+
+def num_shards(runs: int, runs_per_shard: int = RUNS_PER_SHARD) -> int:
+    return max(0, -(-runs // runs_per_shard))
+
+
+def shard_runs(runs: int, shard_index: int, runs_per_shard: int = RUNS_PER_SHARD) -> int:
+    return max(0, min(runs_per_shard, runs - shard_index * runs_per_shard))
+
+
+_default: Optional[RngStreams] = None
+
+
+def default_streams() -> RngStreams:
+    """Process-wide streams over the default (or MARKETPLACE_SEED) root seed."""
+    global _default
+    if _default is None:
+        _default = RngStreams()
+    return _default
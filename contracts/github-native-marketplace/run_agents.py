@@ -1,30 +1,41 @@
 #!/usr/bin/env python3
 """
 Run agents to analyze and bid on open contracts.
+
+Usage:
+    python run_agents.py [--full] [--workers N] [--concurrency N]
+
+Only issues that are new or changed since the last round are analyzed;
+--full re-fetches and bids on every open issue, ignoring the sync cache.
+--workers fans the (issue x agent) analysis out over processes and
+--concurrency bounds how many issues' bids are posted at once.
 """
 
-import json
-import subprocess
-from agents.agent_subcontracting import (
-    AgentKnowledge,
-    SubcontractingAgent,
-    ProfitLedger,
-    QueryParser
-)
+import argparse
+from typing import TYPE_CHECKING
+
+# asyncio, the GitHub client and the agents are imported when a round runs,
+# so --help does not pay for them
+if TYPE_CHECKING:
+    from github_client import GitHubClient
+    from issue_sync import IssueSync
+
+# Issues whose bids are being posted at once
+DEFAULT_CONCURRENCY = 8
+
 
+async def get_open_issues(client: 'GitHubClient', sync: 'IssueSync' = None):
+    """
+    Get open query-task issues - only new or changed ones when syncing.
 
-def get_open_issues():
-    """Get all open query-task issues."""
-    result = subprocess.run(
-        ['gh', 'issue', 'list', '--label', 'query-task', '--json', 'number,title,body'],
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    return json.loads(result.stdout)
+    The sync cache is not saved; call sync.commit() once the bids are posted.
+    """
+    if sync is not None:
+        return (await sync.sync())['issues']
+    return await client.list_issues(labels=['query-task'])
 
 
-def post_bid(issue_number, agent_id, bid_amount, strategy):
+async def post_bid(client: 'GitHubClient', issue_number, agent_id, bid_amount, strategy):
     """Post a bid as a comment on an issue."""
     comment = f"""## Bid from {agent_id}
 
@@ -35,21 +46,46 @@ def post_bid(issue_number, agent_id, bid_amount, strategy):
 **Status:** Ready to execute
 """
 
-    subprocess.run(
-        ['gh', 'issue', 'comment', str(issue_number), '--body', comment],
-        capture_output=True,
-        text=True,
-        check=True
-    )
+    await client.create_comment(issue_number, comment)
     print(f"  ✅ {agent_id} bid ${bid_amount} on Issue #{issue_number}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true",
+                        help="bid on every open issue, ignoring the sync cache")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes analyzing contracts (default 1: in-process, 0: every CPU)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"issues whose bids are posted at once (default {DEFAULT_CONCURRENCY})")
+    args = parser.parse_args()
+
+    import asyncio
+
+    asyncio.run(run_round(incremental=not args.full, workers=args.workers or None,
+                          concurrency=args.concurrency))
+
+
+async def run_round(client: 'GitHubClient' = None, incremental: bool = True,
+                    workers: int = 1, concurrency: int = DEFAULT_CONCURRENCY):
+    """
+    Analyze open issues with every agent and post bids concurrently.
+
+    With incremental=True only issues that are new or changed since the
+    last round (per the issue sync cache) are analyzed. Analysis fans out
+    over `workers` processes (see contract_scheduler); bids are posted per
+    issue, at most `concurrency` issues at a time.
+    """
     print("="*80)
     print("RUNNING AGENTS ON OPEN CONTRACTS")
     print("="*80)
     print()
 
+    from agents.agent_subcontracting import AgentKnowledge, ProfitLedger
+    from contract_scheduler import ContractScheduler
+    from github_client import GitHubClient
+
     # Initialize agents
     agents = {
         "Agent_Proof_Generator_1": AgentKnowledge("Agent_Proof_Generator_1", {
@@ -66,73 +102,97 @@ def main():
         }),
     }
 
-    ledger = ProfitLedger("agents/payment_ledger.json")
+    with ProfitLedger("agents/payment_ledger.json") as ledger:
+        scheduler = ContractScheduler(agents, ledger, workers=workers)
+
+        if client is None:
+            async with GitHubClient.from_env() as client:
+                await _bid_on_open_issues(client, scheduler, incremental, concurrency)
+        else:
+            await _bid_on_open_issues(client, scheduler, incremental, concurrency)
 
-    # Get open issues
-    issues = get_open_issues()
-    print(f"Found {len(issues)} open contracts")
-    print()
 
-    # Have each agent analyze each issue
-    for issue in issues:
-        print(f"Issue #{issue['number']}: {issue['title']}")
-        print("-" * 80)
+def print_plan(plan):
+    """Report one issue's analysis, agent by agent."""
+    print(f"Issue #{plan.number}: {plan.title}")
+    print("-" * 80)
 
-        # Extract query from body
-        body = issue['body']
-        query_line = [line for line in body.split('\n') if '**Query:**' in line]
-        if not query_line:
-            print("  ⚠️  Could not extract query")
-            continue
+    if plan.error is not None:
+        print(f"  ⚠️  {plan.error}")
+        return
 
-        query = query_line[0].replace('**Query:**', '').strip()
+    print(f"  Query: {plan.query}")
+    print(f"  Budget: ${plan.budget} TFC")
+    print()
 
-        # Extract budget
-        budget_line = [line for line in body.split('\n') if '**Budget:**' in line]
-        if not budget_line:
-            print("  ⚠️  Could not extract budget")
-            continue
+    for agent_id, strategy in plan.strategies:
+        print(f"  {agent_id}:")
+        print(f"    Action: {strategy['action']}")
 
-        budget_str = budget_line[0].replace('**Budget:**', '').replace('TFC', '').strip()
-        budget = float(budget_str)
+        if strategy['action'] == 'bid_directly':
+            print(f"    Bid: ${strategy['bid_amount']:.2f}")
+        elif strategy['action'] == 'subcontract':
+            print(f"    Would subcontract: {strategy['subcontract_query']}")
+            print(f"    Subcontract budget: ${strategy['subcontract_budget']:.2f}")
+        else:
+            print(f"    Cannot bid - no knowledge")
 
-        print(f"  Query: {query}")
-        print(f"  Budget: ${budget} TFC")
         print()
 
-        # Each agent analyzes
-        for agent_id, knowledge in agents.items():
-            agent = SubcontractingAgent(knowledge, ledger)
-            strategy = agent.analyze_contract(query, budget)
-
-            print(f"  {agent_id}:")
-            print(f"    Action: {strategy['action']}")
-
-            if strategy['action'] == 'bid_directly':
-                print(f"    Bid: ${strategy['bid_amount']:.2f}")
-                # Post bid
-                post_bid(
-                    issue['number'],
-                    agent_id,
-                    f"{strategy['bid_amount']:.2f}",
-                    "Direct knowledge - can solve immediately"
-                )
-            elif strategy['action'] == 'subcontract':
-                print(f"    Would subcontract: {strategy['subcontract_query']}")
-                print(f"    Subcontract budget: ${strategy['subcontract_budget']:.2f}")
-                # Post bid indicating subcontracting strategy
-                post_bid(
-                    issue['number'],
-                    agent_id,
-                    f"{budget * 0.9:.2f}",
-                    f"Will subcontract for {strategy['subcontract_query']} to complete"
-                )
-            else:
-                print(f"    Cannot bid - no knowledge")
-
-            print()
+    print()
 
-        print()
+
+async def _bid_on_open_issues(client: 'GitHubClient', scheduler, incremental: bool = True,
+                              concurrency: int = DEFAULT_CONCURRENCY):
+    import asyncio
+
+    from issue_sync import IssueSync
+    from marketplace_parsing import parse_comment
+
+    # Get open issues
+    sync = IssueSync(client) if incremental else None
+    issues = await get_open_issues(client, sync)
+    print(f"Found {len(issues)} {'new or changed' if incremental else 'open'} contracts")
+    print()
+
+    # Every agent analyzes every issue; plans come back in issue order
+    plans = scheduler.analyze(issues)
+    for plan in plans:
+        print_plan(plan)
+
+    # Post each issue's bids together, a bounded number of issues at a time
+    slots = asyncio.Semaphore(concurrency)
+
+    async def post_issue_bids(plan) -> bool:
+        """Post one issue's bids; a failed bid is reported, not raised. True if all posted."""
+        bids = plan.bids()
+        if sync is not None:
+            # Agents whose bid is already on the issue (e.g. posted before a retry)
+            posted = {parse_comment(comment).get('agent_id') for comment in sync.issue_comments(plan.number)}
+            bids = [bid for bid in bids if bid[0] not in posted]
+        async with slots:
+            results = await asyncio.gather(*(
+                post_bid(client, plan.number, agent_id, amount, note)
+                for agent_id, amount, note in bids
+            ), return_exceptions=True)
+        failures = [(agent_id, result) for (agent_id, _, _), result in zip(bids, results)
+                    if isinstance(result, Exception)]
+        for agent_id, error in failures:
+            print(f"  ❌ {agent_id} could not bid on Issue #{plan.number}: {error!r}")
+        return not failures
+
+    posting = [plan for plan in plans if plan.error is None]
+    posted = await asyncio.gather(*(post_issue_bids(plan) for plan in posting))
+    failed = [plan.number for plan, ok in zip(posting, posted) if not ok]
+    if failed:
+        print(f"Bids failed on {len(failed)} issue(s): "
+              f"{', '.join(f'#{number}' for number in failed)}"
+              + (" - retried next round" if sync is not None else ""))
+
+    # Only now are this round's issues done with; if posting raised, the
+    # cache is not saved and the next round sees them again
+    if sync is not None:
+        sync.commit(failed=failed)
 
 
 if __name__ == "__main__":
@@ -1,178 +1,183 @@
 #!/usr/bin/env python3
 """
 Set up Neo4j graph database to track marketplace contracts, subcontracts, bids, and profit flows.
+
+Usage:
+    python setup_neo4j_tracking.py                      # the Issue #13/#14 scenario
+    python setup_neo4j_tracking.py --knowledge --ledger agents/payment_ledger.json \\
+        --issues issue_sync_cache.json
+    python setup_neo4j_tracking.py --synthetic-agents 200000 --dry-run
+    python setup_neo4j_tracking.py --clear ...          # wipe the graph first
+
+Loads through neo4j_loader (batched UNWIND statements, schema first) into
+the server at NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD. Existing nodes are
+kept unless --clear is given, which deletes every Agent, Contract, Bid and
+Knowledge node before loading. --dry-run uses a fake driver and reports
+what would run.
 """
 
 import json
-import subprocess
-
-
-def get_neo4j_cypher_queries():
-    """Generate Cypher queries to set up marketplace tracking."""
-
-    queries = []
-
-    # Clear existing data
-    queries.append({
-        "description": "Clear existing marketplace data",
-        "query": """
-        MATCH (n)
-        WHERE n:Contract OR n:Agent OR n:Bid OR n:Knowledge
-        DETACH DELETE n
-        """
-    })
-
-    # Create constraints
-    queries.append({
-        "description": "Create constraints",
-        "query": """
-        CREATE CONSTRAINT contract_id IF NOT EXISTS
-        FOR (c:Contract) REQUIRE c.issue_number IS UNIQUE
-        """
-    })
-
-    # Create agents
-    queries.append({
-        "description": "Create Agent nodes",
-        "query": """
-        CREATE (a1:Agent {
-            id: 'Agent_Proof_Generator_1',
-            total_revenue: 0.0,
-            total_costs: 0.0,
-            net_profit: 0.0
-        })
-        CREATE (a2:Agent {
-            id: 'Agent_Proof_Generator_2',
-            total_revenue: 0.0,
-            total_costs: 0.0,
-            net_profit: 0.0
-        })
-        CREATE (a3:Agent {
-            id: 'Agent_Proof_Generator_3',
-            total_revenue: 0.0,
-            total_costs: 0.0,
-            net_profit: 0.0
-        })
-        """
-    })
-
-    # Create agent knowledge
-    queries.append({
-        "description": "Create agent knowledge",
-        "query": """
-        MATCH (a1:Agent {id: 'Agent_Proof_Generator_1'})
-        CREATE (a1)-[:KNOWS]->(:Knowledge {query: '12', response: '22'})
-        CREATE (a1)-[:KNOWS]->(:Knowledge {query: '222', response: '10'})
-
-        WITH *
-        MATCH (a2:Agent {id: 'Agent_Proof_Generator_2'})
-        CREATE (a2)-[:KNOWS]->(:Knowledge {query: '10', response: '44'})
-        CREATE (a2)-[:KNOWS]->(:Knowledge {query: '34', response: '09'})
-
-        WITH *
-        MATCH (a3:Agent {id: 'Agent_Proof_Generator_3'})
-        CREATE (a3)-[:KNOWS]->(:Knowledge {query: '44', response: '88'})
-        CREATE (a3)-[:KNOWS]->(:Knowledge {query: '55', response: '77'})
-        """
-    })
-
-    # Create primary contract (Issue #13)
-    queries.append({
-        "description": "Create primary contract Issue #13",
-        "query": """
-        CREATE (c:Contract {
-            issue_number: 13,
-            title: '[RECURSIVE] What is response[response[222]]? - Budget: 10 TFC',
-            query: 'What is response[response[222]]?',
-            budget: 10.0,
-            type: 'PRIMARY',
-            status: 'OPEN',
-            url: 'https://github.com/Axiomatic-AI/FormalVerification/issues/13',
-            created_at: datetime()
-        })
-        """
-    })
-
-    # Create subcontract (Issue #14)
-    queries.append({
-        "description": "Create subcontract Issue #14",
-        "query": """
-        MATCH (parent:Contract {issue_number: 13})
-        CREATE (sub:Contract {
-            issue_number: 14,
-            title: '[SUBCONTRACT] What is response[10]? - Payment: 3.0000000000000004 TFC',
-            query: 'What is response[10]?',
-            budget: 3.0,
-            type: 'SUBCONTRACT',
-            status: 'OPEN',
-            url: 'https://github.com/Axiomatic-AI/FormalVerification/issues/14',
-            created_at: datetime()
-        })
-        MATCH (a1:Agent {id: 'Agent_Proof_Generator_1'})
-        CREATE (a1)-[:POSTED {
-            reason: 'Needs response[10] to complete primary contract',
-            margin: 0.7,
-            expected_profit: 7.0
-        }]->(sub)
-        CREATE (sub)-[:SUBCONTRACT_OF]->(parent)
-        """
-    })
-
-    # Create bids on Issue #13
-    queries.append({
-        "description": "Create bid on Issue #13",
-        "query": """
-        MATCH (c:Contract {issue_number: 13})
-        MATCH (a:Agent {id: 'Agent_Proof_Generator_1'})
-        CREATE (b:Bid {
-            amount: 9.0,
-            strategy: 'Will subcontract for What is response[10]? to complete',
-            status: 'Ready to execute',
-            timestamp: datetime()
-        })
-        CREATE (a)-[:BID]->(b)
-        CREATE (b)-[:BID_ON]->(c)
-        """
-    })
-
-    # Create bids on Issue #14
-    queries.append({
-        "description": "Create bid on Issue #14",
-        "query": """
-        MATCH (c:Contract {issue_number: 14})
-        MATCH (a:Agent {id: 'Agent_Proof_Generator_2'})
-        CREATE (b:Bid {
-            amount: 2.4,
-            strategy: 'Direct knowledge - can solve immediately',
-            status: 'Ready to execute',
-            timestamp: datetime()
-        })
-        CREATE (a)-[:BID]->(b)
-        CREATE (b)-[:BID_ON]->(c)
-        """
-    })
-
-    return queries
+import sys
+import time
+from typing import Dict
+
+from neo4j_loader import (
+    DEFAULT_BATCH_SIZE, LOAD_ORDER, FakeDriver, Neo4jBulkLoader, connect, marketplace_rows
+)
+
+
+def demo_rows() -> Dict:
+    """Rows for the 222 -> 10 -> 44 subcontracting scenario (Issues #13 and #14)."""
+    agents = {
+        "Agent_Proof_Generator_1": {"12": "22", "222": "10"},
+        "Agent_Proof_Generator_2": {"10": "44", "34": "09"},
+        "Agent_Proof_Generator_3": {"44": "88", "55": "77"},
+    }
+
+    return {
+        'agents': [
+            {'id': agent_id, 'total_revenue': 0.0, 'total_costs': 0.0, 'net_profit': 0.0}
+            for agent_id in agents
+        ],
+        'knowledge': [
+            {'agent_id': agent_id, 'query': query, 'response': response}
+            for agent_id, knowledge in agents.items()
+            for query, response in knowledge.items()
+        ],
+        'contracts': [
+            {
+                'issue_number': 13,
+                'title': '[RECURSIVE] What is response[response[222]]? - Budget: 10 TFC',
+                'query': 'What is response[response[222]]?',
+                'budget': 10.0,
+                'type': 'PRIMARY',
+                'status': 'OPEN',
+                'url': 'https://github.com/Axiomatic-AI/FormalVerification/issues/13',
+                'created_at': None,
+            },
+            {
+                'issue_number': 14,
+                'title': '[SUBCONTRACT] What is response[10]? - Payment: 3.0000000000000004 TFC',
+                'query': 'What is response[10]?',
+                'budget': 3.0,
+                'type': 'SUBCONTRACT',
+                'status': 'OPEN',
+                'url': 'https://github.com/Axiomatic-AI/FormalVerification/issues/14',
+                'created_at': None,
+            },
+        ],
+        'subcontracts': [
+            {
+                'issue_number': 14,
+                'parent': 13,
+                'posted_by': 'Agent_Proof_Generator_1',
+                'reason': 'Needs response[10] to complete primary contract',
+                'margin': 0.7,
+                'expected_profit': 7.0,
+            },
+        ],
+        'bids': [
+            {
+                'issue_number': 13,
+                'agent_id': 'Agent_Proof_Generator_1',
+                'amount': 9.0,
+                'strategy': 'Will subcontract for What is response[10]? to complete',
+                'status': 'Ready to execute',
+                'timestamp': None,
+            },
+            {
+                'issue_number': 14,
+                'agent_id': 'Agent_Proof_Generator_2',
+                'amount': 2.4,
+                'strategy': 'Direct knowledge - can solve immediately',
+                'status': 'Ready to execute',
+                'timestamp': None,
+            },
+        ],
+    }
+
+
+def _load_json(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
 
 
 def main():
+    knowledge = None
+    ledger = None
+    sync_state = None
+    synthetic_agents = None
+    batch_size = DEFAULT_BATCH_SIZE
+    dry_run = False
+    clear = False
+
+    for i, arg in enumerate(sys.argv):
+        if arg == "--knowledge":
+            import data_loader
+            knowledge = data_loader.knowledge()
+        elif arg == "--ledger" and i + 1 < len(sys.argv):
+            from agents.agent_subcontracting import load_ledger
+            ledger = load_ledger(sys.argv[i + 1])
+        elif arg == "--issues" and i + 1 < len(sys.argv):
+            sync_state = _load_json(sys.argv[i + 1])
+        elif arg == "--synthetic-agents" and i + 1 < len(sys.argv):
+            synthetic_agents = int(sys.argv[i + 1])
+        elif arg == "--batch-size" and i + 1 < len(sys.argv):
+            batch_size = int(sys.argv[i + 1])
+        elif arg == "--dry-run":
+            dry_run = True
+        elif arg == "--clear":
+            clear = True
+
+    if synthetic_agents is not None:
+        import numpy as np
+        from benchmark import generate_knowledge
+        knowledge = generate_knowledge(synthetic_agents, np.random.default_rng(0))
+
+    if knowledge is None and ledger is None and sync_state is None:
+        rows = demo_rows()
+        source = "Issue #13/#14 scenario"
+    else:
+        rows = marketplace_rows(
+            knowledge=knowledge,
+            ledger=ledger,
+            issues=(sync_state or {}).get('issues', {}).values(),
+            comments=(sync_state or {}).get('comments', {}),
+        )
+        source = "JSON data"
+
     print("="*80)
     print("SETTING UP NEO4J MARKETPLACE TRACKING")
     print("="*80)
+    print(f"Source: {source}  Batch size: {batch_size}  {'(dry run)' if dry_run else ''}"
+          f"{'  (clearing the graph first)' if clear else ''}")
     print()
 
-    queries = get_neo4j_cypher_queries()
-
-    for q in queries:
-        print(f"Executing: {q['description']}")
-        with open('/tmp/neo4j_query.cypher', 'w') as f:
-            f.write(q['query'])
-        print(f"  Query: {q['query'][:100]}...")
-        print()
-
+    if dry_run:
+        driver = FakeDriver()
+    else:
+        try:
+            driver = connect()
+        except ImportError:
+            print("The neo4j driver is not installed (pip install neo4j).")
+            print("Run with --dry-run to see what would be loaded without a server.")
+            sys.exit(1)
+    start = time.perf_counter()
+    try:
+        with Neo4jBulkLoader(driver, batch_size=batch_size) as loader:
+            stats = loader.load(rows, clear=clear)
+    finally:
+        driver.close()
+    elapsed = time.perf_counter() - start
+
+    for kind in LOAD_ORDER:
+        if kind in stats:
+            s = stats[kind]
+            print(f"  {kind:<14} {s['rows']:>10} rows  {s['batches']:>6} batches  {s['seconds']:>8.2f} s")
     print()
-    print("="*80)
-    print("Now use MCP neo4j tools to execute these queries")
+    print(f"Loaded in {elapsed:.2f} s")
+    if dry_run:
+        print(f"(dry run: {driver.transactions} write transactions, {len(driver.statements)} statements recorded)")
     print("="*80)
 
 
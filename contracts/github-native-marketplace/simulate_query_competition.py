@@ -5,38 +5,39 @@ Simulate competitive bidding in knowledge-based marketplace.
 Demonstrates how multiple agents knowing the same answer creates price competition.
 """
 
-import json
+import sys
 from typing import List, Dict
 
+import data_loader
+from knowledge_index import KnowledgeIndex
+
 def load_data():
-    """Load all marketplace data."""
-    with open('master_query_database.json') as f:
-        master_db = json.load(f)
+    """Load all marketplace data (cached read-only views, see data_loader)."""
+    return data_loader.master_db(), data_loader.knowledge(), data_loader.trust_data()
 
-    with open('agent_knowledge_bases.json') as f:
-        knowledge = json.load(f)
+def load_data_from_store(db_path: str, query_ids: List[str], requester_id: str = "dirk-ax"):
+    """Load only the given queries' data from a marketplace store."""
+    from marketplace_store import MarketplaceStore
 
-    with open('requester_trust_scores.json') as f:
-        trust_data = json.load(f)
+    with MarketplaceStore(db_path) as store:
+        master_db = {'queries': {q: {'response': store.response(q)} for q in query_ids}}
+        index = store.knowledge_index(query_ids)
+        trust_data = store.trust_data(requester_id)
 
-    return master_db, knowledge, trust_data
+    return master_db, index, trust_data
 
-def get_agents_who_know(query_id: str, knowledge: Dict) -> List[str]:
+def get_agents_who_know(query_id: str, index: KnowledgeIndex) -> List[str]:
     """Find which agents know the answer to a query."""
-    agents = []
-    for agent_id, agent_data in knowledge['agents'].items():
-        if query_id in agent_data['knowledge']:
-            agents.append(agent_id)
-    return agents
+    return list(index.holders(query_id))
 
-def simulate_bidding(query_id: str, budget: float, master_db: Dict, knowledge: Dict, trust_data: Dict):
+def simulate_bidding(query_id: str, budget: float, master_db: Dict, index: KnowledgeIndex, trust_data: Dict):
     """Simulate competitive bidding for a query."""
 
     # Get correct answer
     correct_answer = master_db['queries'][query_id]['response']
 
     # Find agents who know the answer
-    knowledgeable_agents = get_agents_who_know(query_id, knowledge)
+    knowledgeable_agents = get_agents_who_know(query_id, index)
 
     print("="*80)
     print(f"QUERY: {query_id}")
@@ -171,7 +172,6 @@ def simulate_bidding(query_id: str, budget: float, master_db: Dict, knowledge: D
 def main():
     """Run simulations for different competition scenarios."""
 
-    master_db, knowledge, trust_data = load_data()
     budget = 120  # TFC
 
     scenarios = [
@@ -181,12 +181,19 @@ def main():
         ("Q103", "MONOPOLY (1 agent knows answer)")
     ]
 
+    if "--db" in sys.argv[:-1]:
+        db_path = sys.argv[sys.argv.index("--db") + 1]
+        master_db, index, trust_data = load_data_from_store(db_path, [q for q, _ in scenarios])
+    else:
+        master_db, _, trust_data = load_data()
+        index = data_loader.knowledge_index()
+
     for query_id, description in scenarios:
         print("\n" + "="*80)
         print(f"SCENARIO: {description}")
         print("="*80 + "\n")
 
-        simulate_bidding(query_id, budget, master_db, knowledge, trust_data)
+        simulate_bidding(query_id, budget, master_db, index, trust_data)
 
         print("\n")
         input("Press Enter for next scenario...")
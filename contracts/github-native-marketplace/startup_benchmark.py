@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cold-start times of the marketplace CLIs.
+
+Usage:
+    python startup_benchmark.py                    # every CLI, 5 runs each
+    python startup_benchmark.py --repeat 10 --only run_agents,evaluate_bids
+    python startup_benchmark.py --imports          # also list the slowest imports
+
+Each run is a fresh interpreter, so every run is a cold start for Python
+(the OS file cache stays warm). Two cases per CLI:
+    import   python -c "import <module>" - the cost any invocation pays
+    --help   python <module>.py --help   - for CLIs that parse with argparse
+Times are wall-clock; the bare interpreter startup (python -c pass) is shown
+separately and included in every number.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+HERE = Path(__file__).parent
+
+CLIS = [
+    'run_agents',
+    'neurips_comprehensive_analysis',
+    'neurips_sensitivity_analysis',
+    'evaluate_bids',
+    'auction_engine',
+    'market_simulator',
+    'sweep_runner',
+    'benchmark',
+]
+
+# CLIs whose --help exits before doing any work
+HELP_CLIS = {'run_agents', 'neurips_comprehensive_analysis', 'neurips_sensitivity_analysis'}
+
+DEFAULT_REPEAT = 5
+
+
+def time_command(args: List[str], repeat: int = DEFAULT_REPEAT) -> Dict:
+    """Wall-clock min/median (ms) of `python <args>` over fresh interpreters."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=HERE, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return {'min_ms': min(times) * 1e3, 'median_ms': statistics.median(times) * 1e3}
+
+
+def slowest_imports(module: str, top: int = 5) -> List[tuple]:
+    """(cumulative ms, name) of the slowest direct imports of `module`, via -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=HERE, capture_output=True, text=True, check=True)
+
+    # Lines are "import time: self | cumulative | <indent>name", children
+    # before their parent; one extra indent level of two spaces per depth
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1e3, name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                return sorted(children, reverse=True)[:top]
+            children = []
+    return []
+
+
+def run_startup_benchmarks(only: Optional[List[str]] = None,
+                           repeat: int = DEFAULT_REPEAT) -> Dict:
+    """Results as {cli: {'import': timings, '--help': timings}}."""
+    names = only or CLIS
+    unknown = set(names) - set(CLIS)
+    if unknown:
+        raise ValueError(f"Unknown CLIs: {sorted(unknown)}")
+
+    results = {}
+    for name in names:
+        results[name] = {'import': time_command(['-c', f'import {name}'], repeat)}
+        if name in HELP_CLIS:
+            results[name]['--help'] = time_command([f'{name}.py', '--help'], repeat)
+    return results
+
+
+def main():
+    only = None
+    repeat = DEFAULT_REPEAT
+    show_imports = False
+
+    for i, arg in enumerate(sys.argv):
+        if arg == "--only" and i + 1 < len(sys.argv):
+            only = sys.argv[i + 1].split(',')
+        elif arg == "--repeat" and i + 1 < len(sys.argv):
+            repeat = int(sys.argv[i + 1])
+        elif arg == "--imports":
+            show_imports = True
+
+    print("="*80)
+    print(f"CLI COLD-START TIMES ({repeat} runs each)")
+    print("="*80)
+    print()
+
+    interpreter = time_command(['-c', 'pass'], repeat)
+    print(f"{'python -c pass':<40} {'':>8} {interpreter['min_ms']:>10.1f} {interpreter['median_ms']:>10.1f}")
+    print()
+    print(f"{'CLI':<40} {'Case':>8} {'min ms':>10} {'median ms':>10}")
+    print("-" * 80)
+
+    results = run_startup_benchmarks(only, repeat)
+    for name, cases in results.items():
+        for case, timing in cases.items():
+            print(f"{name:<40} {case:>8} {timing['min_ms']:>10.1f} {timing['median_ms']:>10.1f}")
+
+    if show_imports:
+        print()
+        print("Slowest imports (cumulative ms):")
+        for name in results:
+            imports = ", ".join(f"{module} {ms:.1f}" for ms, module in slowest_imports(name))
+            print(f"  {name}: {imports or '-'}")
+
+
+if __name__ == "__main__":
+    main()
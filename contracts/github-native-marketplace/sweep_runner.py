@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Parallel parameter sweeps for the NeurIPS ablation and robustness grids.
+
+Usage:
+    python sweep_runner.py --workers 64 --runs 1000 [--seed 0]
+    python sweep_runner.py --runs 1000 --cell trust_noise=0.1
+
+Expands a grid over (trust_weight, strategy, trust_noise, bid_noise, budget)
+into cells, splits each cell's Monte Carlo runs into fixed-size shards and
+fans the shards out over a ProcessPoolExecutor. Every shard draws from its
+own rng_streams stream keyed by (experiment, cell name, shard) rather than
+by worker, so the merged results do not depend on the number of workers,
+match a serial robustness_to_noise() run, and any one cell can be re-run
+alone (--cell) with the same draws.
+"""
+
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from rng_streams import RUNS_PER_SHARD, RngStreams, num_shards, shard_runs
+
+GRID_AXES = ('trust_weight', 'strategy', 'trust_noise', 'bid_noise', 'budget')
+
+DEFAULT_CELL = {
+    'trust_weight': 0.6,
+    'strategy': 'default',
+    'trust_noise': 0.0,
+    'bid_noise': 0.0,
+    'budget': 120,
+}
+
+# Grids reproducing ablation_study() and robustness_to_noise()
+ABLATION_GRID = {'trust_weight': [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]}
+TRUST_NOISE_GRID = {'trust_noise': [0.0, 0.05, 0.1, 0.15, 0.2]}
+BID_NOISE_GRID = {'bid_noise': [0.0, 5.0, 10.0, 15.0, 20.0]}
+
+# Per-process caches, filled lazily inside workers
+_layouts: Dict[float, object] = {}
+
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict]:
+    """Expand {axis: values} into cells, filling unset axes with defaults."""
+    unknown = set(grid) - set(GRID_AXES)
+    if unknown:
+        raise ValueError(f"Unknown grid axes: {sorted(unknown)}")
+
+    axes = [axis for axis in GRID_AXES if axis in grid]
+    cells = []
+    for values in itertools.product(*(grid[axis] for axis in axes)):
+        cell = dict(DEFAULT_CELL)
+        cell.update(zip(axes, values))
+        cells.append(cell)
+    return cells
+
+
+def cell_name(cell: Dict) -> str:
+    """Canonical name of a cell ("axis=value,..." over every axis), its stream key."""
+    return ",".join(f"{axis}={cell[axis]}" for axis in GRID_AXES)
+
+
+def parse_cell(name: str) -> Dict:
+    """Inverse of cell_name for --cell; values are parsed like the grids' own."""
+    cell = dict(DEFAULT_CELL)
+    for part in name.split(','):
+        axis, _, value = part.partition('=')
+        if axis not in GRID_AXES:
+            raise ValueError(f"Unknown grid axis: {axis!r}")
+        cell[axis] = value if axis == 'strategy' else json.loads(value)
+    return cell
+
+
+def _layout(budget: float):
+    """MarketLayout over all queries for one budget, built once per process."""
+    if budget not in _layouts:
+        import data_loader
+        from batched_market import MarketLayout
+
+        _layouts[budget] = MarketLayout(
+            data_loader.knowledge_index(),
+            data_loader.trust_data()['trust_scores'],
+            list(data_loader.master_db()['queries']),
+            budget
+        )
+    return _layouts[budget]
+
+
+def _ablation_cell(cell: Dict) -> Dict:
+    """Deterministic per-market-type means, as ablation_study() reports them."""
+    import data_loader
+    import neurips_comprehensive_analysis as analysis
+
+    results = {'monopoly': [], 'duopoly': [], 'high_competition': []}
+    for query_id in data_loader.master_db()['queries']:
+        result = analysis.run_single_query(
+            query_id,
+            trust_weight=cell['trust_weight'],
+            strategy=cell['strategy'],
+            budget=cell['budget']
+        )
+        if result:
+            results[result['market_type']].append(result)
+
+    return {
+        market_type: {
+            'mean_bid': np.mean([q['winning_bid'] for q in queries]) if len(queries) > 0 else None,
+            'mean_quality_per_tfc': np.mean([q['winner_quality_per_tfc'] for q in queries]) if len(queries) > 0 else None
+        }
+        for market_type, queries in results.items()
+    }
+
+
+def _run_shard(task) -> Dict:
+    """Worker entry point: one (cell, shard) of Monte Carlo runs."""
+    from batched_market import iter_market_blocks
+    from online_stats import RunningStats
+
+    cell_index, shard_index, cell, runs, seed_seq, ablation = task
+    rng = np.random.default_rng(seed_seq)
+
+    stats = RunningStats()
+    for block in iter_market_blocks(
+        _layout(cell['budget']), runs,
+        trust_noise_std=cell['trust_noise'],
+        bid_noise_std=cell['bid_noise'],
+        rng=rng,
+        trust_weight=cell['trust_weight'],
+        price_weight=1.0 - cell['trust_weight'],
+        strategy=cell['strategy']
+    ):
+        stats.update(block['winning_bid'])
+
+    return {
+        'cell_index': cell_index,
+        'shard_index': shard_index,
+        'ablation': _ablation_cell(cell) if ablation and shard_index == 0 else None,
+        'stats': stats,
+    }
+
+
+def run_sweep(grid: Dict[str, List], runs: int = 100, seed: Optional[int] = 0,
+              max_workers: Optional[int] = None,
+              runs_per_shard: int = RUNS_PER_SHARD,
+              experiment: Optional[str] = None, ablation: bool = True) -> List[Dict]:
+    """
+    Run every cell of a grid and return per-cell results in grid order.
+
+    Each result holds the cell parameters, the deterministic ablation summary
+    (None with ablation=False, e.g. for the noise grids, whose cells it does
+    not depend on) and the Monte Carlo winning-bid mean/std over `runs`
+    noisy markets.
+
+    Shard streams are keyed by (experiment, cell_name(cell), shard), so a
+    cell draws the same numbers in whatever grid it appears; without an
+    experiment they are keyed by (cell index, shard) as before. seed=None
+    uses MARKETPLACE_SEED (or 0).
+    """
+    cells = expand_grid(grid)
+    streams = RngStreams(seed)
+    shards_per_cell = max(1, num_shards(runs, runs_per_shard))
+
+    tasks = []
+    for cell_index, cell in enumerate(cells):
+        cell_key = (experiment, cell_name(cell)) if experiment else (cell_index,)
+        for shard_index in range(shards_per_cell):
+            tasks.append((cell_index, shard_index, cell, shard_runs(runs, shard_index, runs_per_shard),
+                          streams.seed_sequence(*cell_key, shard_index), ablation))
+
+    from online_stats import RunningStats
+
+    results = [
+        {'params': cell, 'ablation': None, 'stats': RunningStats()}
+        for cell in cells
+    ]
+
+    if max_workers == 1:
+        _collect(results, map(_run_shard, tasks))
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            _collect(results, executor.map(_run_shard, tasks, chunksize=chunksize))
+
+    for result in results:
+        stats = result.pop('stats')
+        result['noise'] = {
+            'runs': runs,
+            'mean': stats.mean if stats.n else None,
+            'std': stats.std() if stats.n else None,
+        }
+
+    return results
+
+
+def _collect(results: List[Dict], shard_results: Iterable[Dict]):
+    for shard in shard_results:
+        result = results[shard['cell_index']]
+        if shard['ablation'] is not None:
+            result['ablation'] = shard['ablation']
+        # Shards arrive in order, merged as robustness_to_noise() merges them
+        result['stats'].merge(shard['stats'])
+
+
+def _cell_key(cell: Dict, varying: List[str]):
+    """Key a cell by the axes that vary, matching the existing result files."""
+    if varying == ['trust_weight']:
+        return cell['trust_weight']
+    if len(varying) == 1 and varying[0] in ('trust_noise', 'bid_noise'):
+        return f"{varying[0]}_{cell[varying[0]]}"
+    if not varying:
+        return 'baseline'
+    return ",".join(f"{axis}={cell[axis]}" for axis in varying)
+
+
+def merge_results(cell_results: List[Dict]) -> Dict:
+    """
+    Merge per-cell results into {'ablation_study', 'robustness'}, the two
+    sections main() writes to neurips_sweep_results.json.
+
+    'ablation_study' has the same shape as ablation_study() and 'robustness'
+    the same shape as robustness_to_noise(); when more than one axis varies,
+    keys spell out every varying axis.
+    """
+    varying = [
+        axis for axis in GRID_AXES
+        if len({repr(r['params'][axis]) for r in cell_results}) > 1
+    ]
+
+    merged = {'ablation_study': {}, 'robustness': {}}
+    for result in cell_results:
+        key = _cell_key(result['params'], varying)
+        merged['ablation_study'][key] = result['ablation']
+        merged['robustness'][key] = {
+            'mean': result['noise']['mean'],
+            'std': result['noise']['std']
+        }
+    return merged
+
+
+def main():
+    """Run the standard ablation and noise grids in parallel."""
+    runs = 100
+    workers = None
+    seed = RngStreams().seed
+    cell = None
+
+    for i, arg in enumerate(sys.argv):
+        if arg == "--runs" and i + 1 < len(sys.argv):
+            runs = int(sys.argv[i + 1])
+        elif arg == "--workers" and i + 1 < len(sys.argv):
+            workers = int(sys.argv[i + 1])
+        elif arg == "--seed" and i + 1 < len(sys.argv):
+            seed = int(sys.argv[i + 1])
+        elif arg == "--cell" and i + 1 < len(sys.argv):
+            cell = parse_cell(sys.argv[i + 1])
+
+    print("="*80)
+    print(f"PARALLEL SWEEP (runs={runs}, workers={workers or 'all cores'}, seed={seed})")
+    print("="*80)
+    print()
+
+    if cell is not None:
+        # Re-run one cell with the same streams the full sweep gives it
+        result = run_sweep({axis: [cell[axis]] for axis in GRID_AXES}, runs=runs, seed=seed,
+                           max_workers=workers, experiment='robustness', ablation=False)[0]
+        print(f"  {cell_name(cell)}: Mean bid = {result['noise']['mean']:.2f} ± {result['noise']['std']:.2f}")
+        return
+
+    ablation = merge_results(run_sweep(ABLATION_GRID, runs=0, seed=seed, max_workers=workers))
+    trust_noise = merge_results(run_sweep(TRUST_NOISE_GRID, runs=runs, seed=seed, max_workers=workers,
+                                          experiment='robustness', ablation=False))
+    bid_noise = merge_results(run_sweep(BID_NOISE_GRID, runs=runs, seed=seed, max_workers=workers,
+                                        experiment='robustness', ablation=False))
+
+    robustness = {**trust_noise['robustness'], **bid_noise['robustness']}
+    for key, data in robustness.items():
+        print(f"  {key}: Mean bid = {data['mean']:.2f} ± {data['std']:.2f}")
+
+    with open('neurips_sweep_results.json', 'w') as f:
+        json.dump({
+            'ablation_study': ablation['ablation_study'],
+            'robustness': robustness
+        }, f, indent=2, default=str)
+
+    print()
+    print("Results saved to: neurips_sweep_results.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Incremental requester trust scores.
+
+Usage:
+    python trust_engine.py                      # scores as served to evaluate_bids
+    python trust_engine.py --recompute [--workers 4]
+
+TrustEngine keeps, per (requester, agent), running sums and counts of job
+quality, speed and payment and exponentially decayed (EWMA) averages of
+quality and speed. Recording a verified delivery is O(1), and `score` /
+`based_on_jobs` lookups are dict reads.
+
+requester_trust_scores.json seeds the state: its stored scores are served
+as-is until a new job arrives for that pair, after which the score follows
+the formula in trust_score(). Jobs recorded through the engine are appended
+to requester_trust_history.jsonl (one JSON line per job, never rewritten)
+and replayed on load; jobs already in the document are skipped. A line
+that does not parse is skipped with a warning; only a torn last line (no
+newline, left by a crash mid-write) is cut off. recompute()
+rebuilds every pair from the full history, one process per requester when
+workers > 1.
+"""
+
+import json
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent
+HISTORY_FILE = 'requester_trust_history.jsonl'
+
+DEFAULT_ALPHA = 0.3  # EWMA weight of the newest job
+RECENCY_HALF_LIFE_DAYS = 30.0
+DEFAULT_WEIGHTS = {
+    "quality_weight": 0.6,
+    "speed_weight": 0.2,
+    "reliability_weight": 0.1,
+    "recency_weight": 0.1,
+}
+DEFAULT_MIN_JOBS = 3
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class TrustState:
+    """Running aggregates for one (requester, agent) pair."""
+
+    __slots__ = ('jobs', 'quality_sum', 'speed_sum', 'paid_sum',
+                 'ewma_quality', 'ewma_speed', 'last_date', 'stored_score', 'notes')
+
+    def __init__(self):
+        self.jobs = 0
+        self.quality_sum = 0.0
+        self.speed_sum = 0.0
+        self.paid_sum = 0.0
+        self.ewma_quality = 0.0
+        self.ewma_speed = 0.0
+        self.last_date: Optional[datetime] = None
+        self.stored_score: Optional[float] = None  # from the document, until a new job
+        self.notes: Optional[str] = None
+
+    def add(self, job: Dict, alpha: float = DEFAULT_ALPHA):
+        """Fold in one job ({quality, speed, paid, date}) in O(1)."""
+        quality = job.get('quality', 0.0)
+        speed = job.get('speed', 0.0)
+        if self.jobs == 0:
+            self.ewma_quality, self.ewma_speed = quality, speed
+        else:
+            self.ewma_quality += alpha * (quality - self.ewma_quality)
+            self.ewma_speed += alpha * (speed - self.ewma_speed)
+        self.jobs += 1
+        self.quality_sum += quality
+        self.speed_sum += speed
+        self.paid_sum += job.get('paid', 0.0)
+        date = _parse_date(job.get('date'))
+        if date is not None and (self.last_date is None or date > self.last_date):
+            self.last_date = date
+
+    @property
+    def avg_quality(self) -> float:
+        return self.quality_sum / self.jobs if self.jobs else 0.0
+
+    @property
+    def avg_speed(self) -> float:
+        return self.speed_sum / self.jobs if self.jobs else 0.0
+
+
+def trust_score(state: TrustState, weights: Dict = None, min_jobs: int = DEFAULT_MIN_JOBS,
+                now: Optional[datetime] = None) -> float:
+    """
+    Weighted trust in [0, 1] from a pair's aggregates.
+
+    quality and speed are the EWMAs, reliability is jobs / min_jobs (capped
+    at 1), and recency halves every RECENCY_HALF_LIFE_DAYS between the
+    pair's last job and `now` (the requester's newest job).
+    """
+    if state.jobs == 0:
+        return 0.0
+    weights = weights or DEFAULT_WEIGHTS
+
+    reliability = min(1.0, state.jobs / min_jobs) if min_jobs else 1.0
+    recency = 1.0
+    if now is not None and state.last_date is not None:
+        age_days = max(0.0, (now - state.last_date).total_seconds() / 86400)
+        recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    parts = (
+        (weights.get("quality_weight", 0.0), state.ewma_quality),
+        (weights.get("speed_weight", 0.0), state.ewma_speed),
+        (weights.get("reliability_weight", 0.0), reliability),
+        (weights.get("recency_weight", 0.0), recency),
+    )
+    total = sum(w for w, _ in parts)
+    return sum(w * v for w, v in parts) / total if total else 0.0
+
+
+def recompute_pairs(jobs_by_agent: Dict[str, List[Dict]],
+                    alpha: float = DEFAULT_ALPHA) -> Dict[str, TrustState]:
+    """Aggregates for one requester from its full job history (jobs in date order)."""
+    states = {}
+    for agent_id, jobs in jobs_by_agent.items():
+        state = states[agent_id] = TrustState()
+        for job in sorted(jobs, key=lambda j: j.get('date') or ''):
+            state.add(job, alpha)
+    return states
+
+
+def _recompute_task(args: Tuple[Dict[str, List[Dict]], float]) -> Dict[str, TrustState]:
+    return recompute_pairs(*args)
+
+
+class TrustEngine:
+    """Per-(requester, agent) trust state, updated in O(1) per verified job."""
+
+    def __init__(self, history_path: Optional[str] = None, alpha: float = DEFAULT_ALPHA,
+                 sync_every: int = 64):
+        """
+        Args:
+            history_path: append-only job history (None keeps new jobs in memory only)
+            alpha: EWMA weight of the newest job
+            sync_every: fsync the history every this many jobs
+        """
+        self.history_path = history_path
+        self.alpha = alpha
+        self.sync_every = sync_every
+        self._pairs: Dict[str, Dict[str, TrustState]] = {}
+        self._meta: Dict[str, Dict] = {}          # requester -> document fields besides trust_scores
+        self._clock: Dict[str, datetime] = {}     # requester -> newest job date
+        self._documents: Dict[str, Dict] = {}
+        self._history = None
+        self._unsynced = 0
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict], history_path: Optional[str] = None,
+                       **kwargs) -> 'TrustEngine':
+        """Seed from requester trust documents, then replay the job history."""
+        engine = cls(history_path, **kwargs)
+        seen = set()
+        for document in documents:
+            engine.add_document(document, seen)
+        engine._replay_history(seen)
+        return engine
+
+    def add_document(self, document: Dict, seen: Optional[set] = None):
+        """Seed one requester from a requester_trust_scores.json document."""
+        requester_id = document['requester_id']
+        self._documents[requester_id] = document
+        self._meta[requester_id] = {k: v for k, v in document.items() if k != 'trust_scores'}
+        pairs = self._pairs.setdefault(requester_id, {})
+        for agent_id, entry in document.get('trust_scores', {}).items():
+            state = pairs[agent_id] = TrustState()
+            for job in entry.get('jobs', ()):
+                state.add(job, self.alpha)
+                self._tick(requester_id, state.last_date)
+                if seen is not None:
+                    seen.add(_job_key(requester_id, agent_id, job))
+            # The document's aggregates win over what its job list implies
+            # (e.g. when old jobs were trimmed from the list)
+            jobs = entry.get('based_on_jobs', state.jobs)
+            if jobs != state.jobs:
+                state.jobs = jobs
+                state.quality_sum = entry.get('avg_quality', 0.0) * jobs
+                state.speed_sum = entry.get('avg_speed', 0.0) * jobs
+            state.stored_score = entry.get('score')
+            state.notes = entry.get('notes')
+
+    # Updates
+
+    def record(self, requester_id: str, agent_id: str, job: Dict) -> float:
+        """
+        A verified delivery: fold in the job, append it to the history,
+        and return the pair's new score.
+        """
+        self._apply(requester_id, agent_id, job)
+        if self.history_path is not None:
+            if self._history is None:
+                if os.path.exists(self.history_path):
+                    _repair_tail(self.history_path)
+                self._history = open(self.history_path, 'a')
+            record = {'requester_id': requester_id, 'agent_id': agent_id, **job}
+            self._history.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self.flush()
+        return self.score(requester_id, agent_id)
+
+    def _apply(self, requester_id: str, agent_id: str, job: Dict):
+        state = self._pairs.setdefault(requester_id, {}).get(agent_id)
+        if state is None:
+            state = self._pairs[requester_id][agent_id] = TrustState()
+        state.add(job, self.alpha)
+        state.stored_score = None
+        self._tick(requester_id, state.last_date)
+        if job.get('date'):
+            self._meta.setdefault(requester_id, {'requester_id': requester_id})['last_updated'] = job['date']
+
+    def _tick(self, requester_id: str, date: Optional[datetime]):
+        if date is not None and (requester_id not in self._clock or date > self._clock[requester_id]):
+            self._clock[requester_id] = date
+
+    def flush(self):
+        """Force recorded jobs to disk."""
+        if self._history and self._unsynced:
+            self._history.flush()
+            os.fsync(self._history.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        self.flush()
+        if self._history:
+            self._history.close()
+            self._history = None
+
+    def __enter__(self) -> 'TrustEngine':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Lookups
+
+    def state(self, requester_id: str, agent_id: str) -> Optional[TrustState]:
+        return self._pairs.get(requester_id, {}).get(agent_id)
+
+    def score(self, requester_id: str, agent_id: str) -> float:
+        """Trust score (0.0 if never worked together)."""
+        state = self.state(requester_id, agent_id)
+        if state is None:
+            return 0.0
+        if state.stored_score is not None:
+            return state.stored_score
+        meta = self._meta.get(requester_id, {})
+        return trust_score(
+            state,
+            meta.get('evaluation_weights'),
+            meta.get('risk_policy', {}).get('min_jobs_for_full_trust', DEFAULT_MIN_JOBS),
+            self._clock.get(requester_id),
+        )
+
+    def based_on_jobs(self, requester_id: str, agent_id: str) -> int:
+        state = self.state(requester_id, agent_id)
+        return state.jobs if state is not None else 0
+
+    def entry(self, requester_id: str, agent_id: str) -> Dict:
+        """One agent's trust entry in the requester_trust_scores.json shape, without jobs."""
+        state = self.state(requester_id, agent_id)
+        if state is None:
+            return {}
+        return {
+            "score": self.score(requester_id, agent_id),
+            "based_on_jobs": state.jobs,
+            "avg_quality": state.avg_quality,
+            "avg_speed": state.avg_speed,
+            "notes": state.notes,
+        }
+
+    def trust_data(self, requester_id: str) -> Dict:
+        """A requester's trust document (as evaluate_bids reads it), without job lists."""
+        if requester_id not in self._pairs:
+            return {"trust_scores": {}}
+        data = dict(self._meta.get(requester_id, {'requester_id': requester_id}))
+        data["trust_scores"] = {
+            agent_id: self.entry(requester_id, agent_id) for agent_id in self._pairs[requester_id]
+        }
+        return data
+
+    def requesters(self) -> List[str]:
+        return list(self._pairs)
+
+    # Batch recomputation
+
+    def histories(self) -> Dict[str, Dict[str, List[Dict]]]:
+        """{requester: {agent: jobs}} from the documents plus the history file."""
+        histories = {
+            requester_id: {
+                agent_id: list(entry.get('jobs', ()))
+                for agent_id, entry in document.get('trust_scores', {}).items()
+            }
+            for requester_id, document in self._documents.items()
+        }
+        seen = {
+            _job_key(requester_id, agent_id, job)
+            for requester_id, jobs_by_agent in histories.items()
+            for agent_id, jobs in jobs_by_agent.items()
+            for job in jobs
+        }
+        self.flush()
+        for record in _read_history(self.history_path):
+            requester_id, agent_id, job = _split_record(record)
+            if _job_key(requester_id, agent_id, job) not in seen:
+                histories.setdefault(requester_id, {}).setdefault(agent_id, []).append(job)
+        return histories
+
+    def recompute(self, workers: int = 1) -> Dict[str, Dict[str, float]]:
+        """
+        Rebuild every pair from its full job history (stored scores are dropped).
+
+        Requesters are independent, so with workers > 1 (None: every CPU) they
+        are recomputed in a process pool. Returns {requester: {agent: score}}.
+        """
+        histories = self.histories()
+        tasks = [(jobs_by_agent, self.alpha) for jobs_by_agent in histories.values()]
+        if workers == 1 or len(tasks) <= 1:
+            results = [_recompute_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(tasks))) as executor:
+                results = list(executor.map(_recompute_task, tasks))
+
+        for requester_id, states in zip(histories, results):
+            pairs = self._pairs.setdefault(requester_id, {})
+            for agent_id, state in states.items():
+                previous = pairs.get(agent_id)
+                state.notes = previous.notes if previous is not None else None
+                pairs[agent_id] = state
+                self._tick(requester_id, state.last_date)
+        return {
+            requester_id: {agent_id: self.score(requester_id, agent_id) for agent_id in pairs}
+            for requester_id, pairs in self._pairs.items()
+        }
+
+    def _replay_history(self, seen: set):
+        """Apply recorded jobs not already in the documents; repair a torn tail."""
+        if self.history_path is None or not os.path.exists(self.history_path):
+            return
+        for record in _history_records(self.history_path):
+            requester_id, agent_id, job = _split_record(record)
+            if _job_key(requester_id, agent_id, job) not in seen:
+                self._apply(requester_id, agent_id, job)
+        _repair_tail(self.history_path)
+
+
+def _job_key(requester_id: str, agent_id: str, job: Dict) -> Tuple:
+    return (requester_id, agent_id, job.get('query_id'), job.get('date'))
+
+
+def _split_record(record: Dict) -> Tuple[str, str, Dict]:
+    job = {k: v for k, v in record.items() if k not in ('requester_id', 'agent_id')}
+    return record['requester_id'], record['agent_id'], job
+
+
+def _history_records(path: str) -> Iterable[Dict]:
+    """
+    Each record of the history. Unparsable lines are skipped with a warning;
+    a last line without a newline is read if it parses (see _repair_tail).
+    """
+    with open(path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if line.endswith(b'\n'):
+                    warnings.warn(f"{path}:{number}: skipping unparsable history line")
+                continue
+            yield record
+
+
+def _repair_tail(path: str):
+    """
+    Make the history end in a newline before anything is appended: a torn
+    last line is cut off, a complete record missing only its newline kept.
+    Nothing before the last line is ever touched.
+    """
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        # Find the start of the last line
+        start = size
+        while start > 0:
+            chunk = min(4096, start)
+            f.seek(start - chunk)
+            newline = f.read(chunk).rfind(b'\n')
+            if newline >= 0:
+                start = start - chunk + newline + 1
+                break
+            start -= chunk
+        f.seek(start)
+        try:
+            json.loads(f.read())
+        except ValueError:
+            f.truncate(start)
+        else:
+            f.write(b'\n')
+
+
+def _read_history(path: Optional[str]) -> Iterable[Dict]:
+    if path is None or not os.path.exists(path):
+        return
+    yield from _history_records(path)
+
+
+_default: Optional[TrustEngine] = None
+
+
+def _engine_from_document(document: Dict) -> TrustEngine:
+    global _default
+    if _default is not None:
+        # Its recorded jobs must be on disk before the new engine replays them
+        _default.close()
+    _default = TrustEngine.from_documents([document], str(DATA_DIR / HISTORY_FILE))
+    return _default
+
+
+def default_engine() -> TrustEngine:
+    """
+    Engine over requester_trust_scores.json and its job history.
+
+    Built through data_loader, so it is rebuilt (and the history replayed)
+    when the JSON file changes; the previous engine is closed first, so no
+    job it recorded is lost.
+    """
+    import data_loader
+
+    return data_loader.default_loader().derive(
+        data_loader.TRUST_FILE, _engine_from_document, key='trust_engine'
+    )
+
+
+def main():
+    recompute = "--recompute" in sys.argv
+    workers = 1
+    for i, arg in enumerate(sys.argv):
+        if arg == "--workers" and i + 1 < len(sys.argv):
+            workers = int(sys.argv[i + 1]) or None
+
+    engine = default_engine()
+    served = {r: engine.trust_data(r)["trust_scores"] for r in engine.requesters()}
+    recomputed = engine.recompute(workers) if recompute else None
+
+    print("="*80)
+    print("REQUESTER TRUST SCORES" + (" (recomputed from job history)" if recompute else ""))
+    print("="*80)
+    for requester_id, entries in served.items():
+        print()
+        print(f"Requester: {requester_id}")
+        header = f"  {'Agent':<28} {'Jobs':>5} {'Quality':>8} {'Speed':>7} {'Score':>7}"
+        print(header + (f" {'Recomputed':>11}" if recompute else ""))
+        for agent_id, entry in entries.items():
+            line = (f"  {agent_id:<28} {entry['based_on_jobs']:>5} {entry['avg_quality']:>8.2f} "
+                    f"{entry['avg_speed']:>7.2f} {entry['score']:>7.2f}")
+            if recompute:
+                line += f" {recomputed[requester_id][agent_id]:>11.2f}"
+            print(line)
+    print()
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
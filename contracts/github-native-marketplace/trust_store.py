@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Multi-requester trust store, sharded on disk by requester.
+
+Usage:
+    python trust_store.py import requester_trust_scores.json [more.json ...]
+    python trust_store.py list
+
+Each requester's trust document (the requester_trust_scores.json shape)
+lives in its own file, trust_shards/<xx>/<requester>.json, next to its job
+history (<requester>.history.jsonl, see trust_engine). <xx> is a hash
+prefix so no directory grows too large. Lookups by (requester, agent) load
+only that requester's shard into a TrustEngine; a bounded LRU keeps the hot
+requesters in memory, so many requesters evaluating bids at once never
+load one monolithic file. Cached shards are re-read when the file changes
+(mtime and size, as in data_loader).
+
+The directory defaults to trust_shards/ next to this file, or
+MARKETPLACE_TRUST_DIR.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from trust_engine import TrustEngine
+
+DATA_DIR = Path(__file__).parent
+SHARD_DIR = 'trust_shards'
+DEFAULT_CAPACITY = 256
+
+
+class TrustStore:
+    """(requester, agent) trust lookups over per-requester shard files."""
+
+    def __init__(self, directory=None, capacity: int = DEFAULT_CAPACITY):
+        """
+        Args:
+            directory: shard root (default MARKETPLACE_TRUST_DIR or trust_shards/)
+            capacity: requesters kept in memory
+        """
+        self.directory = Path(directory or os.environ.get('MARKETPLACE_TRUST_DIR') or DATA_DIR / SHARD_DIR)
+        self.capacity = capacity
+        self._engines: 'OrderedDict[str, Tuple[Tuple[int, int], TrustEngine]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Layout
+
+    def path(self, requester_id: str) -> Path:
+        """Shard file for a requester."""
+        prefix = hashlib.sha1(requester_id.encode()).hexdigest()[:2]
+        return self.directory / prefix / (quote(requester_id, safe='') + '.json')
+
+    def history_path(self, requester_id: str) -> Path:
+        path = self.path(requester_id)
+        return path.with_name(path.stem + '.history.jsonl')
+
+    def requesters(self) -> List[str]:
+        """Every requester with a shard, sorted."""
+        return sorted(unquote(path.stem) for path in self.directory.glob('*/*.json'))
+
+    def __contains__(self, requester_id: str) -> bool:
+        return self.path(requester_id).exists()
+
+    # Lookups
+
+    def engine(self, requester_id: str) -> Optional[TrustEngine]:
+        """The requester's TrustEngine, loading its shard on a miss; None if it has none."""
+        path = self.path(requester_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._engines.get(requester_id)
+            if cached is not None and cached[0] == version:
+                self._engines.move_to_end(requester_id)
+                self.hits += 1
+                return cached[1]
+            loading = self._loading.setdefault(requester_id, threading.Lock())
+
+        # One thread loads a shard; others asking for it wait for that load
+        try:
+            with loading:
+                with self._lock:
+                    cached = self._engines.get(requester_id)
+                    if cached is not None and cached[0] == version:
+                        self._engines.move_to_end(requester_id)
+                        self.hits += 1
+                        return cached[1]
+                    stale = self._engines.pop(requester_id, None)
+                    self.misses += 1
+
+                # The stale engine's recorded jobs must be on disk before the
+                # new engine replays the history
+                if stale is not None:
+                    stale[1].close()
+
+                with open(path) as f:
+                    document = json.load(f)
+                engine = TrustEngine.from_documents([document], str(self.history_path(requester_id)))
+                self._insert(requester_id, version, engine)
+                return engine
+        finally:
+            with self._lock:
+                # Threads already waiting hold the lock itself; later ones find the cache
+                if self._loading.get(requester_id) is loading:
+                    del self._loading[requester_id]
+
+    def trust_data(self, requester_id: str) -> Dict:
+        """A requester's trust document as evaluate_bids reads it ({"trust_scores": {}} if unknown)."""
+        engine = self.engine(requester_id)
+        return engine.trust_data(requester_id) if engine is not None else {"trust_scores": {}}
+
+    def score(self, requester_id: str, agent_id: str) -> float:
+        engine = self.engine(requester_id)
+        return engine.score(requester_id, agent_id) if engine is not None else 0.0
+
+    def entry(self, requester_id: str, agent_id: str) -> Dict:
+        engine = self.engine(requester_id)
+        return engine.entry(requester_id, agent_id) if engine is not None else {}
+
+    # Updates
+
+    def record(self, requester_id: str, agent_id: str, job: Dict) -> float:
+        """A verified delivery for a requester with a shard; returns the pair's new score."""
+        engine = self.engine(requester_id)
+        if engine is None:
+            raise KeyError(f"No trust shard for requester {requester_id!r}")
+        return engine.record(requester_id, agent_id, job)
+
+    def put(self, document: Dict):
+        """Write (or replace) a requester's shard atomically."""
+        requester_id = document['requester_id']
+        path = self.path(requester_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(document, f, indent=2)
+        os.replace(tmp_path, path)
+        self.evict(requester_id)
+
+    def import_documents(self, documents: Iterable[Dict]) -> int:
+        """Shard requester trust documents; returns how many were written."""
+        count = 0
+        for document in documents:
+            self.put(document)
+            count += 1
+        return count
+
+    # Cache
+
+    def evict(self, requester_id: str):
+        with self._lock:
+            cached = self._engines.pop(requester_id, None)
+        if cached is not None:
+            cached[1].close()
+
+    def flush(self):
+        """Force every cached requester's recorded jobs to disk."""
+        with self._lock:
+            engines = [engine for _, engine in self._engines.values()]
+        for engine in engines:
+            engine.flush()
+
+    def close(self):
+        with self._lock:
+            engines = [engine for _, engine in self._engines.values()]
+            self._engines.clear()
+        for engine in engines:
+            engine.close()
+
+    def __enter__(self) -> 'TrustStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _insert(self, requester_id: str, version: Tuple[int, int], engine: TrustEngine):
+        evicted = []
+        with self._lock:
+            previous = self._engines.pop(requester_id, None)
+            if previous is not None:
+                evicted.append(previous[1])
+            self._engines[requester_id] = (version, engine)
+            while len(self._engines) > self.capacity:
+                evicted.append(self._engines.popitem(last=False)[1][1])
+                self.evictions += 1
+        for old in evicted:
+            old.close()
+
+
+_default: Optional[TrustStore] = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> TrustStore:
+    """Process-wide store over the default shard directory."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = TrustStore()
+        return _default
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'list'):
+        print("Usage: python trust_store.py import <requester_trust_scores.json> [...]")
+        print("       python trust_store.py list")
+        sys.exit(1)
+
+    with TrustStore() as store:
+        if sys.argv[1] == 'import':
+            documents = []
+            for name in sys.argv[2:]:
+                with open(name) as f:
+                    documents.append(json.load(f))
+            count = store.import_documents(documents)
+            print(f"Imported {count} requester(s) into {store.directory}")
+        else:
+            for requester_id in store.requesters():
+                print(f"{requester_id}\t{store.path(requester_id)}")
+
+
+if __name__ == "__main__":
+    main()